@@ -0,0 +1,156 @@
+"""Requests per second of the fast-path ``/chat`` and ``/health`` handlers against the generic ones.
+
+The baseline app serves the same routes the way ``chatbot_service.main``
+did before the fast path: handlers return pydantic models that FastAPI
+re-validates against ``response_model`` and encodes through
+``jsonable_encoder`` and ``JSONResponse``. Both apps share the gateway's
+middleware, rate limiter and offline model and are called in-process
+through ASGI, so the difference is the request handling itself. Rounds
+alternate between the apps; the median round is reported and the run fails
+when the fast path is not at least ``--min-speedup`` times faster.
+
+    python benchmarks/encoding.py --output encoding.json
+    python benchmarks/encoding.py --requests 5000 --rounds 7 --min-speedup 1.1
+"""
+# No ``from __future__ import annotations``: FastAPI must resolve the handler
+# annotations in ``baseline_app``, whose schemas are imported locally.
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from results import Results, add_arguments, finish
+from starlette.types import ASGIApp, Message
+
+CHAT_BODY = b'{"message": "How do I rotate the service account key?", "session_id": "bench"}'
+ENDPOINTS: Dict[str, Tuple[str, str, bytes]] = {
+    "chat": ("POST", "/chat", CHAT_BODY),
+    "health": ("GET", "/health", b""),
+}
+
+
+def baseline_app(main: Any) -> ASGIApp:
+    """The gateway's ``/chat`` and ``/health`` served through FastAPI's generic response path."""
+
+    from chatbot_service.logging_pipeline import RequestLogMiddleware
+    from chatbot_service.metrics import MetricsMiddleware
+    from chatbot_service.schemas import ChatRequest, ChatResponse, HealthResponse
+    from fastapi import Depends, FastAPI, Request
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(RequestLogMiddleware)
+
+    @app.get("/health", response_model=HealthResponse)
+    async def health() -> HealthResponse:
+        return HealthResponse(status="ok", model=main.settings.vertex_model, offline=main.vertex_client.offline_mode)
+
+    @app.post("/chat", response_model=ChatResponse)
+    async def chat(
+        payload: ChatRequest, request: Request, claims: Optional[dict] = Depends(main.auth_dependency)
+    ) -> ChatResponse:
+        await main._enforce_rate_limit(request, claims, payload.session_id)
+        response_text = await main.vertex_client.generate_response(
+            payload.message, payload.context, main._conversation_key(payload, claims)
+        )
+        return ChatResponse(
+            response=response_text, model=main.settings.vertex_model, offline=main.vertex_client.offline_mode
+        )
+
+    return app
+
+
+async def call(app: ASGIApp, method: str, path: str, body: bytes) -> int:
+    """Send one request straight into ``app`` and return its status code."""
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8080),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = 0
+
+    async def receive() -> Message:
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def throughput(app: ASGIApp, endpoint: str, requests: int) -> float:
+    method, path, body = ENDPOINTS[endpoint]
+    start = time.perf_counter()
+    for _ in range(requests):
+        status = await call(app, method, path, body)
+        if status != 200:
+            raise RuntimeError(f"{method} {path} returned {status}")
+    return requests / (time.perf_counter() - start)
+
+
+async def compare_apps(apps: Dict[str, ASGIApp], endpoint: str, *, requests: int, rounds: int) -> Dict[str, float]:
+    for app in apps.values():
+        await throughput(app, endpoint, max(1, requests // 10))
+    samples: Dict[str, List[float]] = {name: [] for name in apps}
+    for _ in range(rounds):
+        for name, app in apps.items():
+            samples[name].append(await throughput(app, endpoint, requests))
+    baseline, fast = (statistics.median(samples[name]) for name in ("baseline", "fast_path"))
+    return {"baseline_requests_per_sec": baseline, "requests_per_sec": fast, "speedup": fast / baseline}
+
+
+def run(endpoints: List[str], *, requests: int, rounds: int) -> Results:
+    from chatbot_service import main
+
+    # Both apps share the gateway's auth dependency, rate limiter and offline model.
+    apps: Dict[str, ASGIApp] = {"baseline": baseline_app(main), "fast_path": main.app}
+    return {
+        name: asyncio.run(compare_apps(apps, name, requests=requests, rounds=rounds)) for name in endpoints
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--endpoint", dest="endpoints", action="append", choices=sorted(ENDPOINTS), help="Repeatable; default: all"
+    )
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per app per round")
+    parser.add_argument("--rounds", type=int, default=5, help="Alternating rounds; the median is reported")
+    parser.add_argument(
+        "--min-speedup", type=float, default=1.0, help="Fail unless the fast path beats the baseline by this factor"
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    os.environ.update(
+        {"OFFLINE_MODE": "true", "REQUIRE_AUTH": "false", "RATE_LIMIT_MAX_REQUESTS": "1000000000", "LOG_SINK": "std"}
+    )
+    sys.path.insert(0, str(args.src))
+    results = run(args.endpoints or sorted(ENDPOINTS), requests=args.requests, rounds=args.rounds)
+    failures = [
+        f"{name}: fast path is {stats['speedup']:.2f}x the baseline (need {args.min_speedup:.2f}x)"
+        for name, stats in results.items()
+        if stats["speedup"] < args.min_speedup
+    ]
+    finish(results, args, failures)
+
+
+if __name__ == "__main__":
+    main()
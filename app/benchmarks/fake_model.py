@@ -0,0 +1,56 @@
+"""The gateway app with a stand-in model of configurable latency, for load runs.
+
+``BENCH_MODEL_LATENCY_MS`` (plus up to ``BENCH_MODEL_JITTER_MS`` of uniform
+jitter) is how long each prediction blocks a prediction-executor thread, so
+admission limits, the executor and the response path are all measured
+without calling Vertex AI. Serve it with ``uvicorn fake_model:app``.
+"""
+from __future__ import annotations
+
+import os
+import random
+import time
+from typing import Any, Iterator, NamedTuple
+
+from chatbot_service.main import app, vertex_client
+from chatbot_service.vertex_client import VertexAIClient
+
+__all__ = ["app"]
+
+
+class _Response(NamedTuple):
+    text: str
+
+
+class FakeModel:
+    def __init__(self, latency_ms: float, jitter_ms: float = 0.0) -> None:
+        self._latency = latency_ms / 1000
+        self._jitter = jitter_ms / 1000
+
+    def _delay(self) -> float:
+        return self._latency + random.uniform(0, self._jitter)  # noqa: S311 - not security sensitive
+
+    def predict(self, prompt: str, **_params: Any) -> _Response:
+        time.sleep(self._delay())
+        return _Response(f"[fake-model] {prompt[:120]}")
+
+    def predict_streaming(self, prompt: str, **_params: Any) -> Iterator[_Response]:
+        words = f"[fake-model] {prompt[:120]}".split()
+        pause = self._delay() / len(words)
+        for word in words:
+            time.sleep(pause)
+            yield _Response(word + " ")
+
+
+def install(client: VertexAIClient, model: FakeModel) -> None:
+    """Route ``client`` to ``model`` as if the Vertex AI SDK had been initialised."""
+
+    client._model = model
+    client._offline_mode = False
+    client._initialised = True
+
+
+install(
+    vertex_client,
+    FakeModel(float(os.environ.get("BENCH_MODEL_LATENCY_MS", "0")), float(os.environ.get("BENCH_MODEL_JITTER_MS", "0"))),
+)
@@ -0,0 +1,127 @@
+"""End-to-end load generator for ``/chat`` and ``/health``.
+
+Drives a running server (``--url``) or, by default, starts one locally in
+offline mode. With ``--model-latency-ms`` the local server answers through a
+stand-in model (``fake_model.py``) that blocks a prediction thread for that
+long, so executor and admission limits are part of the measurement. Each
+endpoint is loaded by ``--concurrency`` closed-loop clients for ``--duration``
+seconds after ``--warmup`` seconds; results report requests per second,
+p50/p95/p99 latency in milliseconds and failed requests (transport errors or
+non-2xx responses), any of which fails the run.
+
+    python benchmarks/load.py --concurrency 32 --duration 15 --output load.json
+    python benchmarks/load.py --model-latency-ms 200 --baseline load.json
+    python benchmarks/load.py --url http://127.0.0.1:8080 --endpoint health
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from contextlib import ExitStack
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+from results import Results, add_arguments, finish, latency_summary
+from server import running_server
+
+Request = Callable[[httpx.AsyncClient, int, int], Awaitable[httpx.Response]]
+DISTINCT_PROMPTS = 64
+
+
+def _health(client: httpx.AsyncClient, _worker: int, _sequence: int) -> Awaitable[httpx.Response]:
+    return client.get("/health")
+
+
+def _chat(client: httpx.AsyncClient, worker: int, sequence: int) -> Awaitable[httpx.Response]:
+    payload = {"message": f"Benchmark question {sequence % DISTINCT_PROMPTS}", "session_id": f"bench-{worker}"}
+    return client.post("/chat", json=payload)
+
+
+ENDPOINTS: Dict[str, Request] = {"health": _health, "chat": _chat}
+
+
+async def drive(
+    client: httpx.AsyncClient, request: Request, *, concurrency: int, duration: float, warmup: float
+) -> Dict[str, float]:
+    """Keep ``concurrency`` requests in flight and summarise those sent after the warm-up."""
+
+    latencies: List[float] = []
+    failed = 0
+    measure_from = time.perf_counter() + warmup
+    stop_at = measure_from + duration
+
+    async def worker(worker_id: int) -> None:
+        nonlocal failed
+        sequence = 0
+        while (sent := time.perf_counter()) < stop_at:
+            try:
+                ok = (await request(client, worker_id, sequence)).is_success
+            except httpx.HTTPError:
+                ok = False
+            sequence += 1
+            if sent >= measure_from:
+                latencies.append((time.perf_counter() - sent) * 1000)
+                failed += not ok
+
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    return {
+        "requests": len(latencies),
+        "failed": failed,
+        "requests_per_sec": len(latencies) / duration,
+        **latency_summary(latencies, "ms"),
+    }
+
+
+async def run(url: str, endpoints: List[str], *, concurrency: int, duration: float, warmup: float) -> Results:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+        return {
+            name: await drive(client, ENDPOINTS[name], concurrency=concurrency, duration=duration, warmup=warmup)
+            for name in endpoints
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running server (default: start one locally)")
+    parser.add_argument(
+        "--endpoint", dest="endpoints", action="append", choices=sorted(ENDPOINTS), help="Repeatable; default: all"
+    )
+    parser.add_argument("--concurrency", type=int, default=16, help="Closed-loop clients per endpoint")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per endpoint")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each endpoint")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local server")
+    parser.add_argument(
+        "--model-latency-ms", type=float, help="Serve the local server through a fake model with this latency"
+    )
+    parser.add_argument("--model-jitter-ms", type=float, default=0.0, help="Uniform jitter added to the fake model")
+    add_arguments(parser, max_regression=0.3)
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        url = args.url
+        if url is None:
+            app = "chatbot_service.main:app"
+            env = {"RATE_LIMIT_MAX_REQUESTS": "1000000000", "LOG_LEVEL": "WARNING", "LOG_SINK": "std"}
+            if args.model_latency_ms is not None:
+                app = "fake_model:app"
+                env["BENCH_MODEL_LATENCY_MS"] = str(args.model_latency_ms)
+                env["BENCH_MODEL_JITTER_MS"] = str(args.model_jitter_ms)
+            url = stack.enter_context(running_server(app, args.src, env=env, workers=args.workers)).url
+        results = asyncio.run(
+            run(
+                url,
+                args.endpoints or sorted(ENDPOINTS),
+                concurrency=args.concurrency,
+                duration=args.duration,
+                warmup=args.warmup,
+            )
+        )
+
+    failures = [f"{name}: {int(stats['failed'])} failed requests" for name, stats in results.items() if stats["failed"]]
+    finish(results, args, failures)
+
+
+if __name__ == "__main__":
+    main()
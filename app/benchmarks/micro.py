@@ -0,0 +1,151 @@
+"""Micro-benchmarks for the request hot path: rate limiting, schema validation and the offline stub.
+
+Every benchmark runs its operation in batches of ``--batch`` calls; the
+per-call time of each batch yields p50/p95/p99 in nanoseconds and all calls
+over all batches yield ``ops_per_sec``. Benchmarks whose setup fails (for
+example against an older ``--src`` tree) are skipped with a note.
+
+    python benchmarks/micro.py --output micro.json
+    python benchmarks/micro.py --baseline micro.json --filter rate_limiter
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from results import Results, add_arguments, finish, latency_summary
+
+BatchRunner = Callable[[int], None]
+CONTENDING_THREADS = 8
+PAYLOAD = {"message": "How do I rotate the service account key?", "context": "Runbook: IAM", "session_id": "s-1"}
+
+
+def measure(run_batch: BatchRunner, *, batch: int, samples: int, warmup: int = 3) -> Dict[str, float]:
+    for _ in range(warmup):
+        run_batch(batch)
+    per_call: List[float] = []
+    for _ in range(samples):
+        start = time.perf_counter_ns()
+        run_batch(batch)
+        per_call.append((time.perf_counter_ns() - start) / batch)
+    return {"ops_per_sec": 1e9 * len(per_call) / sum(per_call), **latency_summary(per_call, "ns")}
+
+
+def _rate_limiter_benchmarks() -> Iterator[Tuple[str, BatchRunner]]:
+    from chatbot_service.rate_limiter import InMemoryBackend, RateLimiter, RateLimitRule
+
+    loop = asyncio.new_event_loop()
+
+    def sequential(limiter: RateLimiter, keys: List[str]) -> BatchRunner:
+        position = 0
+
+        async def calls(count: int) -> None:
+            nonlocal position
+            for _ in range(count):
+                await limiter.allow(keys[position % len(keys)])
+                position += 1
+
+        return lambda count: loop.run_until_complete(calls(count))
+
+    unlimited = RateLimiter(max_requests=1_000_000_000, window_seconds=60)
+    yield "rate_limiter.allow[hot_key]", sequential(unlimited, ["client"])
+
+    spread = RateLimiter(max_requests=30, window_seconds=60, max_keys=100_000)
+    yield "rate_limiter.allow[100k_keys]", sequential(spread, [f"client-{index}" for index in range(100_000)])
+
+    # Many concurrent requests from a handful of abusive clients: mostly rejections.
+    contended = RateLimiter(max_requests=30, window_seconds=60)
+    hot_keys = [f"client-{index}" for index in range(10)]
+
+    async def concurrent(count: int) -> None:
+        await asyncio.gather(*(contended.allow(hot_keys[index % len(hot_keys)]) for index in range(count)))
+
+    yield "rate_limiter.allow[gather_contended]", lambda count: loop.run_until_complete(concurrent(count))
+
+    backend = InMemoryBackend()
+    rule = RateLimitRule(max_requests=30, window_seconds=60)
+    pool = ThreadPoolExecutor(CONTENDING_THREADS, thread_name_prefix="bench")
+
+    def take(count: int) -> None:
+        for index in range(count):
+            backend.take(hot_keys[index % len(hot_keys)], rule)
+
+    def threaded(count: int) -> None:
+        share = max(1, count // CONTENDING_THREADS)
+        for future in [pool.submit(take, share) for _ in range(CONTENDING_THREADS)]:
+            future.result()
+
+    yield f"in_memory_backend.take[{CONTENDING_THREADS}_threads]", threaded
+
+
+def _schema_benchmarks() -> Iterator[Tuple[str, BatchRunner]]:
+    import json
+
+    from chatbot_service.schemas import ChatRequest, ChatResponse
+
+    raw = json.dumps(PAYLOAD).encode()
+    response = ChatResponse(response="word " * 200, model="text-bison", offline=True)
+
+    def repeat(operation: Callable[[], object]) -> BatchRunner:
+        def run_batch(count: int) -> None:
+            for _ in range(count):
+                operation()
+
+        return run_batch
+
+    yield "ChatRequest.model_validate", repeat(lambda: ChatRequest.model_validate(PAYLOAD))
+    yield "ChatRequest.model_validate_json", repeat(lambda: ChatRequest.model_validate_json(raw))
+    yield "ChatResponse.model_dump_json", repeat(response.model_dump_json)
+
+
+def _offline_stub_benchmarks() -> Iterator[Tuple[str, BatchRunner]]:
+    from chatbot_service.config import AppSettings
+    from chatbot_service.vertex_client import VertexAIClient
+
+    client = VertexAIClient(AppSettings())
+    short, long = PAYLOAD["message"], "Explain the incident timeline. " * 64
+
+    for label, prompt in (("short", short), ("long", long)):
+
+        def run_batch(count: int, prompt: str = prompt) -> None:
+            for _ in range(count):
+                client._offline_stub(prompt)
+
+        yield f"VertexAIClient._offline_stub[{label}]", run_batch
+
+
+SUITES = (_rate_limiter_benchmarks, _schema_benchmarks, _offline_stub_benchmarks)
+
+
+def run(*, batch: int, samples: int, name_filter: str = "") -> Results:
+    results: Results = {}
+    for suite in SUITES:
+        try:
+            benchmarks = list(suite())
+        except (ImportError, AttributeError, TypeError) as exc:
+            print(f"Skipping {suite.__name__.strip('_')}: {exc}", file=sys.stderr)
+            continue
+        for name, run_batch in benchmarks:
+            if name_filter in name:
+                results[name] = measure(run_batch, batch=batch, samples=samples)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch", type=int, default=1000, help="Calls per timed batch")
+    parser.add_argument("--samples", type=int, default=50, help="Timed batches per benchmark")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this text")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(args.src))
+    finish(run(batch=args.batch, samples=args.samples, name_filter=args.filter), args)
+
+
+if __name__ == "__main__":
+    main()
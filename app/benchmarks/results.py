@@ -0,0 +1,127 @@
+"""Reporting shared by the benchmark scripts: percentiles, JSON output and baseline gates.
+
+Results are ``{benchmark: {metric: value}}``. Metrics ending in ``_per_sec``
+are throughputs (higher is better); ``median`` and ``p50_*``/``p95_*`` are
+latencies (lower is better). Only those are compared against a baseline:
+``p99_*`` and the remaining counters are reported but too noisy in a single
+run to fail a build on.
+
+A baseline stays fixed once written, so a series of small regressions adds
+up against it instead of each being measured against the last: it is only
+created when missing (``--seed-baseline``) or replaced on request
+(``--update-baseline``).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+APP_DIR = Path(__file__).resolve().parents[1]
+Results = Dict[str, Dict[str, float]]
+LOWER_IS_BETTER = ("median", "p50_", "p95_")
+
+
+def percentile(ordered: Sequence[float], fraction: float) -> float:
+    """Linear-interpolated percentile of an already sorted, non-empty sequence."""
+
+    position = (len(ordered) - 1) * fraction
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_summary(samples: Iterable[float], unit: str) -> Dict[str, float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+    return {
+        f"p50_{unit}": percentile(ordered, 0.50),
+        f"p95_{unit}": percentile(ordered, 0.95),
+        f"p99_{unit}": percentile(ordered, 0.99),
+        f"mean_{unit}": sum(ordered) / len(ordered),
+    }
+
+
+def _gated(metric: str) -> Optional[bool]:
+    """``True`` if higher is better, ``False`` if lower is better, ``None`` if not compared."""
+
+    if metric.endswith("_per_sec"):
+        return True
+    if metric.startswith(LOWER_IS_BETTER):
+        return False
+    return None
+
+
+def compare(results: Results, baseline: Results, limit: float) -> List[str]:
+    """Describe every gated metric that is more than ``limit`` worse than ``baseline``."""
+
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            higher_is_better = _gated(metric)
+            previous = baseline.get(name, {}).get(metric)
+            if higher_is_better is None or not previous:
+                continue
+            change = value / previous - 1
+            if (-change if higher_is_better else change) > limit:
+                regressions.append(f"{name} {metric}: {value:.4g} vs baseline {previous:.4g} ({change:+.0%})")
+    return regressions
+
+
+def add_arguments(parser: argparse.ArgumentParser, *, max_regression: float = 0.2) -> None:
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="Previous results to compare against (skipped if missing)")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=max_regression,
+        help="Allowed slowdown of a gated metric as a fraction (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--seed-baseline",
+        action="store_true",
+        help="Write these results to --baseline when it does not exist yet",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Accept these results as the new --baseline; regressions against the old one are reported, not failed",
+    )
+    parser.add_argument(
+        "--src",
+        type=Path,
+        default=APP_DIR / "src",
+        help="Source tree to benchmark (e.g. a checkout of the base branch)",
+    )
+
+
+def finish(results: Results, args: argparse.Namespace, failures: Sequence[str] = ()) -> None:
+    """Print and store ``results``, gate them on the baseline and exit non-zero on any failure."""
+
+    problems = list(failures)
+    rendered = json.dumps(results, indent=2, sort_keys=True)
+    print(rendered)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(rendered, encoding="utf-8")
+    write_baseline = bool(args.baseline and (args.update_baseline or args.seed_baseline))
+    if args.baseline and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.max_regression)
+        if args.update_baseline:
+            for regression in regressions:
+                print(f"Accepted regression: {regression}", file=sys.stderr)
+        else:
+            problems += regressions
+            write_baseline = False
+    elif args.baseline:
+        print(f"No baseline at {args.baseline}; nothing to compare against", file=sys.stderr)
+    if problems:
+        sys.exit("Benchmark failures:\n" + "\n".join(problems))
+    if write_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(rendered, encoding="utf-8")
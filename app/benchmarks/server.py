@@ -0,0 +1,72 @@
+"""Start the gateway under uvicorn in a child process for end-to-end benchmarks."""
+from __future__ import annotations
+
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+
+
+class LocalServer(NamedTuple):
+    url: str
+    ready_seconds: float
+
+
+def environment(src: Path, overrides: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Environment for an offline, unauthenticated server importing the gateway from ``src``."""
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(src), str(BENCHMARK_DIR), env.get("PYTHONPATH")]))
+    env.setdefault("OFFLINE_MODE", "true")
+    env.setdefault("REQUIRE_AUTH", "false")
+    env.update(overrides or {})
+    return env
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def running_server(
+    app: str,
+    src: Path,
+    *,
+    env: Optional[Dict[str, str]] = None,
+    workers: int = 1,
+    timeout: float = 30.0,
+) -> Iterator[LocalServer]:
+    """Run ``app`` until the block exits, yielding once ``/health`` first answers 200."""
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    command: List[str] = [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"]
+    command += ["--no-access-log", "--workers", str(workers)]
+    start = time.perf_counter()
+    server = subprocess.Popen(command, env=environment(src, env))
+    try:
+        while True:
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError(f"/health did not respond within {timeout}s")
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with code {server.returncode}")
+            try:
+                with urllib.request.urlopen(f"{url}/health", timeout=1.0) as response:  # noqa: S310 - local URL
+                    if response.status == 200:
+                        break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        yield LocalServer(url, time.perf_counter() - start)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
@@ -0,0 +1,62 @@
+"""Cold-start benchmark: module import time and time to the first ``/health`` response.
+
+Each sample runs in a fresh interpreter so nothing is cached between runs.
+Results are printed as JSON; ``--baseline`` compares them against a previous
+run and exits non-zero when a median regresses by more than ``--max-regression``.
+
+    python benchmarks/startup.py --runs 5 --output startup.json
+    python benchmarks/startup.py --baseline startup.json --max-regression 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+from results import Results, add_arguments, finish
+from server import environment, running_server
+
+IMPORT_PROBE = (
+    "import time; start = time.perf_counter(); import chatbot_service.main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def measure_import(src: Path) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], env=environment(src), capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_health(src: Path, timeout: float = 30.0) -> float:
+    """Seconds from spawning uvicorn until ``/health`` first answers 200."""
+
+    with running_server("chatbot_service.main:app", src, timeout=timeout) as server:
+        return server.ready_seconds
+
+
+def run(runs: int, src: Path) -> Results:
+    samples: Dict[str, List[float]] = {"import_seconds": [], "first_health_seconds": []}
+    for _ in range(runs):
+        samples["import_seconds"].append(measure_import(src))
+        samples["first_health_seconds"].append(measure_first_health(src))
+    return {
+        name: {"median": statistics.median(values), "min": min(values), "max": max(values)}
+        for name, values in samples.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    add_arguments(parser)
+    args = parser.parse_args()
+    finish(run(args.runs, args.src), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 ﻿from __future__ import annotations
 
-import uvicorn
+from .launcher import run
 
 if __name__ == "__main__":
-    uvicorn.run("chatbot_service.main:app", host="0.0.0.0", port=8080, factory=False)
\ No newline at end of file
+    run()
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import TYPE_CHECKING, Dict, Optional
+
+from .rate_limiter import Grant, RateLimiter, build_rate_limit_backend, build_rate_limiter
+
+if TYPE_CHECKING:
+    from .config import AppSettings
+
+
+class Priority(IntEnum):
+    """Admission classes; lower values are served first and shed last."""
+
+    SERVICE = 0
+    USER = 1
+    ANONYMOUS = 2
+
+
+# Priority of the request being served; model calls made on its behalf queue with it.
+PRIORITY: ContextVar[Priority] = ContextVar("chatbot_priority", default=Priority.USER)
+
+# Fraction of the executor queue each class may fill before it is shed.
+QUEUE_SHARES: Dict[Priority, float] = {Priority.SERVICE: 1.0, Priority.USER: 0.75, Priority.ANONYMOUS: 0.5}
+
+
+def classify(
+    claims: Optional[dict], *, priority_claim: str = "", service_account_suffix: str = ""
+) -> Priority:
+    """Derive the admission class from verified token claims.
+
+    Unauthenticated callers are anonymous. A ``priority_claim`` naming a
+    class wins; otherwise callers whose email ends in
+    ``service_account_suffix`` are services and everyone else is a user. Any
+    Google project can mint service-account tokens, so the suffix should be
+    scoped to the project (``@<project>.iam.gserviceaccount.com``); when it
+    is empty nobody is classed as a service by email.
+    """
+
+    if not claims:
+        return Priority.ANONYMOUS
+    if priority_claim:
+        named = str(claims.get(priority_claim, "")).upper()
+        if named in Priority.__members__:
+            return Priority[named]
+    email = str(claims.get("email", ""))
+    if service_account_suffix and email.endswith(service_account_suffix):
+        return Priority.SERVICE
+    return Priority.USER
+
+
+class AIMDLimit:
+    """Concurrency limit following upstream latency: additive increase, multiplicative decrease.
+
+    A short-term latency average (about the last five calls) is compared
+    with a long-term one (about the last fifty). When the short-term average
+    exceeds ``tolerance`` times the long-term one the upstream is queueing
+    and the limit is cut by ``backoff``; otherwise a call completing while at
+    least half the limit was in use raises it by one. The limit stays within
+    ``min_limit`` and ``max_limit``.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial: int,
+        max_limit: int,
+        min_limit: int = 1,
+        backoff: float = 0.9,
+        tolerance: float = 1.5,
+    ) -> None:
+        self._min_limit = max(1, min_limit)
+        self._max_limit = max(self._min_limit, max_limit)
+        self._limit = float(min(max(initial, self._min_limit), self._max_limit))
+        self._backoff = backoff
+        self._tolerance = tolerance
+        self._short: Optional[float] = None
+        self._long: Optional[float] = None
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def observe(self, latency: float, in_flight: int) -> None:
+        """Record the latency of a call that completed with ``in_flight`` calls outstanding."""
+
+        if self._short is None or self._long is None:
+            self._short = self._long = latency
+            return
+        self._short += 0.2 * (latency - self._short)
+        self._long += 0.02 * (latency - self._long)
+        if self._short > self._tolerance * self._long:
+            self._limit = max(float(self._min_limit), self._limit * self._backoff)
+        elif in_flight * 2 >= self._limit:
+            self._limit = min(float(self._max_limit), self._limit + 1)
+
+
+class AdmissionController:
+    """Rate limits callers against the quota of their priority class.
+
+    Each class has its own :class:`RateLimiter`; they may share one backend
+    as keys are prefixed with the class. Admitting a request also records
+    its class in :data:`PRIORITY` for the prediction executor.
+    """
+
+    def __init__(
+        self,
+        limiters: Dict[Priority, RateLimiter],
+        *,
+        priority_claim: str = "",
+        service_account_suffix: str = "",
+    ) -> None:
+        self._limiters = limiters
+        self._priority_claim = priority_claim
+        self._service_account_suffix = service_account_suffix
+
+    @property
+    def tracked_keys(self) -> int:
+        backends = {id(limiter.backend): limiter for limiter in self._limiters.values()}
+        return sum(limiter.tracked_keys for limiter in backends.values())
+
+    def classify(self, claims: Optional[dict]) -> Priority:
+        return classify(
+            claims, priority_claim=self._priority_claim, service_account_suffix=self._service_account_suffix
+        )
+
+    def max_weight(self, priority: Priority) -> int:
+        """The largest weight a single call of ``priority`` can ever be granted."""
+
+        return self._limiters[priority].rule.max_requests
+
+    async def admit(self, priority: Priority, identity: str, weight: int = 1) -> Grant:
+        PRIORITY.set(priority)
+        return await self._limiters[priority].check(f"{priority.name.lower()}:{identity}", weight)
+
+
+def build_admission_controller(settings: AppSettings) -> AdmissionController:
+    backend = build_rate_limit_backend(settings)
+    quotas = {
+        Priority.SERVICE: settings.rate_limit_service_max_requests,
+        Priority.USER: settings.rate_limit_user_max_requests,
+        Priority.ANONYMOUS: settings.rate_limit_max_requests,
+    }
+    return AdmissionController(
+        {priority: build_rate_limiter(settings, max_requests=quota, backend=backend) for priority, quota in quotas.items()},
+        priority_claim=settings.admission_priority_claim,
+        service_account_suffix=settings.admission_service_account_suffix,
+    )
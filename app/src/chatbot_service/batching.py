@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Sequence, Set, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+BatchPredictor = Callable[[List[str]], Awaitable[Sequence[str]]]
+
+
+class PredictionBatcher:
+    """Coalesces concurrent prompts into batched upstream predictions.
+
+    Prompts are collected until ``max_batch_size`` are pending or
+    ``max_wait_seconds`` have passed since the first one arrived, then sent
+    through ``predict_batch`` as a single call. Results are fanned back out to
+    the waiting callers in order; a failed batch fails every caller in it.
+    """
+
+    def __init__(self, predict_batch: BatchPredictor, *, max_batch_size: int, max_wait_seconds: float) -> None:
+        self._predict_batch = predict_batch
+        self._max_batch_size = max(1, max_batch_size)
+        self._max_wait_seconds = max_wait_seconds
+        self._pending: List[Tuple[str, asyncio.Future[str]]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._dispatching: Set[asyncio.Task[None]] = set()
+
+    async def submit(self, prompt: str) -> str:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[str] = loop.create_future()
+        self._pending.append((prompt, future))
+
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_wait_seconds, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = [(prompt, future) for prompt, future in self._pending if not future.done()]
+        self._pending = []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+        self._dispatching.add(task)
+        task.add_done_callback(self._dispatching.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future[str]]]) -> None:
+        try:
+            results = await self._predict_batch([prompt for prompt, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch returned {len(results)} predictions for {len(batch)} prompts")
+        except Exception as exc:
+            _LOGGER.warning("Batched prediction of %d prompts failed: %s", len(batch), exc)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+
+from .concurrency import ModelOverloadedError, ModelTimeoutError
+from .resilience import CircuitOpenError
+from .schemas import ChatBatchRequest, ChatBatchResult, ChatRequest, ChatResponse
+
+_LOGGER = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_TYPES = frozenset({NDJSON_MEDIA_TYPE, "application/ndjson", "application/jsonl"})
+_BATCH_ADAPTER: TypeAdapter[List[ChatRequest]] = TypeAdapter(List[ChatRequest])
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+DEFAULT_JOB_DIRECTORY = Path(tempfile.gettempdir()) / "chatbot-batch-jobs"
+
+Responder = Callable[[ChatRequest], Awaitable[ChatResponse]]
+
+
+class BatchJobLimitError(Exception):
+    """Raised when ``max_jobs`` batch jobs are already held."""
+
+
+def parse_batch(body: bytes, content_type: str, *, max_items: int) -> List[ChatRequest]:
+    """Validate a ``{"requests": [...]}`` JSON body or an NDJSON upload in a single pass.
+
+    NDJSON lines are spliced into one JSON array so the whole upload goes
+    through one validator call; blank lines are ignored.
+    """
+
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    try:
+        if media_type in NDJSON_TYPES:
+            lines = [line for line in body.splitlines() if line.strip()]
+            if len(lines) > max_items:
+                raise _too_large(max_items)
+            items = _BATCH_ADAPTER.validate_json(b"[" + b",".join(lines) + b"]")
+            if len(items) != len(lines):
+                raise RequestValidationError(
+                    [{"type": "ndjson", "loc": ("body",), "msg": "Expected one JSON object per line", "input": None}]
+                )
+        else:
+            items = ChatBatchRequest.model_validate_json(body).requests
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in exc.errors(include_url=False)]
+        ) from exc
+    if not items:
+        raise RequestValidationError([{"type": "too_short", "loc": ("body",), "msg": "Batch is empty", "input": None}])
+    if len(items) > max_items:
+        raise _too_large(max_items)
+    return items
+
+
+def _too_large(max_items: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Batches are limited to {max_items} requests"
+    )
+
+
+async def run_batch(
+    items: Sequence[ChatRequest], respond: Responder, *, concurrency: int
+) -> AsyncIterator[ChatBatchResult]:
+    """Answer ``items`` with at most ``concurrency`` in flight, yielding results as they finish.
+
+    Results arrive in completion order and carry the ``index`` of their
+    request. Workers hand results over through a queue of ``concurrency``
+    slots, so a slow consumer pauses them instead of results piling up.
+    A failed item becomes an error result and does not stop the batch.
+    """
+
+    queue: asyncio.Queue[ChatBatchResult] = asyncio.Queue(maxsize=max(1, concurrency))
+    pending = iter(enumerate(items))
+
+    async def worker() -> None:
+        for index, item in pending:
+            await queue.put(await _answer(index, item, respond))
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(1, min(concurrency, len(items))))]
+    try:
+        for _ in range(len(items)):
+            yield await queue.get()
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+async def _answer(index: int, item: ChatRequest, respond: Responder) -> ChatBatchResult:
+    try:
+        response = await respond(item)
+    except ModelOverloadedError:
+        return ChatBatchResult(index=index, status=503, detail="Model capacity exhausted")
+    except CircuitOpenError:
+        return ChatBatchResult(index=index, status=503, detail="Model temporarily unavailable")
+    except ModelTimeoutError:
+        return ChatBatchResult(index=index, status=504, detail="Model call timed out")
+    except Exception:
+        _LOGGER.exception("Batch item %d failed", index)
+        return ChatBatchResult(index=index, status=500, detail="Generation failed")
+    return ChatBatchResult(index=index, status=200, **response.model_dump())
+
+
+def ndjson(result: ChatBatchResult) -> bytes:
+    return result.model_dump_json(exclude_none=True).encode() + b"\n"
+
+
+@dataclass
+class BatchJob:
+    id: str
+    owner: str
+    total: int
+    path: Path
+    status: str = "running"
+    completed: int = 0
+    failed: int = 0
+    finished_at: Optional[float] = None
+
+
+class BatchJobStore:
+    """Runs batches in the background and spools their state and NDJSON results to disk.
+
+    Each job is a ``<id>.json`` state file next to its ``<id>.ndjson``
+    results in ``directory`` (``chatbot-batch-jobs`` under the system
+    temporary directory by default), so memory does not grow with batch size.
+    The worker running a job rewrites its state file as items finish, which
+    lets every worker sharing the directory report progress and serve
+    results. At most ``max_jobs`` jobs are held in the directory; a job and
+    its results are dropped ``ttl_seconds`` after its state last changed.
+    """
+
+    def __init__(self, *, directory: str = "", max_jobs: int = 32, ttl_seconds: float = 3600.0) -> None:
+        self._directory = Path(directory) if directory else DEFAULT_JOB_DIRECTORY
+        self._max_jobs = max_jobs
+        self._ttl_seconds = ttl_seconds
+        self._tasks: Dict[str, asyncio.Task[None]] = {}
+
+    def submit(self, owner: str, items: Sequence[ChatRequest], respond: Responder, *, concurrency: int) -> BatchJob:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._sweep(time.time())
+        if sum(1 for _ in self._directory.glob("*.json")) >= self._max_jobs:
+            raise BatchJobLimitError(f"{self._max_jobs} batch jobs are already held")
+        job_id = uuid.uuid4().hex
+        job = BatchJob(id=job_id, owner=owner, total=len(items), path=self._directory / f"{job_id}.ndjson")
+        self._save(job)
+        task = asyncio.get_running_loop().create_task(self._run(job, items, respond, concurrency))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        return job
+
+    def get(self, job_id: str, owner: str) -> Optional[BatchJob]:
+        """Return the job only to the caller that submitted it."""
+
+        self._sweep(time.time())
+        if not _JOB_ID.fullmatch(job_id):
+            return None
+        try:
+            state = json.loads((self._directory / f"{job_id}.json").read_bytes())
+        except (OSError, ValueError):
+            return None
+        job = BatchJob(path=self._directory / f"{job_id}.ndjson", **state)
+        return job if job.owner == owner else None
+
+    async def close(self) -> None:
+        """Cancel the jobs this worker is running; they are recorded as failed."""
+
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job: BatchJob, items: Sequence[ChatRequest], respond: Responder, concurrency: int) -> None:
+        try:
+            with job.path.open("wb") as output:
+                async for result in run_batch(items, respond, concurrency=concurrency):
+                    output.write(ndjson(result))
+                    job.completed += 1
+                    job.failed += result.status != 200
+                    self._save(job)
+            job.status = "succeeded"
+        except Exception:
+            _LOGGER.exception("Batch job %s failed", job.id)
+        finally:
+            if job.status == "running":
+                job.status = "failed"
+            job.finished_at = time.time()
+            self._save(job)
+
+    def _save(self, job: BatchJob) -> None:
+        # Replace the state file atomically so readers in other workers never
+        # see a partial write.
+        state = {
+            "id": job.id,
+            "owner": job.owner,
+            "total": job.total,
+            "status": job.status,
+            "completed": job.completed,
+            "failed": job.failed,
+            "finished_at": job.finished_at,
+        }
+        staging = self._directory / f"{job.id}.json.tmp"
+        staging.write_text(json.dumps(state))
+        os.replace(staging, self._directory / f"{job.id}.json")
+
+    def _sweep(self, now: float) -> None:
+        for state_path in self._directory.glob("*.json"):
+            job_id = state_path.stem
+            try:
+                expired = job_id not in self._tasks and now - state_path.stat().st_mtime >= self._ttl_seconds
+            except OSError:
+                continue
+            if expired:
+                state_path.unlink(missing_ok=True)
+                (self._directory / f"{job_id}.ndjson").unlink(missing_ok=True)
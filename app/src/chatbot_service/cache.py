@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Mapping, Tuple
+
+from .logging_pipeline import annotate
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class ResponseCache:
+    """Size- and TTL-bounded LRU of model responses with single-flight loading.
+
+    Concurrent lookups for a key that is being generated await the same
+    upstream call instead of starting their own. The shared call runs as its
+    own task, so a cancelled caller does not cancel it for the others.
+    """
+
+    def __init__(self, *, max_entries: int, ttl_seconds: float) -> None:
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, Tuple[str, float]] = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task[str]] = {}
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(prompt: str, model: str, params: Mapping[str, Any]) -> str:
+        normalized = " ".join(prompt.split()).casefold()
+        material = json.dumps([model, sorted(params.items()), normalized], separators=(",", ":"))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[str]]) -> str:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                annotate(cache="hit")
+                return value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats.coalesced += 1
+            annotate(cache="coalesced")
+            return await asyncio.shield(task)
+
+        self.stats.misses += 1
+        annotate(cache="miss")
+        task = asyncio.ensure_future(loader())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._complete(key, done))
+        return await asyncio.shield(task)
+
+    def _complete(self, key: str, task: asyncio.Task[str]) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._entries[key] = (task.result(), time.monotonic() + self._ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional, Tuple, TypeVar
+
+from .admission import PRIORITY, QUEUE_SHARES, AIMDLimit, Priority
+from .metrics import ADMISSION_SHED, PHASE_LATENCY
+
+_LOGGER = logging.getLogger(__name__)
+_QUEUE_PHASE = PHASE_LATENCY.labels("executor_queue")
+_PREDICT_PHASE = PHASE_LATENCY.labels("predict")
+_STREAM_PHASE = PHASE_LATENCY.labels("predict_stream")
+
+T = TypeVar("T")
+
+
+class ModelOverloadedError(Exception):
+    """Raised when a prediction cannot be admitted within the queue limits."""
+
+    def __init__(self, message: str, *, retry_after: float = 1.0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ModelTimeoutError(Exception):
+    """Raised when a prediction exceeds its per-request deadline."""
+
+
+class PredictionExecutor:
+    """Dedicated worker pool with admission control for blocking model calls.
+
+    At most ``max_in_flight`` calls hold a slot, or fewer when an adaptive
+    ``limit`` lowers the bound in response to upstream latency. Up to
+    ``max_queue`` more may wait ``queue_timeout`` seconds for one before being
+    shed with :class:`ModelOverloadedError`. Waiters are served in priority
+    order (see :data:`~chatbot_service.admission.PRIORITY`); lower classes
+    may only fill their share of the queue, and a full queue sheds its
+    lowest-priority waiter to make room for a more important call. Each call
+    carries a deadline of ``request_timeout`` seconds covering both queueing
+    and execution. A slot is only released when its worker thread finishes,
+    so abandoned calls still count against the limit until the upstream
+    returns.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int,
+        max_in_flight: int,
+        max_queue: int,
+        queue_timeout: float,
+        request_timeout: float,
+        limit: Optional[AIMDLimit] = None,
+    ) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vertex-predict")
+        self._max_workers = max_workers
+        self._max_in_flight = max_in_flight
+        self._max_queue = max_queue
+        self._queue_timeout = queue_timeout
+        self._request_timeout = request_timeout
+        self._limit = limit
+        self._waiters: List[Tuple[Priority, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def limit(self) -> int:
+        return self._limit.limit if self._limit is not None else self._max_in_flight
+
+    async def run(self, call: Callable[[float], T], *, timeout: Optional[float] = None) -> T:
+        """Run ``call`` on the pool, passing it the seconds left before the deadline."""
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout if timeout is not None else self._request_timeout)
+        release = await self._admit(deadline)
+        elapsed = [0.0]
+
+        def timed(budget: float) -> T:
+            start = time.perf_counter()
+            try:
+                return call(budget)
+            finally:
+                elapsed[0] = time.perf_counter() - start
+
+        def finish(_future: asyncio.Future[T]) -> None:
+            if self._limit is not None:
+                self._limit.observe(elapsed[0], self._in_flight)
+            release()
+            _PREDICT_PHASE.observe(elapsed[0])
+
+        try:
+            future = loop.run_in_executor(self._pool, timed, max(0.0, deadline - loop.time()))
+        except BaseException:
+            release()
+            raise
+        future.add_done_callback(finish)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError as exc:
+            raise ModelTimeoutError("Model call exceeded its deadline") from exc
+
+    async def stream(
+        self, factory: Callable[[float], Iterable[T]], *, timeout: Optional[float] = None
+    ) -> AsyncIterator[T]:
+        """Drive a blocking iterator on the pool and relay its items.
+
+        The slot is held for the life of the stream. Closing or cancelling the
+        returned iterator stops the worker after its current item and closes
+        the upstream iterator.
+        """
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout if timeout is not None else self._request_timeout)
+        release = await self._admit(deadline)
+        queue: asyncio.Queue[Tuple[str, Any]] = asyncio.Queue()
+        stop = threading.Event()
+
+        def post(kind: str, value: Any) -> None:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (kind, value))
+            except RuntimeError:  # loop already closed; nobody is listening
+                stop.set()
+
+        def produce(budget: float) -> None:
+            iterator = None
+            try:
+                iterator = iter(factory(budget))
+                for item in iterator:
+                    post("item", item)
+                    if stop.is_set():
+                        break
+            except Exception as exc:
+                post("error", exc)
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+                post("done", None)
+
+        try:
+            producer = loop.run_in_executor(self._pool, produce, max(0.0, deadline - loop.time()))
+        except BaseException:
+            release()
+            raise
+        started = time.perf_counter()
+        producer.add_done_callback(lambda future: _finish_producer(future, release, started))
+
+        try:
+            while True:
+                try:
+                    kind, value = await asyncio.wait_for(queue.get(), timeout=max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError as exc:
+                    raise ModelTimeoutError("Model stream exceeded its deadline") from exc
+                if kind == "item":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    break
+        finally:
+            stop.set()
+
+    def warm_up(self) -> None:
+        """Start every worker thread now instead of on the first predictions."""
+
+        # Holding each task at a barrier keeps threads busy, so every submit spawns a new one.
+        barrier = threading.Barrier(self._max_workers)
+        for _ in range(self._max_workers):
+            self._pool.submit(_wait_at, barrier)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _admit(self, deadline: float) -> Callable[[], None]:
+        start = time.perf_counter()
+        if self._waiters or self._in_flight >= self.limit:
+            await self._wait_for_slot(PRIORITY.get(), deadline)
+        else:
+            self._in_flight += 1
+
+        _QUEUE_PHASE.observe(time.perf_counter() - start)
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self._in_flight -= 1
+                self._hand_over()
+
+        return release
+
+    async def _wait_for_slot(self, priority: Priority, deadline: float) -> None:
+        """Queue for a slot; on success the slot was already counted by :meth:`_hand_over`."""
+
+        if len(self._waiters) >= self._max_queue * QUEUE_SHARES[priority] and not self._shed_below(priority):
+            ADMISSION_SHED.labels(priority.name.lower()).inc()
+            raise ModelOverloadedError("Model queue is full", retry_after=self._queue_timeout)
+
+        loop = asyncio.get_running_loop()
+        entry = (priority, next(self._sequence), loop.create_future())
+        heapq.heappush(self._waiters, entry)
+        self._hand_over()
+        try:
+            await asyncio.wait_for(entry[2], timeout=max(0.0, min(self._queue_timeout, deadline - loop.time())))
+        except asyncio.TimeoutError as exc:
+            ADMISSION_SHED.labels(priority.name.lower()).inc()
+            raise ModelOverloadedError("Timed out waiting for a model slot", retry_after=self._queue_timeout) from exc
+        except BaseException:
+            if entry[2].done() and not entry[2].cancelled() and entry[2].exception() is None:
+                self._in_flight -= 1  # handed a slot just as we were cancelled
+                self._hand_over()
+            raise
+        finally:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+
+    def _shed_below(self, priority: Priority) -> bool:
+        """Fail the newest waiter of the lowest class below ``priority`` to free a queue place."""
+
+        victims = [entry for entry in self._waiters if entry[0] > priority]
+        if not victims:
+            return False
+        victim = max(victims)
+        self._waiters.remove(victim)
+        heapq.heapify(self._waiters)
+        ADMISSION_SHED.labels(victim[0].name.lower()).inc()
+        victim[2].set_exception(
+            ModelOverloadedError("Shed for higher-priority traffic", retry_after=self._queue_timeout)
+        )
+        return True
+
+    def _hand_over(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+
+def _wait_at(barrier: threading.Barrier) -> None:
+    try:
+        barrier.wait(timeout=1.0)
+    except threading.BrokenBarrierError:
+        pass
+
+
+def _finish_producer(future: asyncio.Future[None], release: Callable[[], None], started: float) -> None:
+    release()
+    _STREAM_PHASE.observe(time.perf_counter() - started)
+    if not future.cancelled() and future.exception() is not None:
+        _LOGGER.warning("Streaming producer failed", exc_info=future.exception())
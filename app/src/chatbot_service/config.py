@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from functools import lru_cache
+from typing import Literal, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -13,15 +14,95 @@ class AppSettings(BaseSettings):
     location: str = Field("us-central1", alias="GCP_LOCATION")
     vertex_model: str = Field("text-bison", alias="VERTEX_MODEL")
     vertex_endpoint: str = Field("", alias="VERTEX_ENDPOINT")
+    vertex_temperature: Optional[float] = Field(None, alias="VERTEX_TEMPERATURE")
+    vertex_max_output_tokens: Optional[int] = Field(None, alias="VERTEX_MAX_OUTPUT_TOKENS")
+    vertex_top_p: Optional[float] = Field(None, alias="VERTEX_TOP_P")
+    vertex_top_k: Optional[int] = Field(None, alias="VERTEX_TOP_K")
+    vertex_batch_enabled: bool = Field(False, alias="VERTEX_BATCH_ENABLED")
+    vertex_batch_max_size: int = Field(8, alias="VERTEX_BATCH_MAX_SIZE")
+    vertex_batch_max_wait_ms: float = Field(5.0, alias="VERTEX_BATCH_MAX_WAIT_MS")
+    vertex_max_workers: int = Field(8, alias="VERTEX_MAX_WORKERS")
+    vertex_max_in_flight: int = Field(8, alias="VERTEX_MAX_IN_FLIGHT")
+    vertex_max_queue: int = Field(32, alias="VERTEX_MAX_QUEUE")
+    vertex_queue_timeout_seconds: float = Field(2.0, alias="VERTEX_QUEUE_TIMEOUT_SECONDS")
+    vertex_adaptive_concurrency: bool = Field(True, alias="VERTEX_ADAPTIVE_CONCURRENCY")
+    vertex_min_in_flight: int = Field(1, alias="VERTEX_MIN_IN_FLIGHT")
+    vertex_latency_tolerance: float = Field(1.5, alias="VERTEX_LATENCY_TOLERANCE")
+    vertex_limit_backoff: float = Field(0.9, alias="VERTEX_LIMIT_BACKOFF")
+    vertex_request_timeout_seconds: float = Field(30.0, alias="VERTEX_REQUEST_TIMEOUT_SECONDS")
+    vertex_attempt_timeout_seconds: Optional[float] = Field(None, alias="VERTEX_ATTEMPT_TIMEOUT_SECONDS")
+    vertex_retry_max_attempts: int = Field(3, alias="VERTEX_RETRY_MAX_ATTEMPTS")
+    vertex_retry_base_delay_seconds: float = Field(0.1, alias="VERTEX_RETRY_BASE_DELAY_SECONDS")
+    vertex_retry_max_delay_seconds: float = Field(2.0, alias="VERTEX_RETRY_MAX_DELAY_SECONDS")
+    vertex_hedge_enabled: bool = Field(False, alias="VERTEX_HEDGE_ENABLED")
+    vertex_hedge_min_delay_seconds: float = Field(0.05, alias="VERTEX_HEDGE_MIN_DELAY_SECONDS")
+
+    circuit_breaker_enabled: bool = Field(True, alias="CIRCUIT_BREAKER_ENABLED")
+    circuit_breaker_failure_threshold: float = Field(0.5, alias="CIRCUIT_BREAKER_FAILURE_THRESHOLD")
+    circuit_breaker_window: int = Field(20, alias="CIRCUIT_BREAKER_WINDOW")
+    circuit_breaker_min_calls: int = Field(10, alias="CIRCUIT_BREAKER_MIN_CALLS")
+    circuit_breaker_reset_seconds: float = Field(30.0, alias="CIRCUIT_BREAKER_RESET_SECONDS")
+    circuit_breaker_fallback: bool = Field(False, alias="CIRCUIT_BREAKER_FALLBACK")
 
     offline_mode: bool = Field(True, alias="OFFLINE_MODE")
     require_auth: bool = Field(True, alias="REQUIRE_AUTH")
     auth_audience: str = Field("", alias="AUTH_AUDIENCE")
+    auth_token_cache_size: int = Field(1024, alias="AUTH_TOKEN_CACHE_SIZE")
 
     rate_limit_window_seconds: int = Field(60, alias="RATE_LIMIT_WINDOW_SECONDS")
     rate_limit_max_requests: int = Field(30, alias="RATE_LIMIT_MAX_REQUESTS")
+    rate_limit_user_max_requests: Optional[int] = Field(None, alias="RATE_LIMIT_USER_MAX_REQUESTS")
+    rate_limit_service_max_requests: int = Field(300, alias="RATE_LIMIT_SERVICE_MAX_REQUESTS")
+    admission_priority_claim: str = Field("", alias="ADMISSION_PRIORITY_CLAIM")
+    admission_service_account_suffix: str = Field("", alias="ADMISSION_SERVICE_ACCOUNT_SUFFIX")
+    rate_limit_shards: int = Field(16, alias="RATE_LIMIT_SHARDS")
+    rate_limit_max_keys: int = Field(100_000, alias="RATE_LIMIT_MAX_KEYS")
+    rate_limit_backend: str = Field("memory", alias="RATE_LIMIT_BACKEND")
+    rate_limit_redis_url: str = Field("", alias="RATE_LIMIT_REDIS_URL")
+    rate_limit_prefetch: int = Field(1, alias="RATE_LIMIT_PREFETCH")
+    rate_limit_fail_open: bool = Field(True, alias="RATE_LIMIT_FAIL_OPEN")
+
+    response_cache_enabled: bool = Field(False, alias="RESPONSE_CACHE_ENABLED")
+    response_cache_max_entries: int = Field(1024, alias="RESPONSE_CACHE_MAX_ENTRIES")
+    response_cache_ttl_seconds: float = Field(300.0, alias="RESPONSE_CACHE_TTL_SECONDS")
+
+    semantic_cache_enabled: bool = Field(False, alias="SEMANTIC_CACHE_ENABLED")
+    semantic_cache_max_entries: int = Field(10_000, alias="SEMANTIC_CACHE_MAX_ENTRIES")
+    semantic_cache_ttl_seconds: float = Field(300.0, alias="SEMANTIC_CACHE_TTL_SECONDS")
+    semantic_cache_threshold: float = Field(0.9, alias="SEMANTIC_CACHE_THRESHOLD")
+    semantic_cache_dimensions: int = Field(128, alias="SEMANTIC_CACHE_DIMENSIONS")
+
+    conversation_memory_enabled: bool = Field(False, alias="CONVERSATION_MEMORY_ENABLED")
+    conversation_max_sessions: int = Field(10_000, alias="CONVERSATION_MAX_SESSIONS")
+    conversation_max_turns: int = Field(20, alias="CONVERSATION_MAX_TURNS")
+    conversation_max_chars: int = Field(8000, alias="CONVERSATION_MAX_CHARS")
+    conversation_ttl_seconds: float = Field(1800.0, alias="CONVERSATION_TTL_SECONDS")
+
+    batch_max_items: int = Field(500, alias="BATCH_MAX_ITEMS")
+    batch_concurrency: int = Field(8, alias="BATCH_CONCURRENCY")
+    batch_items_per_token: int = Field(20, alias="BATCH_ITEMS_PER_TOKEN")
+    batch_max_jobs: int = Field(32, alias="BATCH_MAX_JOBS")
+    batch_job_ttl_seconds: float = Field(3600.0, alias="BATCH_JOB_TTL_SECONDS")
+    batch_job_dir: str = Field("", alias="BATCH_JOB_DIR")
+
+    server_host: str = Field("0.0.0.0", alias="SERVER_HOST")
+    server_port: int = Field(8080, alias="PORT")
+    server_workers: int = Field(0, alias="SERVER_WORKERS")
+    server_loop: str = Field("auto", alias="SERVER_LOOP")
+    server_http: str = Field("auto", alias="SERVER_HTTP")
+    server_backlog: int = Field(2048, alias="SERVER_BACKLOG")
+    server_keep_alive_seconds: int = Field(75, alias="SERVER_KEEP_ALIVE_SECONDS")
+    server_limit_concurrency: Optional[int] = Field(None, alias="SERVER_LIMIT_CONCURRENCY")
+    server_graceful_timeout_seconds: int = Field(10, alias="SERVER_GRACEFUL_TIMEOUT_SECONDS")
+    server_warmup: Literal["background", "blocking", "off"] = Field("background", alias="SERVER_WARMUP")
 
     log_level: str = Field("INFO", alias="LOG_LEVEL")
+    log_sink: str = Field("auto", alias="LOG_SINK")
+    log_file: str = Field("", alias="LOG_FILE")
+    log_name: str = Field("chatbot-service", alias="LOG_NAME")
+    log_buffer_size: int = Field(10_000, alias="LOG_BUFFER_SIZE")
+    log_batch_size: int = Field(100, alias="LOG_BATCH_SIZE")
+    log_flush_interval_seconds: float = Field(1.0, alias="LOG_FLUSH_INTERVAL_SECONDS")
 
     model_config = SettingsConfigDict(
         env_file=".env",
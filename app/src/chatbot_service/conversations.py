@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict, deque
+from typing import Deque
+
+
+class Conversation:
+    """Ring buffer of rendered turns plus the cached concatenation of them.
+
+    Appending a turn extends the cached history and dropping the oldest turn
+    slices its rendered length off the front, so the prompt prefix is never
+    rebuilt from the individual turns.
+    """
+
+    __slots__ = ("turns", "history", "expires_at")
+
+    def __init__(self, max_turns: int) -> None:
+        self.turns: Deque[str] = deque(maxlen=max_turns)
+        self.history = ""
+        self.expires_at = 0.0
+
+    def append(self, rendered: str, max_chars: int) -> None:
+        if self.turns.maxlen is not None and len(self.turns) == self.turns.maxlen:
+            self.history = self.history[len(self.turns[0]) :]
+        self.turns.append(rendered)
+        self.history += rendered
+        while len(self.history) > max_chars and len(self.turns) > 1:
+            self.history = self.history[len(self.turns.popleft()) :]
+
+
+class ConversationStore:
+    """Memory-bounded server-side conversation history keyed by session id.
+
+    At most ``max_sessions`` conversations of ``max_turns`` turns (and
+    ``max_chars`` rendered characters) are kept. A conversation expires
+    ``ttl_seconds`` after it was last used; the least recently used
+    conversation is evicted first when the store is full.
+    """
+
+    def __init__(self, *, max_sessions: int, max_turns: int, ttl_seconds: float, max_chars: int) -> None:
+        self._max_sessions = max_sessions
+        self._max_turns = max(1, max_turns)
+        self._ttl_seconds = ttl_seconds
+        self._max_chars = max_chars
+        self._sessions: OrderedDict[str, Conversation] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def history(self, session_id: str) -> str:
+        """Return the rendered history for ``session_id`` ready to prefix a prompt."""
+
+        now = time.monotonic()
+        self._expire(now)
+        conversation = self._sessions.get(session_id)
+        if conversation is None:
+            return ""
+        self._touch(session_id, conversation, now)
+        return conversation.history
+
+    def append(self, session_id: str, user_message: str, assistant_message: str) -> None:
+        now = time.monotonic()
+        self._expire(now)
+        conversation = self._sessions.get(session_id)
+        if conversation is None:
+            conversation = Conversation(self._max_turns)
+            self._sessions[session_id] = conversation
+        conversation.append(render_turn(user_message, assistant_message), self._max_chars)
+        self._touch(session_id, conversation, now)
+        while len(self._sessions) > self._max_sessions:
+            self._sessions.popitem(last=False)
+
+    def clear(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def _touch(self, session_id: str, conversation: Conversation, now: float) -> None:
+        conversation.expires_at = now + self._ttl_seconds
+        self._sessions.move_to_end(session_id)
+
+    def _expire(self, now: float) -> None:
+        # Touching moves a session to the end with a fresh TTL, so expiry
+        # times increase along the LRU order and expired sessions sit in front.
+        sessions = self._sessions
+        while sessions:
+            oldest = next(iter(sessions.values()))
+            if oldest.expires_at > now:
+                break
+            sessions.popitem(last=False)
+
+
+def render_turn(user_message: str, assistant_message: str) -> str:
+    return f"User: {user_message}\nAssistant: {assistant_message}\n"
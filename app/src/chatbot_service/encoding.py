@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from typing import Dict
+
+import orjson
+from fastapi.responses import Response
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+class ResponseEncoder:
+    """Encodes ``ChatResponse`` and ``HealthResponse`` bodies without building the models.
+
+    Everything except the reply text depends only on the model name and the
+    offline flag, so those bytes are encoded once per flag value: a chat body
+    is the JSON-escaped reply spliced in front of them and a health body is
+    served as is. Field order matches the schemas.
+    """
+
+    def __init__(self, model: str) -> None:
+        self._chat_suffix: Dict[bool, bytes] = {
+            offline: b',"model":' + orjson.dumps(model) + b',"offline":' + orjson.dumps(offline) + b"}"
+            for offline in (False, True)
+        }
+        self._health: Dict[bool, bytes] = {
+            offline: orjson.dumps({"status": "ok", "model": model, "offline": offline}) for offline in (False, True)
+        }
+
+    def chat(self, text: str, offline: bool) -> Response:
+        return Response(b'{"response":' + orjson.dumps(text) + self._chat_suffix[offline], media_type=JSON_MEDIA_TYPE)
+
+    def health(self, offline: bool) -> Response:
+        return Response(self._health[offline], media_type=JSON_MEDIA_TYPE)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .config import AppSettings, get_settings
+
+_LOGGER = logging.getLogger(__name__)
+
+APP_IMPORT_PATH = "chatbot_service.main:app"
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def cpu_quota(cgroup_root: Path = CGROUP_ROOT) -> Optional[float]:
+    """Return the container CPU limit in cores, or ``None`` when unlimited.
+
+    Reads ``cpu.max`` (cgroup v2) and falls back to ``cpu.cfs_quota_us`` /
+    ``cpu.cfs_period_us`` (cgroup v1).
+    """
+
+    try:
+        quota, period = (cgroup_root / "cpu.max").read_text().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    for directory in (cgroup_root / "cpu", cgroup_root / "cpu,cpuacct"):
+        try:
+            quota_us = int((directory / "cpu.cfs_quota_us").read_text())
+            period_us = int((directory / "cpu.cfs_period_us").read_text())
+        except (OSError, ValueError):
+            continue
+        return None if quota_us <= 0 or period_us <= 0 else quota_us / period_us
+    return None
+
+
+def available_cpus(cgroup_root: Path = CGROUP_ROOT) -> int:
+    """CPUs this process may actually use: its affinity mask capped by the cgroup quota."""
+
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - not available on macOS/Windows
+        cpus = os.cpu_count() or 1
+    quota = cpu_quota(cgroup_root)
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def worker_count(settings: AppSettings, cgroup_root: Path = CGROUP_ROOT) -> int:
+    """Workers to fork: ``SERVER_WORKERS`` when pinned, otherwise derived.
+
+    Each worker holds its own copy of in-memory state, so the derived count is
+    one per usable CPU only when rate limits live in a shared backend and a
+    single worker otherwise. Conversation memory only lives in the worker
+    that served the turn, so it requires a single worker.
+    """
+
+    if settings.conversation_memory_enabled:
+        if settings.server_workers > 1:
+            raise ValueError("CONVERSATION_MEMORY_ENABLED keeps history in process memory and requires SERVER_WORKERS=1")
+        return 1
+    if settings.server_workers > 0:
+        return settings.server_workers
+    return available_cpus(cgroup_root) if settings.rate_limit_backend == "redis" else 1
+
+
+def server_options(settings: AppSettings, cgroup_root: Path = CGROUP_ROOT) -> Dict[str, Any]:
+    """Keyword arguments for :func:`uvicorn.run` derived from ``settings``.
+
+    Each worker process imports the app and runs its startup hooks (including
+    the warm-up) before uvicorn starts accepting connections on the shared
+    socket. On SIGTERM in-flight requests get ``server_graceful_timeout_seconds``
+    to finish before the worker exits.
+    """
+
+    return {
+        "host": settings.server_host,
+        "port": settings.server_port,
+        "workers": worker_count(settings, cgroup_root),
+        "loop": settings.server_loop,
+        "http": settings.server_http,
+        "backlog": settings.server_backlog,
+        "timeout_keep_alive": settings.server_keep_alive_seconds,
+        "limit_concurrency": settings.server_limit_concurrency,
+        "timeout_graceful_shutdown": settings.server_graceful_timeout_seconds,
+        "log_level": settings.log_level.lower(),
+    }
+
+
+def run(settings: Optional[AppSettings] = None) -> None:
+    import uvicorn
+
+    settings = settings or get_settings()
+    options = server_options(settings)
+    if options["workers"] > 1 and settings.rate_limit_backend == "memory":
+        _LOGGER.warning(
+            "Running %s workers with RATE_LIMIT_BACKEND=memory: each worker enforces its own limits",
+            options["workers"],
+        )
+    _LOGGER.info("Starting %s worker(s) on %s:%s", options["workers"], options["host"], options["port"])
+    uvicorn.run(APP_IMPORT_PATH, **options)
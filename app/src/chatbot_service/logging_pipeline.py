@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Protocol, TextIO
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import LOG_RECORDS_DROPPED
+
+if TYPE_CHECKING:
+    from .config import AppSettings
+
+_LOGGER = logging.getLogger(__name__)
+ACCESS_LOGGER = logging.getLogger("chatbot_service.access")
+
+_request_fields: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_fields", default=None)
+_RESERVED_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message"}
+
+
+def annotate(**fields: Any) -> None:
+    """Attach structured fields to the access log entry of the current request, if any."""
+
+    current = _request_fields.get()
+    if current is not None:
+        current.update(fields)
+
+
+class LogSink(Protocol):
+    def write(self, entries: List[Dict[str, Any]]) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class StreamSink:
+    """JSON lines on a text stream; on Cloud Run stdout is ingested as structured logs."""
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        self._stream = stream
+
+    def write(self, entries: List[Dict[str, Any]]) -> None:
+        stream = self._stream or sys.stdout
+        stream.write("".join(json.dumps(entry, default=str) + "\n" for entry in entries))
+        stream.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class FileSink:
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._handle: Optional[TextIO] = None
+
+    def write(self, entries: List[Dict[str, Any]]) -> None:
+        if self._handle is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = self._path.open("a", encoding="utf-8")
+        self._handle.write("".join(json.dumps(entry, default=str) + "\n" for entry in entries))
+        self._handle.flush()
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class CloudLoggingSink:
+    """Ships each batch with a single Cloud Logging API call.
+
+    The client library is imported on the shipping thread when the first
+    batch is written, never on the request path.
+    """
+
+    def __init__(self, *, project: str, log_name: str) -> None:
+        self._project = project
+        self._log_name = log_name
+        self._logger: Any = None
+
+    def write(self, entries: List[Dict[str, Any]]) -> None:
+        if self._logger is None:
+            import google.cloud.logging
+
+            self._logger = google.cloud.logging.Client(project=self._project).logger(self._log_name)
+        batch = self._logger.batch()
+        for entry in entries:
+            payload = dict(entry)
+            batch.log_struct(payload, severity=payload.pop("severity", "DEFAULT"))
+        batch.commit()
+
+    def close(self) -> None:
+        pass
+
+
+class LogPipeline:
+    """Non-blocking log handler feeding a background shipping thread.
+
+    ``handler`` only appends the record to a bounded buffer; when the buffer
+    holds ``max_buffer`` records the oldest one is dropped and counted. The
+    shipper thread writes batches of up to ``batch_size`` entries to ``sink``
+    as soon as a batch is full or ``flush_interval`` seconds after the first
+    record of a partial batch arrived, so a slow sink never delays callers.
+    """
+
+    def __init__(
+        self, sink: LogSink, *, max_buffer: int = 10_000, batch_size: int = 100, flush_interval: float = 1.0
+    ) -> None:
+        self._sink = sink
+        self._buffer: Deque[logging.LogRecord] = deque()
+        self._max_buffer = max(1, max_buffer)
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = flush_interval
+        self._condition = threading.Condition()
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+        self._dropped = LOG_RECORDS_DROPPED.labels("buffer_full")
+        self._failed = LOG_RECORDS_DROPPED.labels("sink_error")
+        self.handler = _PipelineHandler(self)
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._ship, name="log-shipper", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush what is buffered and stop the shipper."""
+
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._sink.close()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        with self._condition:
+            if len(self._buffer) >= self._max_buffer:
+                self._buffer.popleft()
+                self._dropped.inc()
+            self._buffer.append(record)
+            if len(self._buffer) == 1 or len(self._buffer) >= self._batch_size:
+                self._condition.notify()
+
+    def _ship(self) -> None:
+        while True:
+            with self._condition:
+                deadline: Optional[float] = None
+                while not self._closing and len(self._buffer) < self._batch_size:
+                    if self._buffer and deadline is None:
+                        deadline = time.monotonic() + self._flush_interval
+                    if deadline is not None and time.monotonic() >= deadline:
+                        break
+                    self._condition.wait(None if deadline is None else deadline - time.monotonic())
+                count = min(len(self._buffer), self._batch_size)
+                batch = [self._buffer.popleft() for _ in range(count)]
+                done = self._closing and not self._buffer
+            if batch:
+                self._write(batch)
+            if done:
+                return
+
+    def _write(self, batch: List[logging.LogRecord]) -> None:
+        try:
+            self._sink.write([_to_entry(record) for record in batch])
+        except Exception:
+            self._failed.inc(len(batch))
+            traceback.print_exc(file=sys.stderr)
+
+
+class _PipelineHandler(logging.Handler):
+    def __init__(self, pipeline: LogPipeline) -> None:
+        super().__init__()
+        self._pipeline = pipeline
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            # Resolve the message (and traceback) now: args and frames may change after emit returns.
+            record = copy.copy(record)
+            record.message = record.getMessage()
+            if record.exc_info:
+                record.exc_text = "".join(traceback.format_exception(*record.exc_info))
+            record.msg, record.args, record.exc_info = record.message, None, None
+            self._pipeline.enqueue(record)
+        except Exception:
+            self.handleError(record)
+
+
+def _to_entry(record: logging.LogRecord) -> Dict[str, Any]:
+    entry: Dict[str, Any] = {
+        "severity": record.levelname,
+        "message": record.message,
+        "logger": record.name,
+        "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+    }
+    if record.exc_text:
+        entry["exception"] = record.exc_text
+    for name, value in vars(record).items():
+        if name not in _RESERVED_ATTRIBUTES:
+            entry[name] = value
+    return entry
+
+
+class RequestLogMiddleware:
+    """ASGI middleware emitting one structured access log entry per request.
+
+    Handlers add fields such as the rate-limit decision or cache outcome via
+    :func:`annotate`; latency, status and route are added here.
+    """
+
+    def __init__(self, app: ASGIApp, *, exclude_paths: tuple = ("/metrics", "/health")) -> None:
+        self.app = app
+        self._exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self._exclude_paths or not ACCESS_LOGGER.isEnabledFor(
+            logging.INFO
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        fields: Dict[str, Any] = {"method": scope["method"], "path": scope["path"], "status": 500}
+        token = _request_fields.set(fields)
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                fields["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_fields.reset(token)
+            fields["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            route = scope.get("route")
+            fields["route"] = getattr(route, "path", None) or "unmatched"
+            ACCESS_LOGGER.info("%s %s %s", fields["method"], fields["path"], fields["status"], extra=fields)
+
+
+def build_log_pipeline(settings: AppSettings) -> Optional[LogPipeline]:
+    """Return the pipeline for ``LOG_SINK``, or ``None`` for plain standard logging."""
+
+    sink_name = settings.log_sink
+    if sink_name == "auto":
+        sink_name = "std" if settings.offline_mode or not settings.project_id else "cloud"
+
+    sink: LogSink
+    if sink_name == "std":
+        return None
+    if sink_name == "stdout":
+        sink = StreamSink()
+    elif sink_name == "file":
+        if not settings.log_file:
+            raise ValueError("LOG_FILE must be set when LOG_SINK=file")
+        sink = FileSink(Path(settings.log_file))
+    elif sink_name == "cloud":
+        sink = CloudLoggingSink(project=settings.project_id, log_name=settings.log_name)
+    else:
+        raise ValueError(f"Unknown log sink: {settings.log_sink}")
+
+    return LogPipeline(
+        sink,
+        max_buffer=settings.log_buffer_size,
+        batch_size=settings.log_batch_size,
+        flush_interval=settings.log_flush_interval_seconds,
+    )
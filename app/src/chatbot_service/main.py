@@ -1,73 +1,389 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
-from typing import Optional
+import math
+from functools import partial
+from typing import Any, AsyncIterator, Coroutine, List, Optional, Set
 
 from fastapi import Depends, FastAPI, HTTPException, Request, status
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    ORJSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 
+from .admission import build_admission_controller
+from .bulk import (
+    NDJSON_MEDIA_TYPE,
+    BatchJob,
+    BatchJobLimitError,
+    BatchJobStore,
+    ndjson,
+    parse_batch,
+    run_batch,
+)
+from .concurrency import ModelOverloadedError, ModelTimeoutError
 from .config import AppSettings, get_settings
-from .rate_limiter import RateLimiter
-from .schemas import ChatRequest, ChatResponse, HealthResponse
+from .encoding import ResponseEncoder
+from .logging_pipeline import RequestLogMiddleware, annotate, build_log_pipeline
+from .metrics import (
+    CIRCUIT_STATE,
+    CONTENT_TYPE,
+    EXECUTOR_LIMIT,
+    EXECUTOR_STATE,
+    RATE_LIMIT_TRACKED_KEYS,
+    REGISTRY,
+    RESPONSE_CACHE_EVENTS,
+    SEMANTIC_CACHE_EVENTS,
+    MetricsMiddleware,
+)
+from .resilience import CircuitBreaker, CircuitOpenError
+from .schemas import (
+    BatchJobResponse,
+    CacheStatsResponse,
+    ChatRequest,
+    ChatResponse,
+    HealthResponse,
+)
 from .security import build_auth_verifier
 from .vertex_client import VertexAIClient
 
 _LOGGER = logging.getLogger(__name__)
+_BACKGROUND_TASKS: Set[asyncio.Task[None]] = set()
 
 settings: AppSettings = get_settings()
 vertex_client = VertexAIClient(settings)
-rate_limiter = RateLimiter(
-    max_requests=settings.rate_limit_max_requests,
-    window_seconds=settings.rate_limit_window_seconds,
-)
+admission = build_admission_controller(settings)
+log_pipeline = build_log_pipeline(settings)
 auth_dependency = build_auth_verifier(
     audience=settings.auth_audience or None,
     require_auth=settings.require_auth,
+    token_cache_size=settings.auth_token_cache_size,
+)
+encoder = ResponseEncoder(settings.vertex_model)
+batch_jobs = BatchJobStore(
+    directory=settings.batch_job_dir,
+    max_jobs=settings.batch_max_jobs,
+    ttl_seconds=settings.batch_job_ttl_seconds,
 )
 
 app = FastAPI(
     title="Secure Chatbot API",
     version="0.1.0",
     description="Inference gateway for the Vertex AI powered chatbot.",
+    default_response_class=ORJSONResponse,
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestLogMiddleware)
+
+RATE_LIMIT_TRACKED_KEYS.set_function(lambda: admission.tracked_keys)
+EXECUTOR_LIMIT.set_function(lambda: vertex_client.executor.limit)
+EXECUTOR_STATE.set_function(lambda: vertex_client.executor.in_flight, "in_flight")
+EXECUTOR_STATE.set_function(lambda: vertex_client.executor.waiting, "waiting")
+if vertex_client.breaker is not None:
+    _breaker = vertex_client.breaker
+    CIRCUIT_STATE.set_function(lambda: CircuitBreaker.STATES.index(_breaker.state))
+if vertex_client.cache_stats is not None:
+    for _outcome in ("hits", "misses", "coalesced", "evictions"):
+        RESPONSE_CACHE_EVENTS.set_function(partial(getattr, vertex_client.cache_stats, _outcome), _outcome)
+if vertex_client.semantic_cache_stats is not None:
+    for _outcome in ("hits", "misses", "evictions"):
+        SEMANTIC_CACHE_EVENTS.set_function(partial(getattr, vertex_client.semantic_cache_stats, _outcome), _outcome)
 
 
 @app.on_event("startup")
 async def setup_logging() -> None:
-    """Route logs to Cloud Logging when available, otherwise use std logging."""
+    """Ship logs in batches through the pipeline for ``LOG_SINK``, otherwise use std logging."""
 
-    if settings.offline_mode or not settings.project_id:
+    if log_pipeline is None:
         logging.basicConfig(level=settings.log_level)
-        _LOGGER.info("Using standard logging (Cloud Logging disabled)")
+        _LOGGER.info("Using standard logging (log pipeline disabled)")
         return
+    root = logging.getLogger()
+    root.setLevel(settings.log_level)
+    root.addHandler(log_pipeline.handler)
+    log_pipeline.start()
+    _LOGGER.info("Shipping logs in batches (LOG_SINK=%s)", settings.log_sink)
 
-    try:
-        import google.cloud.logging  # type: ignore
 
-        client = google.cloud.logging.Client(project=settings.project_id)
-        client.setup_logging()
-        _LOGGER.info("Cloud Logging configured")
-    except Exception as exc:  # pragma: no cover - best effort logging
-        logging.basicConfig(level=settings.log_level)
-        _LOGGER.warning("Falling back to standard logging: %s", exc)
+@app.on_event("shutdown")
+async def flush_logs() -> None:
+    if log_pipeline is not None:
+        await asyncio.to_thread(log_pipeline.stop)
+
+
+@app.on_event("shutdown")
+async def cancel_batch_jobs() -> None:
+    await batch_jobs.close()
+
+
+@app.on_event("startup")
+async def warm_up() -> None:
+    """Initialise the model client and auth key cache ahead of the first request.
+
+    ``SERVER_WARMUP=blocking`` finishes before the worker accepts traffic,
+    ``background`` lets it start listening first and ``off`` leaves both to
+    the first request that needs them.
+    """
+
+    if settings.server_warmup != "off":
+        await _run_startup_step(_warm_up())
+
+
+async def _warm_up() -> None:
+    results = await asyncio.gather(vertex_client.warm_up(), auth_dependency.warm_up(), return_exceptions=True)
+    for component, result in zip(("vertex client", "auth certificates"), results):
+        if isinstance(result, Exception):
+            _LOGGER.warning("Warm-up of %s failed: %s", component, result)
+
+
+async def _run_startup_step(step: Coroutine[Any, Any, None]) -> None:
+    """Await ``step`` now, or run it once the server is listening when warming up in the background."""
+
+    if settings.server_warmup != "background":
+        await step
+        return
+    task = asyncio.get_running_loop().create_task(step)
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+
+
+@app.exception_handler(ModelOverloadedError)
+async def model_overloaded_handler(_request: Request, exc: ModelOverloadedError) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Model capacity exhausted"},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(_request: Request, exc: CircuitOpenError) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Model temporarily unavailable"},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
+@app.exception_handler(ModelTimeoutError)
+async def model_timeout_handler(_request: Request, _exc: ModelTimeoutError) -> JSONResponse:
+    return JSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT, content={"detail": "Model call timed out"})
 
 
 @app.get("/health", response_model=HealthResponse, tags=["meta"])
-async def health() -> HealthResponse:
-    return HealthResponse(status="ok", model=settings.vertex_model, offline=vertex_client.offline_mode)
+async def health() -> Response:
+    return encoder.health(vertex_client.offline_mode)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/cache/stats", response_model=CacheStatsResponse, tags=["meta"])
+async def cache_stats() -> CacheStatsResponse:
+    stats = vertex_client.cache_stats
+    if stats is None:
+        return CacheStatsResponse(enabled=False)
+    return CacheStatsResponse(enabled=True, **stats.as_dict())
+
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def _caller(request: Request, claims: Optional[dict]) -> str:
+    return (claims or {}).get("sub") or _client_ip(request)
+
+
+async def _enforce_rate_limit(
+    request: Request, claims: Optional[dict], identity: Optional[str] = None, weight: int = 1
+) -> None:
+    """Charge ``weight`` tokens against the quota of the caller's priority class.
+
+    Authenticated callers are keyed by subject, anonymous ones by ``identity``
+    (the session id) or client IP. A rejection's ``Retry-After`` is when the
+    caller's bucket will hold enough tokens again.
+    """
+
+    priority = admission.classify(claims)
+    grant = await admission.admit(priority, (claims or {}).get("sub") or identity or _client_ip(request), weight)
+    annotate(rate_limit="allowed" if grant.granted else "rejected", priority=priority.name.lower())
+    if not grant.granted:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(max(1, math.ceil(grant.retry_after)))},
+        )
+
+
+def _conversation_key(payload: ChatRequest, claims: Optional[dict]) -> Optional[str]:
+    """Scope server-side history to the caller so session ids cannot be read across identities."""
+
+    if not payload.session_id:
+        return None
+    subject = (claims or {}).get("sub")
+    return f"{subject}:{payload.session_id}" if subject else payload.session_id
 
 
 @app.post("/chat", response_model=ChatResponse, tags=["chat"])
 async def chat(
     payload: ChatRequest,
     request: Request,
-    _claims: Optional[dict] = Depends(auth_dependency),
-) -> ChatResponse:
-    client_ip = request.client.host if request.client else "unknown"
-    identity = payload.session_id or client_ip
+    claims: Optional[dict] = Depends(auth_dependency),
+) -> Response:
+    # Returning a Response skips FastAPI's re-validation and generic encoding
+    # of the response model; ``response_model`` still documents the schema.
+    await _enforce_rate_limit(request, claims, payload.session_id)
+    response_text = await vertex_client.generate_response(
+        payload.message, payload.context, _conversation_key(payload, claims)
+    )
+    return encoder.chat(response_text, vertex_client.offline_mode)
+
+
+async def _respond(payload: ChatRequest, claims: Optional[dict]) -> ChatResponse:
+    response_text = await vertex_client.generate_response(
+        payload.message, payload.context, _conversation_key(payload, claims)
+    )
+    return ChatResponse.model_construct(
+        response=response_text, model=settings.vertex_model, offline=vertex_client.offline_mode
+    )
+
+
+async def _admit_batch(request: Request, claims: Optional[dict]) -> List[ChatRequest]:
+    """Validate a batch body and charge the caller one rate limit token per ``BATCH_ITEMS_PER_TOKEN`` items."""
+
+    items = parse_batch(
+        await request.body(), request.headers.get("content-type", ""), max_items=settings.batch_max_items
+    )
+    weight = math.ceil(len(items) / max(1, settings.batch_items_per_token))
+    if weight > admission.max_weight(admission.classify(claims)):
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Batch exceeds the rate limit burst"
+        )
+    annotate(batch_items=len(items))
+    await _enforce_rate_limit(request, claims, _caller(request, claims), weight)
+    return items
+
+
+@app.post("/chat/batch", tags=["chat"])
+async def chat_batch(
+    request: Request,
+    claims: Optional[dict] = Depends(auth_dependency),
+) -> StreamingResponse:
+    """Answer a batch of chat requests, streaming one NDJSON result per line as each finishes.
+
+    The body is ``{"requests": [...]}`` JSON or an NDJSON upload with one
+    request per line. Each result carries the ``index`` of its request and
+    an HTTP ``status``; failed items do not fail the batch.
+    """
+
+    items = await _admit_batch(request, claims)
+    results = run_batch(items, partial(_respond, claims=claims), concurrency=settings.batch_concurrency)
+    return StreamingResponse((ndjson(result) async for result in results), media_type=NDJSON_MEDIA_TYPE)
+
+
+@app.post(
+    "/chat/jobs", response_model=BatchJobResponse, status_code=status.HTTP_202_ACCEPTED, tags=["chat"]
+)
+async def create_batch_job(
+    request: Request,
+    claims: Optional[dict] = Depends(auth_dependency),
+) -> BatchJobResponse:
+    """Run a batch (same body as ``/chat/batch``) in the background and collect its results later."""
+
+    items = await _admit_batch(request, claims)
+    try:
+        job = batch_jobs.submit(
+            _caller(request, claims), items, partial(_respond, claims=claims), concurrency=settings.batch_concurrency
+        )
+    except BatchJobLimitError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many batch jobs") from None
+    return _job_response(job)
+
+
+@app.get("/chat/jobs/{job_id}", response_model=BatchJobResponse, tags=["chat"])
+async def get_batch_job(
+    job_id: str,
+    request: Request,
+    claims: Optional[dict] = Depends(auth_dependency),
+) -> BatchJobResponse:
+    return _job_response(_owned_job(job_id, request, claims))
+
+
+@app.get("/chat/jobs/{job_id}/results", response_class=FileResponse, tags=["chat"])
+async def get_batch_job_results(
+    job_id: str,
+    request: Request,
+    claims: Optional[dict] = Depends(auth_dependency),
+) -> FileResponse:
+    """Download the NDJSON results of a finished job."""
+
+    job = _owned_job(job_id, request, claims)
+    if job.status == "running":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Batch job is still running")
+    return FileResponse(job.path, media_type=NDJSON_MEDIA_TYPE)
+
+
+def _owned_job(job_id: str, request: Request, claims: Optional[dict]) -> BatchJob:
+    job = batch_jobs.get(job_id, _caller(request, claims))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch job not found")
+    return job
+
+
+def _job_response(job: BatchJob) -> BatchJobResponse:
+    return BatchJobResponse(
+        id=job.id, status=job.status, total=job.total, completed=job.completed, failed=job.failed
+    )
+
+
+@app.post("/chat/stream", tags=["chat"])
+async def chat_stream(
+    payload: ChatRequest,
+    request: Request,
+    claims: Optional[dict] = Depends(auth_dependency),
+) -> StreamingResponse:
+    """Stream the model response as server-sent events.
+
+    Each ``message`` event carries a ``delta`` text fragment and a final
+    ``done`` event carries the model metadata. The upstream stream is
+    cancelled when the client disconnects.
+    """
+
+    await _enforce_rate_limit(request, claims, payload.session_id)
+
+    # Pull the first chunk before committing to a 200 so admission failures
+    # still surface as 503/504 through the exception handlers.
+    stream = vertex_client.stream_response(
+        payload.message, payload.context, _conversation_key(payload, claims)
+    )
+    first_chunk = await anext(stream, None)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            if first_chunk is not None:
+                yield _sse("message", {"delta": first_chunk})
+            async for chunk in stream:
+                yield _sse("message", {"delta": chunk})
+        except Exception:
+            _LOGGER.exception("Streaming generation failed")
+            yield _sse("error", {"detail": "Generation failed"})
+            return
+        yield _sse("done", {"model": settings.vertex_model, "offline": vertex_client.offline_mode})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    allowed = await rate_limiter.allow(identity)
-    if not allowed:
-        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Rate limit exceeded")
 
-    response_text = await vertex_client.generate_response(payload.message, payload.context)
-    return ChatResponse(response=response_text, model=settings.vertex_model, offline=vertex_client.offline_mode)
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(f"{line}\n" for line in self.samples())
+
+
+class _ScalarChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _ScalarMetric(_Metric):
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._children: Dict[Tuple[str, ...], _ScalarChild] = {}
+        self._callbacks: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def labels(self, *values: str) -> _ScalarChild:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, _ScalarChild())
+        return child
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def set_function(self, function: Callable[[], float], *values: str) -> None:
+        """Read the value from ``function`` at scrape time instead of storing it."""
+
+        self._callbacks[values] = function
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._children.items():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+        for values, function in self._callbacks.items():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(function())}"
+
+
+class Counter(_ScalarMetric):
+    kind = "counter"
+
+
+class Gauge(_ScalarMetric):
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+
+class HistogramChild:
+    """Fixed bucket array; ``observe`` is a bisect and two additions."""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts: List[int] = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._bounds = tuple(sorted(buckets))
+        self._children: Dict[Tuple[str, ...], HistogramChild] = {}
+
+    def labels(self, *values: str) -> HistogramChild:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, HistogramChild(self._bounds))
+        return child
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self._bounds + (float("inf"),), child.counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames + ("le",), values + (le,))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.total)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self._metrics.values())
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = Histogram(
+    "chatbot_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = Gauge("chatbot_requests_in_flight", "HTTP requests currently being served.")
+PHASE_LATENCY = Histogram(
+    "chatbot_phase_duration_seconds",
+    "Time spent in each hot-path phase (auth, rate_limit, executor_queue, predict).",
+    ("phase",),
+)
+RATE_LIMIT_REJECTIONS = Counter("chatbot_rate_limit_rejections_total", "Requests rejected by the rate limiter.")
+RATE_LIMIT_TRACKED_KEYS = Gauge("chatbot_rate_limit_tracked_keys", "Keys currently tracked by the rate limiter.")
+EXECUTOR_STATE = Gauge(
+    "chatbot_executor_calls", "Model calls in the prediction executor by state.", ("state",)
+)
+RESPONSE_CACHE_EVENTS = Counter(
+    "chatbot_response_cache_events_total", "Response cache lookups by outcome.", ("outcome",)
+)
+SEMANTIC_CACHE_EVENTS = Counter(
+    "chatbot_semantic_cache_events_total", "Semantic (near-duplicate) cache lookups by outcome.", ("outcome",)
+)
+LOG_RECORDS_DROPPED = Counter(
+    "chatbot_log_records_dropped_total", "Log records dropped before reaching the sink.", ("reason",)
+)
+UPSTREAM_RETRIES = Counter("chatbot_upstream_retries_total", "Model calls retried after a retryable error.")
+UPSTREAM_HEDGES = Counter(
+    "chatbot_upstream_hedges_total", "Hedged model attempts launched and won.", ("outcome",)
+)
+ADMISSION_SHED = Counter(
+    "chatbot_admission_shed_total", "Model calls shed by the prediction executor, by priority.", ("priority",)
+)
+EXECUTOR_LIMIT = Gauge("chatbot_executor_concurrency_limit", "Current (adaptive) limit on concurrent model calls.")
+CIRCUIT_STATE = Gauge(
+    "chatbot_circuit_breaker_state", "Model circuit breaker state (0 closed, 1 half-open, 2 open)."
+)
+CIRCUIT_REJECTIONS = Counter(
+    "chatbot_circuit_breaker_rejections_total",
+    "Model calls short-circuited by the open breaker, by action (fallback or fail).",
+    ("action",),
+)
+
+for _metric in (
+    REQUEST_LATENCY,
+    REQUESTS_IN_FLIGHT,
+    PHASE_LATENCY,
+    RATE_LIMIT_REJECTIONS,
+    RATE_LIMIT_TRACKED_KEYS,
+    EXECUTOR_STATE,
+    RESPONSE_CACHE_EVENTS,
+    SEMANTIC_CACHE_EVENTS,
+    LOG_RECORDS_DROPPED,
+    UPSTREAM_RETRIES,
+    UPSTREAM_HEDGES,
+    ADMISSION_SHED,
+    EXECUTOR_LIMIT,
+    CIRCUIT_STATE,
+    CIRCUIT_REJECTIONS,
+):
+    REGISTRY.register(_metric)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests.
+
+    Latency is labelled with the matched route template rather than the raw
+    path so label cardinality stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp, *, exclude_paths: Sequence[str] = ("/metrics",)) -> None:
+        self.app = app
+        self._exclude_paths = frozenset(exclude_paths)
+        self._in_flight = REQUESTS_IN_FLIGHT.labels()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self._exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self._in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._in_flight.dec()
+            route = scope.get("route")
+            template: Optional[str] = getattr(route, "path", None)
+            REQUEST_LATENCY.labels(scope["method"], template or "unmatched", str(status_code)).observe(
+                time.perf_counter() - start
+            )
@@ -1,33 +1,281 @@
-﻿from __future__ import annotations
+from __future__ import annotations
 
+import logging
+import math
+import threading
 import time
-from asyncio import Lock
-from collections import deque
-from typing import Deque, Dict
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
 
+from .metrics import PHASE_LATENCY, RATE_LIMIT_REJECTIONS
 
-class RateLimiter:
-    """Simple in-memory sliding window rate limiter."""
+if TYPE_CHECKING:
+    from .config import AppSettings
+
+_LOGGER = logging.getLogger(__name__)
+_RATE_LIMIT_PHASE = PHASE_LATENCY.labels("rate_limit")
+_REJECTIONS = RATE_LIMIT_REJECTIONS.labels()
+
+
+def gcra(
+    tat: float,
+    now: float,
+    emission_interval: float,
+    burst_tolerance: float,
+    requested: int = 1,
+    minimum: int = 1,
+) -> Tuple[int, float]:
+    """Apply the generic cell rate algorithm to a stored theoretical arrival time.
+
+    Returns how many of ``requested`` cells conform together with the new
+    theoretical arrival time; fewer than ``minimum`` conforming cells grant
+    none. A key whose ``tat`` is not in the future is indistinguishable from
+    a key that was never seen.
+    """
+
+    tat = max(tat, now)
+    headroom = now + burst_tolerance - tat
+    if headroom < 0:
+        return 0, tat
+    granted = min(requested, int(math.floor(headroom / emission_interval + 1e-9)) + 1)
+    if granted < minimum:
+        return 0, tat
+    return granted, tat + granted * emission_interval
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """A quota of ``max_requests`` per ``window_seconds`` expressed in GCRA terms."""
+
+    max_requests: int
+    window_seconds: float
+
+    def __post_init__(self) -> None:
+        if self.max_requests < 1 or self.window_seconds <= 0:
+            raise ValueError("max_requests and window_seconds must be positive")
+
+    @property
+    def emission_interval(self) -> float:
+        return self.window_seconds / self.max_requests
+
+    @property
+    def burst_tolerance(self) -> float:
+        return self.window_seconds - self.emission_interval
+
+
+class Grant(NamedTuple):
+    granted: int
+    retry_after: float
+
+
+class RateLimitBackend(ABC):
+    """Storage for GCRA state shared by one or more :class:`RateLimiter` instances."""
+
+    @abstractmethod
+    async def acquire(self, key: str, rule: RateLimitRule, requested: int = 1, minimum: int = 1) -> Grant:
+        """Debit up to ``requested`` tokens for ``key`` and report how many were granted.
+
+        Nothing is debited unless at least ``minimum`` tokens are available.
+        """
+
+    @abstractmethod
+    async def reset(self, key: str) -> None:
+        """Forget all state for ``key``."""
+
+    @property
+    def tracked_keys(self) -> int:
+        return 0
+
+
+class _Shard:
+    __slots__ = ("lock", "tats", "next_sweep")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.tats: Dict[str, float] = {}
+        self.next_sweep = 0.0
+
+
+class InMemoryBackend(RateLimitBackend):
+    """Sharded per-process GCRA store with bounded memory.
+
+    Each key is tracked as a single theoretical arrival time. Keys are spread
+    over ``shards`` independently locked buckets; idle keys are swept once per
+    ``sweep_interval`` and the least recently used key is evicted when a shard
+    exceeds its share of ``max_keys``.
+    """
+
+    def __init__(self, *, shards: int = 16, max_keys: int = 100_000, sweep_interval: float = 60.0) -> None:
+        self._shards: List[_Shard] = [_Shard() for _ in range(max(1, shards))]
+        self._keys_per_shard = max(1, math.ceil(max_keys / len(self._shards)))
+        self._sweep_interval = sweep_interval
 
-    def __init__(self, *, max_requests: int, window_seconds: int) -> None:
-        self._max_requests = max_requests
-        self._window_seconds = window_seconds
-        self._requests: Dict[str, Deque[float]] = {}
-        self._lock = Lock()
+    @property
+    def tracked_keys(self) -> int:
+        return sum(len(shard.tats) for shard in self._shards)
 
-    async def allow(self, key: str) -> bool:
+    async def acquire(self, key: str, rule: RateLimitRule, requested: int = 1, minimum: int = 1) -> Grant:
+        return self.take(key, rule, requested, minimum)
+
+    def take(self, key: str, rule: RateLimitRule, requested: int = 1, minimum: int = 1) -> Grant:
         now = time.monotonic()
-        async with self._lock:
-            bucket = self._requests.setdefault(key, deque())
-            while bucket and now - bucket[0] > self._window_seconds:
-                bucket.popleft()
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            tats = shard.tats
+            if now >= shard.next_sweep:
+                self._sweep(shard, now)
+
+            granted, tat = gcra(
+                tats.pop(key, now), now, rule.emission_interval, rule.burst_tolerance, requested, minimum
+            )
+            tats[key] = tat
+            if len(tats) > self._keys_per_shard:
+                del tats[next(iter(tats))]
+        retry_after = 0.0 if granted else tat + (minimum - 1) * rule.emission_interval - rule.burst_tolerance - now
+        return Grant(granted, retry_after)
+
+    async def reset(self, key: str) -> None:
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            shard.tats.pop(key, None)
+
+    def _sweep(self, shard: _Shard, now: float) -> None:
+        idle = [key for key, tat in shard.tats.items() if tat <= now]
+        for key in idle:
+            del shard.tats[key]
+        shard.next_sweep = now + self._sweep_interval
+
+
+class RateLimiter:
+    """GCRA rate limiter admitting ``max_requests`` per ``window_seconds`` per key.
+
+    A key may burst ``max_requests`` back-to-back and is then admitted once
+    every ``window_seconds / max_requests``. State lives in ``backend``
+    (sharded process memory by default). For remote backends ``prefetch``
+    tokens are debited per round trip and spent locally, and ``fail_open``
+    decides whether requests pass while the backend is unreachable. A call
+    weighing ``weight`` tokens (a batch) is admitted all-or-nothing.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_requests: int,
+        window_seconds: int,
+        shards: int = 16,
+        max_keys: int = 100_000,
+        backend: Optional[RateLimitBackend] = None,
+        prefetch: int = 1,
+        fail_open: bool = True,
+    ) -> None:
+        self._rule = RateLimitRule(max_requests=max_requests, window_seconds=window_seconds)
+        self._backend = backend or InMemoryBackend(
+            shards=shards, max_keys=max_keys, sweep_interval=window_seconds
+        )
+        self._prefetch = max(1, prefetch)
+        self._fail_open = fail_open
+        self._max_leases = max_keys
+        self._leases: OrderedDict[str, Tuple[int, float]] = OrderedDict()
+
+    @property
+    def backend(self) -> RateLimitBackend:
+        return self._backend
+
+    @property
+    def rule(self) -> RateLimitRule:
+        return self._rule
+
+    @property
+    def tracked_keys(self) -> int:
+        return self._backend.tracked_keys or len(self._leases)
+
+    async def allow(self, key: str, weight: int = 1) -> bool:
+        return (await self.check(key, weight)).granted > 0
 
-            if len(bucket) >= self._max_requests:
-                return False
+    async def check(self, key: str, weight: int = 1) -> Grant:
+        """Charge ``weight`` tokens to ``key``; a rejection reports when they will be available."""
 
-            bucket.append(now)
-            return True
+        start = time.perf_counter()
+        grant = await (self._check(key) if weight == 1 else self._check_weighted(key, weight))
+        _RATE_LIMIT_PHASE.observe(time.perf_counter() - start)
+        if not grant.granted:
+            _REJECTIONS.inc()
+        return grant
+
+    async def _check(self, key: str) -> Grant:
+        if self._prefetch > 1 and self._spend_lease(key):
+            return Grant(1, 0.0)
+
+        try:
+            grant = await self._backend.acquire(key, self._rule, self._prefetch)
+        except Exception as exc:
+            return self._backend_failed(exc, 1)
+
+        if grant.granted > 1:
+            self._store_lease(key, grant.granted - 1)
+        return Grant(min(grant.granted, 1), grant.retry_after)
+
+    async def _check_weighted(self, key: str, weight: int) -> Grant:
+        try:
+            return await self._backend.acquire(key, self._rule, weight, minimum=weight)
+        except Exception as exc:
+            return self._backend_failed(exc, weight)
+
+    def _backend_failed(self, exc: Exception, weight: int) -> Grant:
+        _LOGGER.warning("Rate limit backend unavailable (fail_open=%s): %s", self._fail_open, exc)
+        return Grant(weight, 0.0) if self._fail_open else Grant(0, self._rule.emission_interval * weight)
 
     async def reset(self, key: str) -> None:
-        async with self._lock:
-            self._requests.pop(key, None)
\ No newline at end of file
+        self._leases.pop(key, None)
+        await self._backend.reset(key)
+
+    def _spend_lease(self, key: str) -> bool:
+        lease = self._leases.get(key)
+        if lease is None:
+            return False
+        tokens, expires_at = lease
+        if time.monotonic() >= expires_at:
+            del self._leases[key]
+            return False
+        if tokens <= 1:
+            del self._leases[key]
+        else:
+            self._leases[key] = (tokens - 1, expires_at)
+        return True
+
+    def _store_lease(self, key: str, tokens: int) -> None:
+        self._leases[key] = (tokens, time.monotonic() + self._rule.window_seconds)
+        self._leases.move_to_end(key)
+        while len(self._leases) > self._max_leases:
+            self._leases.popitem(last=False)
+
+
+def build_rate_limit_backend(settings: AppSettings) -> Optional[RateLimitBackend]:
+    """The shared backend for ``RATE_LIMIT_BACKEND``, or ``None`` for per-limiter process memory."""
+
+    if settings.rate_limit_backend == "redis":
+        from .redis_backend import RedisBackend
+
+        return RedisBackend.from_url(settings.rate_limit_redis_url)
+    if settings.rate_limit_backend != "memory":
+        raise ValueError(f"Unknown rate limit backend: {settings.rate_limit_backend}")
+    return None
+
+
+def build_rate_limiter(
+    settings: AppSettings,
+    *,
+    max_requests: Optional[int] = None,
+    backend: Optional[RateLimitBackend] = None,
+) -> RateLimiter:
+    return RateLimiter(
+        max_requests=max_requests or settings.rate_limit_max_requests,
+        window_seconds=settings.rate_limit_window_seconds,
+        shards=settings.rate_limit_shards,
+        max_keys=settings.rate_limit_max_keys,
+        backend=backend or build_rate_limit_backend(settings),
+        prefetch=settings.rate_limit_prefetch,
+        fail_open=settings.rate_limit_fail_open,
+    )
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from typing import Any
+
+from .rate_limiter import Grant, RateLimitBackend, RateLimitRule
+
+try:
+    from redis import asyncio as redis_asyncio
+except ImportError:  # pragma: no cover - optional dependency
+    redis_asyncio = None  # type: ignore
+
+# Atomically applies GCRA to one key using the server clock, so every replica
+# shares a single timeline. State is one float per key and expires as soon as
+# the key is idle, which is exactly when it becomes equivalent to a new key.
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local minimum = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+  tat = now
+end
+local headroom = now + tolerance - tat
+local granted = 0
+if headroom >= 0 then
+  granted = math.min(requested, math.floor(headroom / interval + 1e-9) + 1)
+end
+if granted < minimum then
+  return {0, string.format('%.6f', (minimum - 1) * interval - headroom)}
+end
+tat = tat + granted * interval
+redis.call('SET', KEYS[1], string.format('%.6f', tat), 'PX', math.ceil((tat - now) * 1000) + 1)
+return {granted, '0'}
+"""
+
+
+class RedisBackend(RateLimitBackend):
+    """Rate limit state shared across replicas through a Redis-protocol server.
+
+    ``client`` only needs ``register_script`` and ``delete`` as provided by
+    ``redis.asyncio.Redis``, which lets tests substitute a local stand-in.
+    """
+
+    def __init__(self, client: Any, *, prefix: str = "chatbot:ratelimit:") -> None:
+        self._client = client
+        self._prefix = prefix
+        self._script = client.register_script(GCRA_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisBackend":
+        if redis_asyncio is None:
+            raise RuntimeError("Install chatbot-service[redis] to use the redis rate limit backend")
+        if not url:
+            raise ValueError("RATE_LIMIT_REDIS_URL must be set for the redis rate limit backend")
+        client = redis_asyncio.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        return cls(client, **kwargs)
+
+    async def acquire(self, key: str, rule: RateLimitRule, requested: int = 1, minimum: int = 1) -> Grant:
+        granted, retry_after = await self._script(
+            keys=[self._prefix + key],
+            args=[rule.emission_interval, rule.burst_tolerance, requested, minimum],
+        )
+        return Grant(int(granted), float(retry_after))
+
+    async def reset(self, key: str) -> None:
+        await self._client.delete(self._prefix + key)
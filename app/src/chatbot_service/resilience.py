@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Optional, TypeVar
+
+from .concurrency import ModelOverloadedError, ModelTimeoutError
+from .metrics import UPSTREAM_HEDGES, UPSTREAM_RETRIES
+
+_LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses carried by google.api_core exceptions (``exc.code``) that are worth another attempt.
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the model while the circuit breaker is open."""
+
+    def __init__(self, message: str, *, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transient upstream failures: timeouts, connection errors and retryable API statuses.
+
+    Local load shedding (:class:`ModelOverloadedError`) is not retried, and
+    these are also the only errors the circuit breaker counts as failures.
+    """
+
+    if isinstance(exc, ModelOverloadedError):
+        return False
+    if isinstance(exc, (ModelTimeoutError, asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(exc, "code", None)
+    return isinstance(code, int) and code in RETRYABLE_STATUS
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with full jitter: attempt ``n`` waits up to ``base * 2**(n-1)``."""
+
+    max_attempts: int = 3
+    base_delay: float = 0.1
+    max_delay: float = 2.0
+
+    def backoff(self, attempt: int, rng: Callable[[], float] = random.random) -> float:
+        return rng() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+
+class CircuitBreaker:
+    """Count-based breaker over the outcomes of the last ``window`` upstream calls.
+
+    Once at least ``min_calls`` outcomes are recorded and the failure rate
+    reaches ``failure_threshold`` the breaker opens and rejects calls for
+    ``reset_timeout`` seconds. It then lets a single probe through
+    (half-open): a success closes it, a failure opens it again. A probe that
+    never reports back is replaced after another ``reset_timeout``.
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+    STATES = (CLOSED, HALF_OPEN, OPEN)
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: float = 0.5,
+        window: int = 20,
+        min_calls: int = 10,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._failure_threshold = failure_threshold
+        self._min_calls = max(1, min(min_calls, window))
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._outcomes: Deque[bool] = deque(maxlen=max(1, window))
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self._reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    @property
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self._reset_timeout - self._clock())
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.OPEN:
+            return False
+        now = self._clock()
+        if self._probe_started is not None and now - self._probe_started < self._reset_timeout:
+            return False
+        self._probe_started = now
+        return True
+
+    def record(self, success: bool) -> None:
+        state = self.state
+        if state == self.HALF_OPEN:
+            if success:
+                self._close()
+            else:
+                self._open()
+            return
+        if state == self.OPEN:
+            return  # a call that started before the breaker opened
+
+        if len(self._outcomes) == self._outcomes.maxlen and not self._outcomes[0]:
+            self._failures -= 1
+        self._outcomes.append(success)
+        self._failures += not success
+        if len(self._outcomes) >= self._min_calls and self._failures / len(self._outcomes) >= self._failure_threshold:
+            _LOGGER.warning(
+                "Opening circuit breaker: %d of the last %d model calls failed", self._failures, len(self._outcomes)
+            )
+            self._open()
+
+    def _open(self) -> None:
+        self._opened_at = self._clock()
+        self._probe_started = None
+        self._outcomes.clear()
+        self._failures = 0
+
+    def _close(self) -> None:
+        _LOGGER.info("Closing circuit breaker after a successful probe")
+        self._opened_at = None
+        self._probe_started = None
+
+
+class HedgeTracker:
+    """Suggests when to hedge: the ``quantile`` of recent successful attempt latencies.
+
+    No delay is suggested until ``min_samples`` latencies are known, and
+    never less than ``min_delay``.
+    """
+
+    def __init__(
+        self, *, quantile: float = 0.95, window: int = 256, min_samples: int = 20, min_delay: float = 0.05
+    ) -> None:
+        self._quantile = quantile
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._min_samples = min_samples
+        self._min_delay = min_delay
+
+    def observe(self, latency: float) -> None:
+        self._latencies.append(latency)
+
+    def delay(self) -> Optional[float]:
+        if len(self._latencies) < self._min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return max(self._min_delay, ordered[min(len(ordered) - 1, int(len(ordered) * self._quantile))])
+
+
+class ResilientCaller:
+    """Runs an upstream call under a deadline with retries, hedging and a circuit breaker.
+
+    ``deadline`` bounds the whole call including backoff; each attempt gets
+    at most ``attempt_timeout`` of what is left (passed to the attempt as
+    its timeout). Retryable failures are retried per ``retry``. With a
+    ``hedge`` tracker, an attempt still running after the tracked p95 gets
+    a second, concurrent attempt when ``can_hedge()`` allows and the first
+    result wins. While ``breaker`` is open :class:`CircuitOpenError` is raised
+    without calling upstream.
+    """
+
+    def __init__(
+        self,
+        *,
+        deadline: float,
+        attempt_timeout: Optional[float] = None,
+        retry: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge: Optional[HedgeTracker] = None,
+        can_hedge: Callable[[], bool] = lambda: True,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self._deadline = deadline
+        self._attempt_timeout = attempt_timeout
+        self._retry = retry or RetryPolicy()
+        self._breaker = breaker
+        self._hedge = hedge
+        self._can_hedge = can_hedge
+        self._rng = rng
+
+    @property
+    def breaker(self) -> Optional[CircuitBreaker]:
+        return self._breaker
+
+    def guard(self) -> None:
+        """Raise :class:`CircuitOpenError` if the breaker does not admit a call now."""
+
+        if self._breaker is not None and not self._breaker.allow():
+            raise CircuitOpenError("Model circuit breaker is open", retry_after=self._breaker.retry_after)
+
+    def record(self, error: Optional[BaseException]) -> None:
+        """Report the outcome of an upstream call made after :meth:`guard`."""
+
+        if self._breaker is None:
+            return
+        if error is None:
+            self._breaker.record(True)
+        elif is_retryable(error):
+            self._breaker.record(False)
+
+    async def call(self, attempt: Callable[[float], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._deadline
+        number = 1
+        while True:
+            self.guard()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise ModelTimeoutError("Model call exceeded its deadline")
+            timeout = min(remaining, self._attempt_timeout or remaining)
+            try:
+                result = await self._attempt(attempt, timeout)
+            except Exception as exc:
+                self.record(exc)
+                if not is_retryable(exc) or number >= self._retry.max_attempts:
+                    raise
+                delay = self._retry.backoff(number, self._rng)
+                if loop.time() + delay >= deadline:
+                    raise
+                _LOGGER.info("Retrying model call (attempt %d) after %s", number + 1, exc)
+                UPSTREAM_RETRIES.inc()
+                await asyncio.sleep(delay)
+                number += 1
+            else:
+                self.record(None)
+                return result
+
+    async def _attempt(self, attempt: Callable[[float], Awaitable[T]], timeout: float) -> T:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        hedge_delay = self._hedge.delay() if self._hedge is not None else None
+        primary = asyncio.ensure_future(attempt(timeout))
+        tasks = {primary}
+        try:
+            if hedge_delay is not None and hedge_delay < timeout:
+                await asyncio.wait(tasks, timeout=hedge_delay)
+                if not primary.done() and self._can_hedge():
+                    UPSTREAM_HEDGES.labels("launched").inc()
+                    tasks.add(asyncio.ensure_future(attempt(timeout - (loop.time() - start))))
+            while True:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    tasks.discard(task)
+                    error = task.exception()
+                    if error is None:
+                        if task is not primary:
+                            UPSTREAM_HEDGES.labels("won").inc()
+                        if self._hedge is not None:
+                            self._hedge.observe(loop.time() - start)
+                        return task.result()
+                    if not tasks:
+                        raise error
+        finally:
+            for task in tasks:
+                task.cancel()
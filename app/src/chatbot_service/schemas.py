@@ -1,6 +1,6 @@
 ﻿from __future__ import annotations
 
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -17,7 +17,36 @@ class ChatResponse(BaseModel):
     offline: bool
 
 
+class ChatBatchRequest(BaseModel):
+    requests: List[ChatRequest] = Field(..., min_length=1)
+
+
+class ChatBatchResult(BaseModel):
+    index: int
+    status: int
+    response: Optional[str] = None
+    model: Optional[str] = None
+    offline: Optional[bool] = None
+    detail: Optional[str] = None
+
+
+class BatchJobResponse(BaseModel):
+    id: str
+    status: str
+    total: int
+    completed: int
+    failed: int
+
+
 class HealthResponse(BaseModel):
     status: str
     model: str
-    offline: bool
\ No newline at end of file
+    offline: bool
+
+
+class CacheStatsResponse(BaseModel):
+    enabled: bool
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
\ No newline at end of file
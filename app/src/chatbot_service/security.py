@@ -1,27 +1,211 @@
 ﻿from __future__ import annotations
 
-from typing import Optional
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
-try:
-    from google.oauth2 import id_token
-    from google.auth.transport import requests as google_requests
-except ImportError:  # pragma: no cover - optional dependency in offline mode
-    id_token = None  # type: ignore
-    google_requests = None  # type: ignore
+from .metrics import PHASE_LATENCY
+
+_LOGGER = logging.getLogger(__name__)
 
 _bearer_scheme = HTTPBearer(auto_error=False)
+_AUTH_PHASE = PHASE_LATENCY.labels("auth")
+
+GOOGLE_OAUTH2_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+_MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+CertFetcher = Callable[[], Tuple[Dict[str, str], float]]
+
+
+@lru_cache(maxsize=None)
+def _google_jwt() -> Any:
+    """Import ``google.auth.jwt`` on first use; ``None`` when google-auth is missing."""
+
+    try:
+        from google.auth import jwt
+    except ImportError:  # pragma: no cover - optional dependency in offline mode
+        return None
+    return jwt
+
+
+class CertificateCache:
+    """In-process cache of Google's token signing certificates.
+
+    Certificates are kept until the ``Cache-Control`` expiry announced by the
+    certs endpoint. Once the remaining lifetime drops below ``refresh_margin``
+    a refresh is started in the background while the current keys keep
+    serving requests, so the request path only waits on the network when the
+    cache is cold or fully expired. After a failed refresh the stale keys are
+    served for ``min_refresh_interval`` before the endpoint is tried again, but
+    never more than ``stale_grace`` past their expiry: a revoked key must not
+    stay trusted for as long as the endpoint is unreachable.
+    """
+
+    def __init__(
+        self,
+        *,
+        fetcher: Optional[CertFetcher] = None,
+        certs_url: str = GOOGLE_OAUTH2_CERTS_URL,
+        refresh_margin: float = 300.0,
+        default_ttl: float = 3600.0,
+        min_refresh_interval: float = 30.0,
+        stale_grace: float = 600.0,
+    ) -> None:
+        self._fetcher = fetcher or self._fetch_from_google
+        self._certs_url = certs_url
+        self._refresh_margin = refresh_margin
+        self._default_ttl = default_ttl
+        self._min_refresh_interval = min_refresh_interval
+        self._stale_grace = stale_grace
+        self._certs: Dict[str, str] = {}
+        self._expires_at = 0.0
+        self._last_refresh = float("-inf")
+        self._last_failure = float("-inf")
+        self._refresh_task: Optional[asyncio.Task[Dict[str, str]]] = None
+        self._transport: Any = None
+
+    @property
+    def expires_at(self) -> float:
+        return self._expires_at
+
+    async def get(self) -> Dict[str, str]:
+        """Return usable certificates, fetching only when none are valid."""
+
+        now = time.monotonic()
+        if self._certs and now < self._expires_at:
+            if now >= self._expires_at - self._refresh_margin:
+                self._start_refresh()
+            return self._certs
+        if self._certs and now - self._last_failure < self._min_refresh_interval and self._usable_stale(now):
+            return self._certs
+        return await self._start_refresh()
+
+    async def get_for_key(self, key_id: Optional[str]) -> Dict[str, str]:
+        """Return certificates containing ``key_id``, refreshing once on rotation."""
+
+        certs = await self.get()
+        if key_id is None or key_id in certs:
+            return certs
+        if time.monotonic() - self._last_refresh < self._min_refresh_interval:
+            return certs
+        return await self._start_refresh()
+
+    def _start_refresh(self) -> asyncio.Future[Dict[str, str]]:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh())
+        return asyncio.shield(self._refresh_task)
+
+    async def _refresh(self) -> Dict[str, str]:
+        loop = asyncio.get_running_loop()
+        self._last_refresh = time.monotonic()
+        try:
+            certs, ttl = await loop.run_in_executor(None, self._fetcher)
+        except Exception:
+            self._last_failure = time.monotonic()
+            if self._certs and self._usable_stale(self._last_failure):
+                _LOGGER.warning("Certificate refresh failed; keeping cached keys", exc_info=True)
+                return self._certs
+            raise
+        self._certs = certs
+        self._expires_at = time.monotonic() + ttl
+        return certs
+
+    def _usable_stale(self, now: float) -> bool:
+        return now < self._expires_at + self._stale_grace
+
+    def _fetch_from_google(self) -> Tuple[Dict[str, str], float]:
+        if self._transport is None:
+            try:
+                from google.auth.transport import requests as google_requests
+            except ImportError as exc:
+                raise RuntimeError("google-auth transport unavailable") from exc
+            self._transport = google_requests.Request()
+        response = self._transport(self._certs_url, method="GET")
+        if response.status != 200:
+            raise RuntimeError(f"Could not fetch certificates at {self._certs_url}")
+        return json.loads(response.data.decode("utf-8")), self._parse_ttl(response.headers)
+
+    def _parse_ttl(self, headers: Dict[str, str]) -> float:
+        lowered = {name.lower(): value for name, value in headers.items()}
+        match = _MAX_AGE_PATTERN.search(lowered.get("cache-control", ""))
+        if not match:
+            return self._default_ttl
+        age = lowered.get("age", "0")
+        return max(0.0, float(match.group(1)) - float(age if age.isdigit() else 0))
+
+
+class TokenCache:
+    """LRU of verified token claims keyed by token hash and bounded by ``exp``."""
+
+    def __init__(self, *, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[bytes, Tuple[dict, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key_for(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, key: bytes) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        claims, expires_at = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return claims
+
+    def put(self, key: bytes, claims: dict) -> None:
+        if self._max_entries <= 0:
+            return
+        self._entries[key] = (claims, float(claims.get("exp", 0)))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
 
 
 class AuthVerifier:
-    """Validates Google-signed identity tokens when authentication is required."""
+    """Validates Google-signed identity tokens when authentication is required.
+
+    Signing keys come from a :class:`CertificateCache` and verified claims are
+    memoised in a :class:`TokenCache`, so a repeat caller costs a hash and a
+    dict lookup. Signature checks on a cache miss are CPU-only once the keys
+    are cached and never perform network I/O on the event loop.
+    """
 
-    def __init__(self, *, audience: Optional[str], require_auth: bool) -> None:
+    def __init__(
+        self,
+        *,
+        audience: Optional[str],
+        require_auth: bool,
+        token_cache_size: int = 1024,
+        certificates: Optional[CertificateCache] = None,
+    ) -> None:
         self._audience = audience
         self._require_auth = require_auth
-        self._request = google_requests.Request() if google_requests else None
+        self._certificates = certificates or CertificateCache()
+        self._tokens = TokenCache(max_entries=token_cache_size)
+
+    async def warm_up(self) -> None:
+        """Load the signing certificates so the first authenticated request does not wait on them."""
+
+        if self._require_auth and _google_jwt() is not None:
+            await self._certificates.get()
 
     async def __call__(
         self, credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer_scheme)
@@ -32,16 +216,47 @@ class AuthVerifier:
         if credentials is None or not credentials.credentials:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing bearer token")
 
-        if id_token is None or self._request is None:
+        if _google_jwt() is None:
             raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Auth libraries unavailable")
 
+        start = time.perf_counter()
+        try:
+            return await self._verify(credentials.credentials)
+        finally:
+            _AUTH_PHASE.observe(time.perf_counter() - start)
+
+    async def _verify(self, token: str) -> dict:
+        jwt = _google_jwt()
+        cache_key = TokenCache.key_for(token)
+        cached = self._tokens.get(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            key_id = jwt.decode_header(token).get("kid")
+        except Exception as exc:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid identity token") from exc
+
+        try:
+            certs = await self._certificates.get_for_key(key_id)
+        except Exception as exc:
+            _LOGGER.error("Unable to load token signing certificates: %s", exc)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Auth certificates unavailable"
+            ) from exc
+
         try:
-            info = id_token.verify_oauth2_token(credentials.credentials, self._request, self._audience)
+            info = jwt.decode(token, certs=certs, audience=self._audience)
+            if info.get("iss") not in GOOGLE_ISSUERS:
+                raise ValueError(f"Wrong issuer: {info.get('iss')}")
         except Exception as exc:  # pragma: no cover - library raises many subclasses
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid identity token") from exc
 
+        self._tokens.put(cache_key, info)
         return info
 
 
-def build_auth_verifier(*, audience: Optional[str], require_auth: bool) -> AuthVerifier:
-    return AuthVerifier(audience=audience, require_auth=require_auth)
\ No newline at end of file
+def build_auth_verifier(
+    *, audience: Optional[str], require_auth: bool, token_cache_size: int = 1024
+) -> AuthVerifier:
+    return AuthVerifier(audience=audience, require_auth=require_auth, token_cache_size=token_cache_size)
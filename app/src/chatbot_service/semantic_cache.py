@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import time
+import zlib
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from .cache import CacheStats
+from .logging_pipeline import annotate
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None  # type: ignore
+
+if TYPE_CHECKING:
+    from numpy.typing import NDArray
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SIGN_BIT = 0x80000000
+
+
+class HashedNgramEmbedder:
+    """Embeds text as a signed, L2-normalised bag of hashed character n-grams and words.
+
+    Case, punctuation and spacing are ignored, so paraphrases sharing most of
+    their wording land close together. CRC32 keeps the hashing stable across
+    processes; its top bit picks the sign, which keeps collisions unbiased.
+    """
+
+    def __init__(self, dimensions: int = 128, ngram: int = 3) -> None:
+        if np is None:
+            raise RuntimeError("Install chatbot-service[semantic] to use the semantic cache")
+        self.dimensions = dimensions
+        self._ngram = ngram
+
+    def features(self, text: str) -> List[str]:
+        words = _NON_WORD.sub(" ", text.casefold()).split()
+        padded = f" {' '.join(words)} "
+        grams = [padded[index : index + self._ngram] for index in range(len(padded) - self._ngram + 1)]
+        return grams + words
+
+    def embed(self, text: str) -> NDArray[np.float32]:
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode("utf-8")) for feature in self.features(text)), dtype=np.uint32
+        )
+        signs = np.where(hashes & _SIGN_BIT, -1.0, 1.0)
+        vector = np.bincount(hashes % self.dimensions, weights=signs, minlength=self.dimensions).astype(np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """Capacity-bounded cache answering prompts that are near-duplicates of earlier ones.
+
+    Embeddings live in one contiguous ``max_entries x dimensions`` float32
+    matrix, so a lookup is a single matrix-vector product (cosine similarity,
+    as rows are unit length) over the occupied rows. Every entry carries a
+    ``scope`` (see :meth:`scope`) and only entries of the caller's scope
+    compete, so near-duplicate questions are matched within one context and
+    never across them. The best match is a hit when its similarity reaches
+    ``threshold`` and it is younger than ``ttl_seconds``. When full, the
+    least recently used entry is replaced.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int,
+        ttl_seconds: float,
+        threshold: float = 0.9,
+        embedder: Optional[HashedNgramEmbedder] = None,
+    ) -> None:
+        self._embedder = embedder or HashedNgramEmbedder()
+        capacity = max(1, max_entries)
+        self._matrix = np.zeros((capacity, self._embedder.dimensions), dtype=np.float32)
+        self._expires_at = np.zeros(capacity, dtype=np.float64)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._scopes = np.zeros(capacity, dtype=np.int64)
+        self._values: List[str] = []
+        self._threshold = threshold
+        self._ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def embed(self, prompt: str) -> NDArray[np.float32]:
+        return self._embedder.embed(prompt)
+
+    @staticmethod
+    def scope(*parts: str) -> int:
+        """Exact-match key for everything besides the question that shapes the answer."""
+
+        digest = hashlib.blake2b("\0".join(parts).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little", signed=True)
+
+    def get(self, embedding: NDArray[np.float32], scope: int = 0) -> Optional[str]:
+        slot, similarity = self._nearest(embedding, scope)
+        value = self._hit_or_miss(slot, similarity)
+        if value is not None:
+            annotate(cache="semantic_hit")
+        return value
+
+    def get_many(self, embeddings: NDArray[np.float32], scope: int = 0) -> List[Optional[str]]:
+        """Look up a batch of embeddings (one per row) in one scope with a single matrix product."""
+
+        if not self._values:
+            self.stats.misses += len(embeddings)
+            return [None] * len(embeddings)
+        occupied = len(self._values)
+        scores = np.where(self._scopes[:occupied] == scope, embeddings @ self._matrix[:occupied].T, -np.inf)
+        slots = scores.argmax(axis=1)
+        best = scores[np.arange(len(slots)), slots]
+        return [self._hit_or_miss(int(slot), float(similarity)) for slot, similarity in zip(slots, best)]
+
+    def put(self, embedding: NDArray[np.float32], value: str, scope: int = 0) -> None:
+        slot, similarity = self._nearest(embedding, scope)
+        if slot is None or similarity < 1.0 - 1e-6:
+            slot = self._allocate()
+        now = time.monotonic()
+        self._matrix[slot] = embedding
+        self._values[slot] = value
+        self._scopes[slot] = scope
+        self._expires_at[slot] = now + self._ttl_seconds
+        self._last_used[slot] = now
+
+    def _nearest(self, embedding: NDArray[np.float32], scope: int) -> Tuple[Optional[int], float]:
+        if not self._values:
+            return None, 0.0
+        occupied = len(self._values)
+        scores = np.where(self._scopes[:occupied] == scope, self._matrix[:occupied] @ embedding, -np.inf)
+        slot = int(scores.argmax())
+        return slot, float(scores[slot])
+
+    def _hit_or_miss(self, slot: Optional[int], similarity: float) -> Optional[str]:
+        now = time.monotonic()
+        if slot is not None and similarity >= self._threshold and now < self._expires_at[slot]:
+            self._last_used[slot] = now
+            self.stats.hits += 1
+            return self._values[slot]
+        self.stats.misses += 1
+        return None
+
+    def _allocate(self) -> int:
+        if len(self._values) < len(self._matrix):
+            self._values.append("")
+            return len(self._values) - 1
+        # Expired entries have not been used since they expired, so LRU replaces them first.
+        self.stats.evictions += 1
+        return int(self._last_used.argmin())
@@ -2,55 +2,348 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import Optional
+import re
+import threading
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
+from .admission import AIMDLimit
+from .batching import PredictionBatcher
+from .cache import CacheStats, ResponseCache
+from .concurrency import ModelTimeoutError, PredictionExecutor
 from .config import AppSettings
+from .conversations import ConversationStore
+from .logging_pipeline import annotate
+from .metrics import CIRCUIT_REJECTIONS
+from .resilience import CircuitBreaker, CircuitOpenError, HedgeTracker, ResilientCaller, RetryPolicy
 
-try:
-    import vertexai
+if TYPE_CHECKING:
     from vertexai.preview.language_models import TextGenerationModel
-except ImportError:  # pragma: no cover - optional dependency in offline mode
-    vertexai = None  # type: ignore
-    TextGenerationModel = None  # type: ignore
+
+    from .semantic_cache import SemanticCache
 
 _LOGGER = logging.getLogger(__name__)
 
+_CHUNK_PATTERN = re.compile(r"\S+\s*")
+
 
 class VertexAIClient:
-    """Wrapper around Vertex AI text generation with offline fallback."""
+    """Wrapper around Vertex AI text generation with offline fallback.
+
+    The Vertex AI SDK is imported and the model handle created on first use
+    (or by :meth:`warm_up`), off the event loop, so importing and constructing
+    the client stays cheap for cold starts and offline mode.
+
+    Predictions go through a :class:`ResilientCaller`: the request deadline
+    spans all attempts, transient errors are retried with jittered backoff,
+    slow attempts are optionally hedged, and while the circuit breaker is
+    open calls fail fast or, with ``CIRCUIT_BREAKER_FALLBACK``, are answered
+    by the offline stub.
+    """
 
     def __init__(self, settings: AppSettings) -> None:
         self._settings = settings
         self._model: Optional[TextGenerationModel] = None
+        self._endpoint: Any = None
         self._offline_mode = settings.offline_mode
+        self._executor = PredictionExecutor(
+            max_workers=settings.vertex_max_workers,
+            max_in_flight=settings.vertex_max_in_flight,
+            max_queue=settings.vertex_max_queue,
+            queue_timeout=settings.vertex_queue_timeout_seconds,
+            request_timeout=settings.vertex_request_timeout_seconds,
+            limit=AIMDLimit(
+                initial=settings.vertex_max_in_flight,
+                max_limit=settings.vertex_max_in_flight,
+                min_limit=settings.vertex_min_in_flight,
+                backoff=settings.vertex_limit_backoff,
+                tolerance=settings.vertex_latency_tolerance,
+            )
+            if settings.vertex_adaptive_concurrency
+            else None,
+        )
+        self._generation_params: Dict[str, Any] = {
+            name: value
+            for name, value in (
+                ("temperature", settings.vertex_temperature),
+                ("max_output_tokens", settings.vertex_max_output_tokens),
+                ("top_p", settings.vertex_top_p),
+                ("top_k", settings.vertex_top_k),
+            )
+            if value is not None
+        }
+        self._batcher: Optional[PredictionBatcher] = None
+        self._conversations: Optional[ConversationStore] = None
+        if settings.conversation_memory_enabled:
+            self._conversations = ConversationStore(
+                max_sessions=settings.conversation_max_sessions,
+                max_turns=settings.conversation_max_turns,
+                ttl_seconds=settings.conversation_ttl_seconds,
+                max_chars=settings.conversation_max_chars,
+            )
+        self._cache: Optional[ResponseCache] = None
+        if settings.response_cache_enabled:
+            self._cache = ResponseCache(
+                max_entries=settings.response_cache_max_entries,
+                ttl_seconds=settings.response_cache_ttl_seconds,
+            )
+
+        self._semantic_cache: Optional[SemanticCache] = None
+        if settings.semantic_cache_enabled:
+            from .semantic_cache import HashedNgramEmbedder, SemanticCache
+
+            self._semantic_cache = SemanticCache(
+                max_entries=settings.semantic_cache_max_entries,
+                ttl_seconds=settings.semantic_cache_ttl_seconds,
+                threshold=settings.semantic_cache_threshold,
+                embedder=HashedNgramEmbedder(settings.semantic_cache_dimensions),
+            )
+        self._resilience = ResilientCaller(
+            deadline=settings.vertex_request_timeout_seconds,
+            attempt_timeout=settings.vertex_attempt_timeout_seconds,
+            retry=RetryPolicy(
+                max_attempts=settings.vertex_retry_max_attempts,
+                base_delay=settings.vertex_retry_base_delay_seconds,
+                max_delay=settings.vertex_retry_max_delay_seconds,
+            ),
+            breaker=CircuitBreaker(
+                failure_threshold=settings.circuit_breaker_failure_threshold,
+                window=settings.circuit_breaker_window,
+                min_calls=settings.circuit_breaker_min_calls,
+                reset_timeout=settings.circuit_breaker_reset_seconds,
+            )
+            if settings.circuit_breaker_enabled
+            else None,
+            hedge=HedgeTracker(min_delay=settings.vertex_hedge_min_delay_seconds)
+            if settings.vertex_hedge_enabled
+            else None,
+            # Hedging doubles upstream load, so only hedge while nothing is queued for a slot.
+            can_hedge=lambda: self._executor.waiting == 0,
+        )
+
+        self._initialised = self._offline_mode
+        self._init_lock = threading.Lock()
+
+    def _initialise(self) -> None:
+        """Import the SDK and build the model handle; blocking, runs once."""
+
+        with self._init_lock:
+            if self._initialised:
+                return
+            settings = self._settings
+            try:
+                import vertexai
+                from google.cloud import aiplatform
+                from vertexai.preview.language_models import TextGenerationModel
+            except ImportError:
+                _LOGGER.warning("Vertex AI libraries unavailable; using offline fallback")
+                self._offline_mode = True
+                self._initialised = True
+                return
 
-        if not self._offline_mode and vertexai and TextGenerationModel:
             vertexai.init(project=settings.project_id, location=settings.location)
             self._model = TextGenerationModel.from_pretrained(settings.vertex_model)
             _LOGGER.info("Vertex AI client initialised for model %s", settings.vertex_model)
-        elif not self._offline_mode:
-            _LOGGER.warning("Vertex AI libraries unavailable; using offline fallback")
-            self._offline_mode = True
+            if settings.vertex_batch_enabled and settings.vertex_endpoint:
+                self._endpoint = aiplatform.Endpoint(settings.vertex_endpoint)
+                self._batcher = PredictionBatcher(
+                    self._predict_batch,
+                    max_batch_size=settings.vertex_batch_max_size,
+                    max_wait_seconds=settings.vertex_batch_max_wait_ms / 1000,
+                )
+                _LOGGER.info("Batching predictions through endpoint %s", settings.vertex_endpoint)
+            self._initialised = True
 
-    async def generate_response(self, prompt: str, context: Optional[str] = None) -> str:
-        safe_prompt = prompt.strip()
-        if context:
-            safe_context = context.strip()
-            safe_prompt = f"{safe_context}\n\nUser: {safe_prompt}\nAssistant:"
+    async def _ensure_initialised(self) -> None:
+        if not self._initialised:
+            await asyncio.to_thread(self._initialise)
+
+    async def generate_response(
+        self, prompt: str, context: Optional[str] = None, session_id: Optional[str] = None
+    ) -> str:
+        history = self._history(session_id)
+        safe_prompt = self._build_prompt(prompt, context, history)
+        response = await self._complete(safe_prompt, prompt, (context or "", history, session_id or ""))
+        self._remember(session_id, prompt, response)
+        return response
+
+    async def stream_response(
+        self, prompt: str, context: Optional[str] = None, session_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Yield response text incrementally as the model produces it.
+
+        Upstream chunks are pulled on the prediction executor. Closing or
+        cancelling the returned iterator (for example when the HTTP client
+        disconnects) stops the worker after its current chunk and closes the
+        upstream stream, so abandoned requests stop consuming quota. Only
+        completed streams are recorded in the conversation history.
+        """
+
+        safe_prompt = self._build_prompt(prompt, context, self._history(session_id))
+        chunks: List[str] = []
+        async for chunk in self._stream_chunks(safe_prompt):
+            chunks.append(chunk)
+            yield chunk
+        self._remember(session_id, prompt, "".join(chunks))
+
+    async def warm_up(self) -> None:
+        """Load the SDK and start the prediction threads ahead of the first request."""
+
+        self._executor.warm_up()
+        await self._ensure_initialised()
+
+    @property
+    def offline_mode(self) -> bool:
+        return self._offline_mode
+
+    @property
+    def executor(self) -> PredictionExecutor:
+        return self._executor
+
+    @property
+    def cache_stats(self) -> Optional[CacheStats]:
+        return self._cache.stats if self._cache else None
+
+    @property
+    def semantic_cache_stats(self) -> Optional[CacheStats]:
+        return self._semantic_cache.stats if self._semantic_cache else None
 
+    @property
+    def breaker(self) -> Optional[CircuitBreaker]:
+        return self._resilience.breaker
+
+    async def _complete(self, safe_prompt: str, message: str, scope: Tuple[str, ...]) -> str:
+        """Answer ``safe_prompt``, consulting the semantic cache first when it is enabled.
+
+        The semantic cache embeds only the user ``message``; the context,
+        history and session in ``scope`` must match exactly, so a long shared
+        context cannot make different questions look alike and answers never
+        cross conversations.
+        """
+
+        await self._ensure_initialised()
         if self._offline_mode or not self._model:
             return self._offline_stub(safe_prompt)
 
-        loop = asyncio.get_running_loop()
-        response = await loop.run_in_executor(None, self._model.predict, safe_prompt)
+        semantic_key = None
+        if self._semantic_cache is not None:
+            semantic_key = (self._semantic_cache.embed(message), self._semantic_cache.scope(*scope))
+            cached = self._semantic_cache.get(*semantic_key)
+            if cached is not None:
+                return cached
+
+        try:
+            if self._cache is None:
+                return await self._load(safe_prompt, semantic_key)
+            key = ResponseCache.make_key(safe_prompt, self._settings.vertex_model, self._generation_params)
+            return await self._cache.get_or_load(key, lambda: self._load(safe_prompt, semantic_key))
+        except CircuitOpenError:
+            if not self._use_fallback():
+                raise
+            return self._offline_stub(safe_prompt)
+
+    async def _load(self, safe_prompt: str, semantic_key: Optional[Tuple[Any, int]]) -> str:
+        response = await self._predict(safe_prompt)
+        if self._semantic_cache is not None and semantic_key is not None:
+            self._semantic_cache.put(semantic_key[0], response, semantic_key[1])
+        return response
+
+    async def _stream_chunks(self, safe_prompt: str) -> AsyncIterator[str]:
+        await self._ensure_initialised()
+        if self._offline_mode or not self._model:
+            for chunk in self._offline_stub_stream(safe_prompt):
+                yield chunk
+            return
+
+        try:
+            self._resilience.guard()
+        except CircuitOpenError:
+            if not self._use_fallback():
+                raise
+            for chunk in self._offline_stub_stream(safe_prompt):
+                yield chunk
+            return
+
+        model = self._model
+        params = self._generation_params
+        try:
+            async for response in self._executor.stream(
+                lambda _budget: model.predict_streaming(safe_prompt, **params)
+            ):
+                text = getattr(response, "text", None)
+                if text:
+                    yield text
+        except Exception as exc:
+            self._resilience.record(exc)
+            raise
+        self._resilience.record(None)
+
+    def _use_fallback(self) -> bool:
+        """Count a breaker rejection and report whether to answer with the offline stub."""
+
+        fallback = self._settings.circuit_breaker_fallback
+        CIRCUIT_REJECTIONS.labels("fallback" if fallback else "fail").inc()
+        annotate(circuit="fallback" if fallback else "rejected")
+        return fallback
+
+    async def _predict(self, prompt: str) -> str:
+        return await self._resilience.call(lambda timeout: self._predict_once(prompt, timeout))
+
+    async def _predict_once(self, prompt: str, timeout: float) -> str:
+        if self._batcher is not None:
+            try:
+                return await asyncio.wait_for(self._batcher.submit(prompt), timeout)
+            except asyncio.TimeoutError as exc:
+                raise ModelTimeoutError("Batched model call exceeded its deadline") from exc
+
+        model = self._model
+        if model is None:
+            raise RuntimeError("Vertex AI model is not initialised")
+        params = self._generation_params
+        response = await self._executor.run(lambda _budget: model.predict(prompt, **params), timeout=timeout)
         if hasattr(response, "text"):
-            return response.text  # type: ignore[attr-defined]
+            return response.text
         return str(response)
 
-    @property
-    def offline_mode(self) -> bool:
-        return self._offline_mode
+    async def _predict_batch(self, prompts: List[str]) -> List[str]:
+        endpoint = self._endpoint
+        instances = [{"prompt": prompt} for prompt in prompts]
+        parameters = self._generation_params or None
+        prediction = await self._executor.run(
+            lambda budget: endpoint.predict(instances=instances, parameters=parameters, timeout=budget)
+        )
+        return [_prediction_text(item) for item in prediction.predictions]
+
+    def _history(self, session_id: Optional[str]) -> str:
+        if self._conversations is None or not session_id:
+            return ""
+        return self._conversations.history(session_id)
+
+    def _remember(self, session_id: Optional[str], prompt: str, response: str) -> None:
+        if self._conversations is not None and session_id:
+            self._conversations.append(session_id, prompt.strip(), response.strip())
+
+    @staticmethod
+    def _build_prompt(prompt: str, context: Optional[str], history: str = "") -> str:
+        safe_prompt = prompt.strip()
+        if context:
+            safe_context = context.strip()
+            safe_prompt = f"{safe_context}\n\n{history}User: {safe_prompt}\nAssistant:"
+        elif history:
+            safe_prompt = f"{history}User: {safe_prompt}\nAssistant:"
+        return safe_prompt
 
     def _offline_stub(self, prompt: str) -> str:
+        return "".join(self._offline_stub_stream(prompt))
+
+    def _offline_stub_stream(self, prompt: str) -> Iterator[str]:
         truncated = (prompt[:120] + "...") if len(prompt) > 120 else prompt
-        return f"[offline-mode] Echoing intent for: {truncated}"
+        for match in _CHUNK_PATTERN.finditer(f"[offline-mode] Echoing intent for: {truncated}"):
+            yield match.group(0)
+
+
+def _prediction_text(prediction: Any) -> str:
+    if isinstance(prediction, dict):
+        for field in ("content", "text", "output", "generated_text"):
+            if field in prediction:
+                return str(prediction[field])
+    return str(prediction)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Callable, List
+
+import pytest
+
+from chatbot_service.admission import PRIORITY, AdmissionController, AIMDLimit, Priority, classify
+from chatbot_service.concurrency import ModelOverloadedError, PredictionExecutor
+from chatbot_service.rate_limiter import RateLimiter
+
+
+def test_priority_class_comes_from_claims() -> None:
+    suffix = "@proj.iam.gserviceaccount.com"
+    assert classify(None) == Priority.ANONYMOUS
+    assert classify({"sub": "1", "email": "batch@proj.iam.gserviceaccount.com"}, service_account_suffix=suffix) == (
+        Priority.SERVICE
+    )
+    foreign = {"sub": "5", "email": "batch@other.iam.gserviceaccount.com"}
+    assert classify(foreign, service_account_suffix=suffix) == Priority.USER
+    assert classify({"sub": "1", "email": "batch@proj.iam.gserviceaccount.com"}) == Priority.USER
+    assert classify({"sub": "2", "email": "someone@example.com"}) == Priority.USER
+    assert classify({"sub": "3", "tier": "service"}, priority_claim="tier") == Priority.SERVICE
+    assert classify({"sub": "4", "tier": "gold"}, priority_claim="tier") == Priority.USER
+
+
+def test_quotas_are_per_class_and_rejections_report_the_bucket_state() -> None:
+    controller = AdmissionController(
+        {
+            Priority.SERVICE: RateLimiter(max_requests=10, window_seconds=60),
+            Priority.USER: RateLimiter(max_requests=2, window_seconds=60),
+            Priority.ANONYMOUS: RateLimiter(max_requests=2, window_seconds=60),
+        }
+    )
+
+    async def scenario() -> None:
+        for _ in range(2):
+            assert (await controller.admit(Priority.ANONYMOUS, "caller")).granted
+        rejected = await controller.admit(Priority.ANONYMOUS, "caller")
+        assert not rejected.granted and rejected.retry_after == pytest.approx(30, abs=0.5)
+        assert all([(await controller.admit(Priority.SERVICE, "caller")).granted for _ in range(10)])
+        assert PRIORITY.get() == Priority.SERVICE
+
+    asyncio.run(scenario())
+
+
+def test_aimd_limit_grows_when_busy_and_backs_off_when_latency_inflates() -> None:
+    limit = AIMDLimit(initial=4, max_limit=8, min_limit=2, backoff=0.5)
+    for _ in range(10):
+        limit.observe(0.1, in_flight=limit.limit)
+    assert limit.limit == 8
+
+    for _ in range(10):
+        limit.observe(1.0, in_flight=limit.limit)
+    assert limit.limit == 2
+
+    limit.observe(0.1, in_flight=0)
+    assert limit.limit == 2
+
+
+def test_waiters_are_served_by_priority_and_low_priority_is_shed_first() -> None:
+    executor = PredictionExecutor(max_workers=2, max_in_flight=1, max_queue=2, queue_timeout=1.0, request_timeout=2.0)
+    gate = threading.Event()
+    order: List[str] = []
+
+    async def call(priority: Priority, name: str, work: Callable[[float], object] = lambda _: None) -> None:
+        PRIORITY.set(priority)
+        await executor.run(work)
+        order.append(name)
+
+    async def scenario() -> List[object]:
+        blocked = asyncio.ensure_future(call(Priority.USER, "blocked", lambda _: gate.wait(1.0)))
+        await asyncio.sleep(0.01)
+        anonymous = asyncio.ensure_future(call(Priority.ANONYMOUS, "anonymous"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ModelOverloadedError):
+            await call(Priority.ANONYMOUS, "second anonymous")
+        user = asyncio.ensure_future(call(Priority.USER, "user"))
+        service = asyncio.ensure_future(call(Priority.SERVICE, "service"))
+        await asyncio.sleep(0.01)
+        gate.set()
+        return await asyncio.gather(blocked, anonymous, user, service, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert isinstance(results[1], ModelOverloadedError)
+    assert order == ["blocked", "service", "user"]
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import asyncio
+from typing import List
+
+import pytest
+
+from chatbot_service.batching import PredictionBatcher
+
+
+def test_concurrent_prompts_are_sent_as_one_batch() -> None:
+    batches: List[List[str]] = []
+
+    async def predict_batch(prompts: List[str]) -> List[str]:
+        batches.append(prompts)
+        return [prompt.upper() for prompt in prompts]
+
+    batcher = PredictionBatcher(predict_batch, max_batch_size=8, max_wait_seconds=0.01)
+
+    async def scenario() -> List[str]:
+        return await asyncio.gather(*(batcher.submit(f"p{index}") for index in range(5)))
+
+    assert asyncio.run(scenario()) == ["P0", "P1", "P2", "P3", "P4"]
+    assert batches == [["p0", "p1", "p2", "p3", "p4"]]
+
+
+def test_full_batches_are_flushed_without_waiting() -> None:
+    batches: List[List[str]] = []
+
+    async def predict_batch(prompts: List[str]) -> List[str]:
+        batches.append(prompts)
+        return prompts
+
+    batcher = PredictionBatcher(predict_batch, max_batch_size=2, max_wait_seconds=10)
+
+    async def scenario() -> List[str]:
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit(str(i)) for i in range(4))), 1)
+
+    assert asyncio.run(scenario()) == ["0", "1", "2", "3"]
+    assert [len(batch) for batch in batches] == [2, 2]
+
+
+def test_failed_batch_fails_every_caller() -> None:
+    async def predict_batch(prompts: List[str]) -> List[str]:
+        raise ConnectionError("endpoint unavailable")
+
+    batcher = PredictionBatcher(predict_batch, max_batch_size=4, max_wait_seconds=0.001)
+
+    async def scenario() -> List[object]:
+        return await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+def test_mismatched_batch_size_is_an_error() -> None:
+    async def predict_batch(prompts: List[str]) -> List[str]:
+        return ["only-one"]
+
+    batcher = PredictionBatcher(predict_batch, max_batch_size=2, max_wait_seconds=0.001)
+
+    async def scenario() -> None:
+        await asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scenario())
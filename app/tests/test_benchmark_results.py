@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+import pytest
+from results import add_arguments, compare, finish
+
+BASELINE = {"limiter": {"ops_per_sec": 1000.0, "p95_ns": 100.0, "p99_ns": 200.0, "errors": 0.0}}
+
+
+@pytest.mark.parametrize(
+    ("metrics", "regressed"),
+    [
+        ({"ops_per_sec": 700.0}, ["ops_per_sec"]),
+        ({"ops_per_sec": 1500.0}, []),
+        ({"p95_ns": 130.0}, ["p95_ns"]),
+        ({"p95_ns": 50.0}, []),
+        ({"ops_per_sec": 850.0, "p95_ns": 115.0}, []),
+        ({"p99_ns": 900.0, "errors": 5.0}, []),
+        ({"p50_ns": 900.0, "new_per_sec": 1.0}, []),
+    ],
+)
+def test_compare_respects_each_metrics_direction(metrics: dict, regressed: list) -> None:
+    regressions = compare({"limiter": metrics}, BASELINE, 0.2)
+    assert [line.split()[1].rstrip(":") for line in regressions] == regressed
+
+
+def test_compare_skips_benchmarks_and_zero_values_missing_from_the_baseline() -> None:
+    assert compare({"new": {"ops_per_sec": 1.0}}, BASELINE, 0.2) == []
+    assert compare({"limiter": {"ops_per_sec": 1.0}}, {"limiter": {"ops_per_sec": 0.0}}, 0.2) == []
+
+
+def _args(tmp_path: Path, *flags: str) -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    return parser.parse_args(["--baseline", str(tmp_path / "baseline.json"), *flags])
+
+
+def test_baseline_is_seeded_once_and_only_replaced_on_request(tmp_path: Path) -> None:
+    baseline = tmp_path / "baseline.json"
+    finish(BASELINE, _args(tmp_path, "--seed-baseline"))
+    assert json.loads(baseline.read_text(encoding="utf-8")) == BASELINE
+
+    # Each run stays within 20% of the previous one but drifts from the seeded baseline.
+    finish({"limiter": {"ops_per_sec": 850.0}}, _args(tmp_path, "--seed-baseline"))
+    with pytest.raises(SystemExit):
+        finish({"limiter": {"ops_per_sec": 750.0}}, _args(tmp_path, "--seed-baseline"))
+    assert json.loads(baseline.read_text(encoding="utf-8")) == BASELINE
+
+    finish({"limiter": {"ops_per_sec": 750.0}}, _args(tmp_path, "--update-baseline"))
+    assert json.loads(baseline.read_text(encoding="utf-8")) == {"limiter": {"ops_per_sec": 750.0}}
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import List
+
+from fastapi.testclient import TestClient
+
+from chatbot_service import main as app_module
+from chatbot_service.admission import AdmissionController, Priority
+from chatbot_service.bulk import BatchJobStore, run_batch
+from chatbot_service.concurrency import ModelTimeoutError
+from chatbot_service.rate_limiter import RateLimiter
+from chatbot_service.schemas import ChatRequest, ChatResponse
+
+app = app_module.app
+app.dependency_overrides[app_module.auth_dependency] = lambda: None
+client = TestClient(app)
+
+
+def _lines(body: str) -> List[dict]:
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def test_batch_streams_one_ndjson_result_per_request() -> None:
+    payload = {"requests": [{"message": f"Question {index}"} for index in range(5)]}
+    response = client.post("/chat/batch", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = _lines(response.text)
+    assert sorted(result["index"] for result in results) == list(range(5))
+    assert all(result["status"] == 200 and result["offline"] is True for result in results)
+    assert "detail" not in results[0]
+
+
+def test_ndjson_upload_is_validated_before_anything_runs() -> None:
+    body = b'{"message": "first"}\n\n{"message": ""}\n'
+    response = client.post("/chat/batch", content=body, headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 1, "message"]
+
+    too_many = b"\n".join(b'{"message": "hi"}' for _ in range(app_module.settings.batch_max_items + 1))
+    response = client.post("/chat/batch", content=too_many, headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 413
+
+
+def test_batch_is_charged_by_weight(monkeypatch) -> None:
+    limiters = {priority: RateLimiter(max_requests=3, window_seconds=60) for priority in Priority}
+    monkeypatch.setattr(app_module, "admission", AdmissionController(limiters))
+    monkeypatch.setattr(app_module.settings, "batch_items_per_token", 10)
+    batch = {"requests": [{"message": "hi"}] * 25}
+
+    assert client.post("/chat/batch", json=batch).status_code == 200
+    rejected = client.post("/chat/batch", json=batch)
+    assert rejected.status_code == 429
+    assert rejected.headers["Retry-After"] == "60"
+    assert client.post("/chat/batch", json={"requests": [{"message": "hi"}] * 31}).status_code == 413
+
+
+def test_jobs_run_in_background_and_spool_results() -> None:
+    with TestClient(app) as session:
+        created = session.post("/chat/jobs", json={"requests": [{"message": "a"}, {"message": "b"}]})
+        assert created.status_code == 202
+        job_id = created.json()["id"]
+
+        deadline = time.monotonic() + 5
+        while (job := session.get(f"/chat/jobs/{job_id}").json())["status"] == "running":
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert job == {"id": job_id, "status": "succeeded", "total": 2, "completed": 2, "failed": 0}
+
+        results = session.get(f"/chat/jobs/{job_id}/results")
+        assert results.status_code == 200
+        assert sorted(result["index"] for result in _lines(results.text)) == [0, 1]
+        assert session.get("/chat/jobs/unknown").status_code == 404
+
+
+def test_jobs_are_visible_to_every_worker_sharing_the_directory(tmp_path: Path) -> None:
+    accepting = BatchJobStore(directory=str(tmp_path))
+    polling = BatchJobStore(directory=str(tmp_path))
+
+    async def respond(item: ChatRequest) -> ChatResponse:
+        return ChatResponse(response=item.message, model="test", offline=True)
+
+    async def scenario() -> str:
+        job = accepting.submit("alice", [ChatRequest(message="a"), ChatRequest(message="b")], respond, concurrency=2)
+        assert polling.get(job.id, "alice").status == "running"
+        while accepting.get(job.id, "alice").status == "running":
+            await asyncio.sleep(0.01)
+        return job.id
+
+    job_id = asyncio.run(scenario())
+    job = polling.get(job_id, "alice")
+    assert (job.status, job.total, job.completed, job.failed) == ("succeeded", 2, 2, 0)
+    assert sorted(result["index"] for result in _lines(job.path.read_text())) == [0, 1]
+    assert polling.get(job_id, "mallory") is None
+    assert polling.get("../" + job_id, "alice") is None
+
+
+def test_run_batch_bounds_concurrency_and_isolates_failures() -> None:
+    in_flight = peak = 0
+
+    async def respond(item: ChatRequest) -> ChatResponse:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if item.message == "slow":
+            raise ModelTimeoutError("too slow")
+        return ChatResponse(response=item.message, model="test", offline=True)
+
+    async def scenario() -> list:
+        items = [ChatRequest(message="slow" if index == 3 else f"m{index}") for index in range(10)]
+        return [result async for result in run_batch(items, respond, concurrency=3)]
+
+    results = asyncio.run(scenario())
+    assert peak == 3
+    assert sorted(result.index for result in results) == list(range(10))
+    assert {result.index: result.status for result in results}[3] == 504
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from chatbot_service import cache as cache_module
+from chatbot_service.cache import ResponseCache
+
+
+def test_make_key_normalises_prompt_and_includes_parameters() -> None:
+    base = ResponseCache.make_key("What is  IAM?", "text-bison", {"temperature": 0.2})
+    assert base == ResponseCache.make_key("what is iam?", "text-bison", {"temperature": 0.2})
+    assert base != ResponseCache.make_key("What is IAM?", "text-bison", {"temperature": 0.9})
+    assert base != ResponseCache.make_key("What is IAM?", "gemini", {"temperature": 0.2})
+
+
+def test_concurrent_identical_prompts_share_one_upstream_call() -> None:
+    cache = ResponseCache(max_entries=8, ttl_seconds=60)
+    calls = []
+
+    async def loader() -> str:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def scenario() -> list[str]:
+        results = await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(5)))
+        results.append(await cache.get_or_load("key", loader))
+        return results
+
+    assert asyncio.run(scenario()) == ["answer"] * 6
+    assert len(calls) == 1
+    assert cache.stats.as_dict() == {"hits": 1, "misses": 1, "coalesced": 4, "evictions": 0}
+
+
+def test_entries_expire_and_evict_least_recently_used(monkeypatch) -> None:
+    clock = [0.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: clock[0])
+    cache = ResponseCache(max_entries=2, ttl_seconds=10)
+
+    async def load(value: str) -> str:
+        return await cache.get_or_load(value, lambda: asyncio.sleep(0, result=value))
+
+    async def scenario() -> None:
+        await load("a")
+        await load("b")
+        await load("a")
+        await load("c")
+        assert cache.stats.evictions == 1
+        assert cache.stats.hits == 1
+        clock[0] = 11
+        await load("a")
+        assert cache.stats.misses == 4
+
+    asyncio.run(scenario())
+
+
+def test_failed_loads_are_not_cached() -> None:
+    cache = ResponseCache(max_entries=2, ttl_seconds=10)
+
+    async def failing() -> str:
+        raise RuntimeError("upstream failed")
+
+    async def scenario() -> None:
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("key", failing)
+        assert len(cache) == 0
+
+    asyncio.run(scenario())
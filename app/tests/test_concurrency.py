@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from chatbot_service.concurrency import ModelOverloadedError, ModelTimeoutError, PredictionExecutor
+
+
+def _executor(**overrides: float) -> PredictionExecutor:
+    options = dict(max_workers=2, max_in_flight=1, max_queue=1, queue_timeout=0.05, request_timeout=1.0)
+    options.update(overrides)
+    return PredictionExecutor(**options)  # type: ignore[arg-type]
+
+
+def test_run_passes_remaining_budget_to_call() -> None:
+    executor = _executor()
+    budget = asyncio.run(executor.run(lambda remaining: remaining, timeout=5.0))
+    assert 4.0 < budget <= 5.0
+
+
+def test_excess_callers_are_shed_when_queue_is_full() -> None:
+    executor = _executor()
+    gate = threading.Event()
+
+    async def scenario() -> list[object]:
+        blocked = asyncio.ensure_future(executor.run(lambda _: gate.wait(1.0)))
+        await asyncio.sleep(0.01)
+        queued = asyncio.ensure_future(executor.run(lambda _: "queued"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ModelOverloadedError):
+            await executor.run(lambda _: "rejected")
+        results = await asyncio.gather(queued, return_exceptions=True)
+        gate.set()
+        await blocked
+        return results
+
+    results = asyncio.run(scenario())
+    assert isinstance(results[0], ModelOverloadedError)
+
+
+def test_deadline_raises_but_slot_is_held_until_worker_finishes() -> None:
+    executor = _executor(max_queue=0)
+    gate = threading.Event()
+
+    async def scenario() -> None:
+        with pytest.raises(ModelTimeoutError):
+            await executor.run(lambda _: gate.wait(1.0), timeout=0.02)
+        assert executor.in_flight == 1
+        with pytest.raises(ModelOverloadedError):
+            await executor.run(lambda _: None)
+        gate.set()
+        for _ in range(100):
+            if executor.in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert await executor.run(lambda _: "ok") == "ok"
+
+    asyncio.run(scenario())
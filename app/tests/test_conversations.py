@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import asyncio
+
+from chatbot_service import conversations as conversations_module
+from chatbot_service.config import AppSettings
+from chatbot_service.conversations import ConversationStore, render_turn
+from chatbot_service.vertex_client import VertexAIClient
+
+
+def _store(**overrides: float) -> ConversationStore:
+    options = dict(max_sessions=4, max_turns=2, ttl_seconds=60, max_chars=1000)
+    options.update(overrides)
+    return ConversationStore(**options)  # type: ignore[arg-type]
+
+
+def test_history_keeps_only_the_latest_turns() -> None:
+    store = _store()
+    for index in range(3):
+        store.append("s1", f"q{index}", f"a{index}")
+
+    assert store.history("s1") == render_turn("q1", "a1") + render_turn("q2", "a2")
+    assert store.history("unknown") == ""
+
+
+def test_history_is_trimmed_to_the_character_budget() -> None:
+    store = _store(max_turns=10, max_chars=len(render_turn("q0", "a0")) + 5)
+    store.append("s1", "q0", "a0")
+    store.append("s1", "q1", "a1")
+
+    assert store.history("s1") == render_turn("q1", "a1")
+
+
+def test_sessions_expire_and_are_capped(monkeypatch) -> None:
+    clock = [0.0]
+    monkeypatch.setattr(conversations_module.time, "monotonic", lambda: clock[0])
+    store = _store(max_sessions=2, ttl_seconds=10)
+
+    store.append("a", "q", "a")
+    store.append("b", "q", "a")
+    store.append("c", "q", "a")
+    assert len(store) == 2
+    assert store.history("a") == ""
+
+    clock[0] = 11
+    assert store.history("b") == ""
+    assert len(store) == 0
+
+
+def test_client_prefixes_prompts_with_session_history() -> None:
+    client = VertexAIClient(AppSettings(OFFLINE_MODE=True, CONVERSATION_MEMORY_ENABLED=True))
+    prompts = []
+    client._offline_stub = lambda prompt: prompts.append(prompt) or "reply"  # type: ignore[method-assign]
+
+    async def scenario() -> None:
+        await client.generate_response("first", session_id="s1")
+        await client.generate_response("second", "Be brief.", session_id="s1")
+        await client.generate_response("other", session_id="s2")
+
+    asyncio.run(scenario())
+    assert prompts == [
+        "first",
+        "Be brief.\n\nUser: first\nAssistant: reply\nUser: second\nAssistant:",
+        "other",
+    ]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from chatbot_service.config import AppSettings
+from chatbot_service.launcher import available_cpus, cpu_quota, server_options
+
+
+def test_cpu_quota_reads_cgroup_v2(tmp_path: Path) -> None:
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert cpu_quota(tmp_path) == 1.5
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cpu_quota(tmp_path) is None
+
+
+def test_cpu_quota_falls_back_to_cgroup_v1(tmp_path: Path) -> None:
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("200000\n")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    assert cpu_quota(tmp_path) == 2.0
+
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+    assert cpu_quota(tmp_path) is None
+
+
+def test_available_cpus_is_capped_by_quota(tmp_path: Path) -> None:
+    (tmp_path / "cpu.max").write_text("50000 100000\n")
+    assert available_cpus(tmp_path) == 1
+
+
+def test_server_options_derive_workers_unless_pinned(tmp_path: Path) -> None:
+    (tmp_path / "cpu.max").write_text("200000 100000\n")
+    options = server_options(
+        AppSettings(SERVER_KEEP_ALIVE_SECONDS=30, SERVER_LOOP="uvloop", RATE_LIMIT_BACKEND="redis"), tmp_path
+    )
+    assert options["workers"] == available_cpus(tmp_path)
+    assert options["timeout_keep_alive"] == 30
+    assert options["loop"] == "uvloop"
+
+    assert server_options(AppSettings(SERVER_WORKERS=3), tmp_path)["workers"] == 3
+
+
+def test_server_options_default_to_one_worker_with_per_process_rate_limits(tmp_path: Path) -> None:
+    (tmp_path / "cpu.max").write_text("400000 100000\n")
+    assert server_options(AppSettings(RATE_LIMIT_BACKEND="memory"), tmp_path)["workers"] == 1
+
+
+def test_conversation_memory_runs_a_single_worker(tmp_path: Path) -> None:
+    (tmp_path / "cpu.max").write_text("400000 100000\n")
+    settings = AppSettings(CONVERSATION_MEMORY_ENABLED=True, RATE_LIMIT_BACKEND="redis")
+    assert server_options(settings, tmp_path)["workers"] == 1
+
+    with pytest.raises(ValueError, match="SERVER_WORKERS=1"):
+        server_options(AppSettings(CONVERSATION_MEMORY_ENABLED=True, SERVER_WORKERS=2), tmp_path)
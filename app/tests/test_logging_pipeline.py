@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from chatbot_service.logging_pipeline import (
+    ACCESS_LOGGER,
+    FileSink,
+    LogPipeline,
+    RequestLogMiddleware,
+    annotate,
+)
+
+
+class _ListSink:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.batches: List[List[Dict[str, Any]]] = []
+        self.delay = delay
+
+    def write(self, entries: List[Dict[str, Any]]) -> None:
+        time.sleep(self.delay)
+        self.batches.append(entries)
+
+    def close(self) -> None:
+        pass
+
+
+def _logger(pipeline: LogPipeline, name: str) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [pipeline.handler]
+    return logger
+
+
+def test_pipeline_ships_full_batches_and_flushes_partial_ones_on_a_timer() -> None:
+    sink = _ListSink()
+    pipeline = LogPipeline(sink, batch_size=3, flush_interval=0.05)
+    logger = _logger(pipeline, "tests.batches")
+    pipeline.start()
+    try:
+        for index in range(4):
+            logger.info("record %d", index, extra={"user": "alice"})
+        deadline = time.monotonic() + 2
+        while sum(len(batch) for batch in sink.batches) < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        pipeline.stop()
+
+    assert [len(batch) for batch in sink.batches] == [3, 1]
+    first = sink.batches[0][0]
+    assert first["message"] == "record 0"
+    assert first["severity"] == "INFO"
+    assert first["user"] == "alice"
+
+
+def test_full_buffer_drops_oldest_records_without_blocking() -> None:
+    sink = _ListSink(delay=0.2)
+    pipeline = LogPipeline(sink, max_buffer=5, batch_size=1000, flush_interval=10.0)
+    logger = _logger(pipeline, "tests.drops")
+    dropped = pipeline._dropped.value
+
+    start = time.perf_counter()
+    for index in range(20):
+        logger.info("record %d", index)
+    assert time.perf_counter() - start < 0.1
+    assert pipeline.pending == 5
+    assert pipeline._dropped.value - dropped == 15
+
+    pipeline.start()
+    pipeline.stop()
+    assert [entry["message"] for entry in sink.batches[0]] == [f"record {i}" for i in range(15, 20)]
+
+
+def test_file_sink_writes_json_lines(tmp_path: Path) -> None:
+    path = tmp_path / "logs" / "app.jsonl"
+    pipeline = LogPipeline(FileSink(path), batch_size=10, flush_interval=0.01)
+    logger = _logger(pipeline, "tests.file")
+    pipeline.start()
+    try:
+        logger.warning("disk %s", "full")
+    finally:
+        pipeline.stop()
+
+    entry = json.loads(path.read_text(encoding="utf-8").splitlines()[0])
+    assert entry["message"] == "disk full"
+    assert entry["severity"] == "WARNING"
+
+
+def test_request_middleware_logs_latency_and_annotations() -> None:
+    app = FastAPI()
+    app.add_middleware(RequestLogMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str) -> dict:
+        annotate(rate_limit="allowed", cache="hit")
+        return {"id": item_id}
+
+    records: List[logging.LogRecord] = []
+    captured = threading.Event()
+
+    class _Capture(logging.Handler):
+        def emit(self, record: logging.LogRecord) -> None:
+            records.append(record)
+            captured.set()
+
+    handler = _Capture()
+    previous_level = ACCESS_LOGGER.level
+    ACCESS_LOGGER.addHandler(handler)
+    ACCESS_LOGGER.setLevel(logging.INFO)
+    try:
+        assert TestClient(app).get("/items/7").status_code == 200
+    finally:
+        ACCESS_LOGGER.removeHandler(handler)
+        ACCESS_LOGGER.setLevel(previous_level)
+
+    assert captured.is_set()
+    record = records[0]
+    assert record.route == "/items/{item_id}"  # type: ignore[attr-defined]
+    assert record.status == 200  # type: ignore[attr-defined]
+    assert record.rate_limit == "allowed"  # type: ignore[attr-defined]
+    assert record.cache == "hit"  # type: ignore[attr-defined]
+    assert record.latency_ms >= 0  # type: ignore[attr-defined]
@@ -1,8 +1,12 @@
 ﻿from __future__ import annotations
 
+import json
+
 from fastapi.testclient import TestClient
 
 from chatbot_service import main as app_module
+from chatbot_service.encoding import ResponseEncoder
+from chatbot_service.schemas import ChatResponse, HealthResponse
 
 app = app_module.app
 app.dependency_overrides[app_module.auth_dependency] = lambda: None
@@ -23,4 +27,29 @@ def test_chat_endpoint_returns_offline_stub() -> None:
     payload = response.json()
     assert payload["model"] == app_module.settings.vertex_model
     assert payload["offline"] is True
-    assert "offline-mode" in payload["response"]
\ No newline at end of file
+    assert "offline-mode" in payload["response"]
+
+
+def test_fast_path_bodies_match_response_models() -> None:
+    encoder = ResponseEncoder('model "quoted"')
+    for offline in (True, False):
+        expected = ChatResponse(response='line\n"ünïcode"', model='model "quoted"', offline=offline)
+        body = encoder.chat(expected.response, offline).body
+        assert ChatResponse.model_validate_json(body) == expected
+        assert list(json.loads(body)) == list(ChatResponse.model_fields)
+        health = HealthResponse.model_validate_json(encoder.health(offline).body)
+        assert health == HealthResponse(status="ok", model='model "quoted"', offline=offline)
+
+    assert client.get("/health").headers["content-type"] == "application/json"
+
+
+def test_chat_stream_endpoint_emits_sse_chunks() -> None:
+    with client.stream("POST", "/chat/stream", json={"message": "Hello there", "session_id": "stream"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    events = [block for block in body.split("\n\n") if block]
+    assert events[0].startswith("event: message")
+    assert events[-1].startswith("event: done")
+    assert len(events) > 2
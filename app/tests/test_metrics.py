@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+
+from chatbot_service import main as app_module
+from chatbot_service.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+app_module.app.dependency_overrides[app_module.auth_dependency] = lambda: None
+client = TestClient(app_module.app)
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram("latency_seconds", "Latency.", ("phase",), buckets=(0.1, 1.0)))
+    assert isinstance(histogram, Histogram)
+    child = histogram.labels("auth")
+    for value in (0.05, 0.5, 5.0):
+        child.observe(value)
+
+    rendered = registry.render()
+    assert 'latency_seconds_bucket{phase="auth",le="0.1"} 1' in rendered
+    assert 'latency_seconds_bucket{phase="auth",le="1.0"} 2' in rendered
+    assert 'latency_seconds_bucket{phase="auth",le="+Inf"} 3' in rendered
+    assert 'latency_seconds_count{phase="auth"} 3' in rendered
+
+
+def test_scalar_metrics_support_callbacks() -> None:
+    registry = MetricsRegistry()
+    counter = Counter("events_total", "Events.", ("outcome",))
+    gauge = Gauge("keys", "Keys.")
+    registry.register(counter)
+    registry.register(gauge)
+    counter.labels("hit").inc(2)
+    gauge.set_function(lambda: 7)
+
+    rendered = registry.render()
+    assert "# TYPE events_total counter" in rendered
+    assert 'events_total{outcome="hit"} 2' in rendered
+    assert "keys 7" in rendered
+
+
+def test_metrics_endpoint_reports_route_latency_and_phases() -> None:
+    client.post("/chat", json={"message": "Hello", "session_id": "metrics"})
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'chatbot_request_duration_seconds_count{method="POST",route="/chat",status="200"}' in body
+    assert 'chatbot_phase_duration_seconds_count{phase="rate_limit"}' in body
+    assert "chatbot_rate_limit_tracked_keys" in body
+    assert "chatbot_requests_in_flight 0" in body
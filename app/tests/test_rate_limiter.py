@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+
+from chatbot_service import rate_limiter as rate_limiter_module
+from chatbot_service.rate_limiter import (
+    Grant,
+    InMemoryBackend,
+    RateLimitBackend,
+    RateLimiter,
+    RateLimitRule,
+    gcra,
+)
+
+
+def test_gcra_admits_burst_then_steady_rate() -> None:
+    tat = 0.0
+    decisions = []
+    for _ in range(4):
+        granted, tat = gcra(tat, 0.0, emission_interval=1.0, burst_tolerance=2.0)
+        decisions.append(granted)
+    assert decisions == [1, 1, 1, 0]
+
+    granted, _ = gcra(tat, 1.0, emission_interval=1.0, burst_tolerance=2.0)
+    assert granted == 1
+
+
+def test_gcra_grants_partial_batches() -> None:
+    granted, tat = gcra(0.0, 0.0, emission_interval=1.0, burst_tolerance=4.0, requested=3)
+    assert (granted, tat) == (3, 3.0)
+    granted, tat = gcra(tat, 0.0, emission_interval=1.0, burst_tolerance=4.0, requested=3)
+    assert (granted, tat) == (2, 5.0)
+
+
+def test_limiter_blocks_after_max_requests() -> None:
+    limiter = RateLimiter(max_requests=3, window_seconds=60)
+
+    async def scenario() -> list[bool]:
+        return [await limiter.allow("client") for _ in range(4)]
+
+    assert asyncio.run(scenario()) == [True, True, True, False]
+    assert asyncio.run(limiter.allow("other-client"))
+
+
+def test_limiter_caps_and_sweeps_tracked_keys(monkeypatch) -> None:
+    clock = [100.0]
+    monkeypatch.setattr(rate_limiter_module.time, "monotonic", lambda: clock[0])
+    backend = InMemoryBackend(shards=1, max_keys=8, sweep_interval=10)
+    rule = RateLimitRule(max_requests=5, window_seconds=10)
+
+    for index in range(50):
+        backend.take(f"session-{index}", rule)
+    assert backend.tracked_keys <= 8
+
+    clock[0] += 30
+    backend.take("late", rule)
+    assert backend.tracked_keys == 1
+
+
+def test_in_memory_backend_reports_retry_after(monkeypatch) -> None:
+    monkeypatch.setattr(rate_limiter_module.time, "monotonic", lambda: 50.0)
+    backend = InMemoryBackend()
+    rule = RateLimitRule(max_requests=2, window_seconds=10)
+
+    assert backend.take("client", rule, requested=2) == Grant(2, 0.0)
+    assert backend.take("client", rule) == Grant(0, 5.0)
+
+
+def test_weighted_calls_are_admitted_all_or_nothing(monkeypatch) -> None:
+    monkeypatch.setattr(rate_limiter_module.time, "monotonic", lambda: 50.0)
+    backend = InMemoryBackend()
+    rule = RateLimitRule(max_requests=10, window_seconds=10)
+
+    assert backend.take("client", rule, requested=6, minimum=6) == Grant(6, 0.0)
+    assert backend.take("client", rule, requested=6, minimum=6) == Grant(0, 2.0)
+    assert backend.take("client", rule, requested=4, minimum=4) == Grant(4, 0.0)
+
+    limiter = RateLimiter(max_requests=5, window_seconds=60)
+    assert asyncio.run(limiter.allow("client", weight=4))
+    assert not asyncio.run(limiter.allow("client", weight=2))
+    assert asyncio.run(limiter.allow("client"))
+
+
+class _CountingBackend(RateLimitBackend):
+    def __init__(self, fail: bool = False) -> None:
+        self.calls = 0
+        self.fail = fail
+
+    async def acquire(self, key: str, rule: RateLimitRule, requested: int = 1, minimum: int = 1) -> Grant:
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("backend down")
+        return Grant(requested, 0.0)
+
+    async def reset(self, key: str) -> None:
+        return None
+
+
+def test_limiter_spends_prefetched_tokens_locally() -> None:
+    backend = _CountingBackend()
+    limiter = RateLimiter(max_requests=10, window_seconds=60, backend=backend, prefetch=4)
+
+    async def scenario() -> list[bool]:
+        return [await limiter.allow("client") for _ in range(8)]
+
+    assert all(asyncio.run(scenario()))
+    assert backend.calls == 2
+
+
+def test_limiter_applies_failure_policy() -> None:
+    fail_open = RateLimiter(max_requests=1, window_seconds=60, backend=_CountingBackend(fail=True))
+    fail_closed = RateLimiter(
+        max_requests=1, window_seconds=60, backend=_CountingBackend(fail=True), fail_open=False
+    )
+
+    assert asyncio.run(fail_open.allow("client")) is True
+    assert asyncio.run(fail_closed.allow("client")) is False
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from chatbot_service.rate_limiter import RateLimiter, RateLimitRule
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from chatbot_service.redis_backend import RedisBackend  # noqa: E402
+
+
+def test_redis_backend_shares_quota_between_limiters() -> None:
+    async def scenario() -> list[bool]:
+        server = fakeredis.FakeServer()
+        first = RateLimiter(
+            max_requests=3, window_seconds=60, backend=RedisBackend(fakeredis.FakeAsyncRedis(server=server))
+        )
+        second = RateLimiter(
+            max_requests=3, window_seconds=60, backend=RedisBackend(fakeredis.FakeAsyncRedis(server=server))
+        )
+        return [await limiter.allow("client") for limiter in (first, second, first, second)]
+
+    assert asyncio.run(scenario()) == [True, True, True, False]
+
+
+def test_redis_backend_grants_batches_and_expires_idle_keys() -> None:
+    async def scenario() -> None:
+        client = fakeredis.FakeAsyncRedis()
+        backend = RedisBackend(client, prefix="test:")
+        rule = RateLimitRule(max_requests=4, window_seconds=60)
+
+        grant = await backend.acquire("client", rule, requested=3)
+        assert grant.granted == 3
+        grant = await backend.acquire("client", rule, requested=3)
+        assert grant.granted == 1
+        denied = await backend.acquire("client", rule)
+        assert denied.granted == 0
+        assert 0 < denied.retry_after <= 15
+
+        assert 0 < await client.pttl("test:client") <= 60_001
+        await backend.reset("client")
+        assert await client.exists("test:client") == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import List
+
+import pytest
+
+from chatbot_service.concurrency import ModelTimeoutError
+from chatbot_service.config import AppSettings
+from chatbot_service.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    HedgeTracker,
+    ResilientCaller,
+    RetryPolicy,
+)
+from chatbot_service.vertex_client import VertexAIClient
+
+
+class _Unavailable(Exception):
+    code = 503
+
+
+class _InvalidArgument(Exception):
+    code = 400
+
+
+class _Response:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class _FakeModel:
+    """Fails the first ``failures`` predictions with ``error``, then answers after ``latency`` seconds."""
+
+    def __init__(self, *, failures: int = 0, error: Exception = _Unavailable(), latency: float = 0.0) -> None:
+        self.failures = failures
+        self.error = error
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def predict(self, prompt: str) -> _Response:
+        with self._lock:
+            self.calls += 1
+            failing = self.calls <= self.failures
+        time.sleep(self.latency)
+        if failing:
+            raise self.error
+        return _Response(f"model: {prompt}")
+
+
+def _online_client(model: _FakeModel, **overrides: object) -> VertexAIClient:
+    options = {"OFFLINE_MODE": True, "VERTEX_RETRY_BASE_DELAY_SECONDS": 0.001, **overrides}
+    client = VertexAIClient(AppSettings(**options))  # type: ignore[arg-type]
+    client._offline_mode = False
+    client._model = model  # type: ignore[assignment]
+    return client
+
+
+def test_transient_errors_are_retried_but_client_errors_are_not() -> None:
+    model = _FakeModel(failures=2)
+    assert asyncio.run(_online_client(model).generate_response("hi")) == "model: hi"
+    assert model.calls == 3
+
+    rejected = _FakeModel(failures=5, error=_InvalidArgument())
+    with pytest.raises(_InvalidArgument):
+        asyncio.run(_online_client(rejected).generate_response("hi"))
+    assert rejected.calls == 1
+
+
+def test_deadline_spans_all_attempts() -> None:
+    model = _FakeModel(latency=0.2)
+    client = _online_client(model, VERTEX_REQUEST_TIMEOUT_SECONDS=0.3, VERTEX_ATTEMPT_TIMEOUT_SECONDS=0.05)
+
+    start = time.perf_counter()
+    with pytest.raises(ModelTimeoutError):
+        asyncio.run(client.generate_response("hi"))
+    assert time.perf_counter() - start < 0.5
+
+
+def test_open_breaker_fails_fast_or_falls_back_to_offline_stub() -> None:
+    settings = dict(
+        VERTEX_RETRY_MAX_ATTEMPTS=1,
+        CIRCUIT_BREAKER_WINDOW=4,
+        CIRCUIT_BREAKER_MIN_CALLS=4,
+        CIRCUIT_BREAKER_RESET_SECONDS=60,
+    )
+    model = _FakeModel(failures=100)
+    client = _online_client(model, **settings)
+
+    async def failing_calls() -> None:
+        for _ in range(4):
+            with pytest.raises(_Unavailable):
+                await client.generate_response("hi")
+        with pytest.raises(CircuitOpenError) as raised:
+            await client.generate_response("hi")
+        assert raised.value.retry_after > 0
+
+    asyncio.run(failing_calls())
+    assert model.calls == 4
+    assert client.breaker is not None and client.breaker.state == CircuitBreaker.OPEN
+
+    fallback = _online_client(_FakeModel(failures=100), CIRCUIT_BREAKER_FALLBACK=True, **settings)
+
+    async def fallback_calls() -> str:
+        for _ in range(4):
+            with pytest.raises(_Unavailable):
+                await fallback.generate_response("hi")
+        return await fallback.generate_response("hi")
+
+    assert asyncio.run(fallback_calls()).startswith("[offline-mode]")
+
+
+def test_half_open_breaker_admits_one_probe_and_closes_on_success() -> None:
+    clock = [0.0]
+    breaker = CircuitBreaker(failure_threshold=0.5, window=2, min_calls=2, reset_timeout=10, clock=lambda: clock[0])
+    breaker.record(False)
+    breaker.record(False)
+    assert not breaker.allow()
+
+    clock[0] = 10.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_slow_attempt_is_hedged_and_first_result_wins() -> None:
+    hedge = HedgeTracker(min_samples=1, min_delay=0.01)
+    hedge.observe(0.01)
+    started: List[float] = []
+
+    async def attempt(_timeout: float) -> str:
+        started.append(time.perf_counter())
+        if len(started) == 1:
+            await asyncio.sleep(1.0)
+            return "primary"
+        return "hedge"
+
+    caller = ResilientCaller(deadline=2.0, retry=RetryPolicy(max_attempts=1), hedge=hedge)
+    start = time.perf_counter()
+    assert asyncio.run(caller.call(attempt)) == "hedge"
+    assert len(started) == 2
+    assert time.perf_counter() - start < 0.5
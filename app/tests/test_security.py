@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import time
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from google.auth import crypt, jwt
+
+from chatbot_service.security import AuthVerifier, CertificateCache, TokenCache
+
+AUDIENCE = "https://chat.example.com"
+
+
+def _signing_material(key_id: str) -> tuple[crypt.RSASigner, str]:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "test")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    signer = crypt.RSASigner.from_string(private_pem, key_id=key_id)
+    return signer, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+SIGNER, CERT_PEM = _signing_material("key-1")
+
+
+def _token(**overrides: object) -> str:
+    now = int(time.time())
+    claims = {"iss": "https://accounts.google.com", "aud": AUDIENCE, "sub": "svc", "iat": now, "exp": now + 600}
+    claims.update(overrides)
+    return jwt.encode(SIGNER, claims).decode()
+
+
+def _bearer(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def test_verifier_fetches_certs_once_and_memoises_tokens() -> None:
+    calls = []
+
+    def fetcher() -> tuple[dict, float]:
+        calls.append(1)
+        return {"key-1": CERT_PEM}, 3600.0
+
+    verifier = AuthVerifier(
+        audience=AUDIENCE, require_auth=True, certificates=CertificateCache(fetcher=fetcher)
+    )
+
+    async def scenario() -> None:
+        token = _token()
+        first = await verifier(_bearer(token))
+        second = await verifier(_bearer(token))
+        assert first["sub"] == second["sub"] == "svc"
+        await verifier(_bearer(_token(sub="other")))
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+
+
+def test_verifier_rejects_foreign_issuer() -> None:
+    cache = CertificateCache(fetcher=lambda: ({"key-1": CERT_PEM}, 3600.0))
+    verifier = AuthVerifier(audience=AUDIENCE, require_auth=True, certificates=cache)
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(verifier(_bearer(_token(iss="https://evil.example.com"))))
+    assert excinfo.value.status_code == 401
+
+
+def test_verifier_rejects_malformed_tokens_without_fetching_certs() -> None:
+    calls = []
+
+    def fetcher() -> tuple[dict, float]:
+        calls.append(1)
+        return {"key-1": CERT_PEM}, 3600.0
+
+    verifier = AuthVerifier(audience=AUDIENCE, require_auth=True, certificates=CertificateCache(fetcher=fetcher))
+
+    for token in ("garbage", "a.b.c"):
+        with pytest.raises(HTTPException) as excinfo:
+            asyncio.run(verifier(_bearer(token)))
+        assert excinfo.value.status_code == 401
+    assert calls == []
+
+
+def test_certificate_cache_serves_stale_keys_while_the_endpoint_fails() -> None:
+    calls = []
+
+    def fetcher() -> tuple[dict, float]:
+        calls.append(1)
+        if len(calls) > 1:
+            raise RuntimeError("certs endpoint down")
+        return {"key-1": CERT_PEM}, 0.0
+
+    cache = CertificateCache(fetcher=fetcher, min_refresh_interval=60.0)
+
+    async def scenario() -> None:
+        await cache.get()
+        for _ in range(5):
+            assert "key-1" in await cache.get()
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_certificate_cache_stops_trusting_stale_keys_after_the_grace_period() -> None:
+    calls = []
+
+    def fetcher() -> tuple[dict, float]:
+        calls.append(1)
+        if len(calls) > 1:
+            raise RuntimeError("certs endpoint down")
+        return {"key-1": CERT_PEM}, 0.0
+
+    cache = CertificateCache(fetcher=fetcher, min_refresh_interval=0.0, stale_grace=0.05)
+
+    async def scenario() -> None:
+        await cache.get()
+        assert "key-1" in await cache.get()
+        await asyncio.sleep(0.1)
+        with pytest.raises(RuntimeError):
+            await cache.get()
+
+    asyncio.run(scenario())
+
+
+def test_certificate_cache_refreshes_in_background_near_expiry() -> None:
+    calls = []
+
+    def fetcher() -> tuple[dict, float]:
+        calls.append(1)
+        return {"key-1": CERT_PEM}, 10.0
+
+    cache = CertificateCache(fetcher=fetcher, refresh_margin=60.0)
+
+    async def scenario() -> None:
+        await cache.get()
+        certs = await cache.get()
+        assert "key-1" in certs
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_token_cache_drops_expired_and_least_recent_entries() -> None:
+    cache = TokenCache(max_entries=2)
+    cache.put(b"expired", {"exp": time.time() - 1})
+    assert cache.get(b"expired") is None
+
+    cache.put(b"a", {"exp": time.time() + 60})
+    cache.put(b"b", {"exp": time.time() + 60})
+    cache.get(b"a")
+    cache.put(b"c", {"exp": time.time() + 60})
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") is not None
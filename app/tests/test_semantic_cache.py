@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from chatbot_service import semantic_cache as semantic_module  # noqa: E402
+from chatbot_service.config import AppSettings  # noqa: E402
+from chatbot_service.semantic_cache import HashedNgramEmbedder, SemanticCache  # noqa: E402
+from chatbot_service.vertex_client import VertexAIClient  # noqa: E402
+
+
+def test_embeddings_ignore_case_punctuation_and_spacing() -> None:
+    embedder = HashedNgramEmbedder()
+    first = embedder.embed("How do I reset my password?")
+    assert float(np.linalg.norm(first)) == pytest.approx(1.0)
+    assert float(first @ embedder.embed("how do i   reset my PASSWORD")) == pytest.approx(1.0)
+    assert float(first @ embedder.embed("How do I reset my password please")) > 0.85
+    assert float(first @ embedder.embed("Which regions does Cloud Run support?")) < 0.5
+
+
+def test_near_duplicates_hit_and_unrelated_prompts_miss() -> None:
+    cache = SemanticCache(max_entries=8, ttl_seconds=60, threshold=0.85)
+    cache.put(cache.embed("How do I reset my password?"), "Use the reset link.")
+
+    assert cache.get(cache.embed("how do I reset my password please")) == "Use the reset link."
+    assert cache.get(cache.embed("How do I rotate a service account key?")) is None
+    batch = np.stack([cache.embed("How do I reset my password"), cache.embed("What is IAM?")])
+    assert cache.get_many(batch) == ["Use the reset link.", None]
+    assert cache.stats.as_dict() == {"hits": 2, "misses": 2, "coalesced": 0, "evictions": 0}
+
+
+def test_capacity_evicts_least_recently_used_and_entries_expire(monkeypatch) -> None:
+    clock = [0.0]
+    monkeypatch.setattr(semantic_module.time, "monotonic", lambda: clock[0])
+    cache = SemanticCache(max_entries=2, ttl_seconds=10, threshold=0.95)
+    prompts = ["What is the refund window?", "Which regions are supported?", "How are invoices sent?"]
+    cache.put(cache.embed(prompts[0]), "a")
+    clock[0] = 1
+    cache.put(cache.embed(prompts[1]), "b")
+    clock[0] = 2
+    assert cache.get(cache.embed(prompts[0])) == "a"
+    cache.put(cache.embed(prompts[2]), "c")
+
+    assert len(cache) == 2
+    assert cache.stats.evictions == 1
+    assert cache.get(cache.embed(prompts[1])) is None
+    clock[0] = 20
+    assert cache.get(cache.embed(prompts[0])) is None
+
+
+def test_lookup_over_twenty_thousand_entries_is_fast() -> None:
+    cache = SemanticCache(max_entries=20_000, ttl_seconds=60)
+    rows = np.random.default_rng(0).standard_normal((20_000, 128)).astype(np.float32)
+    rows /= np.linalg.norm(rows, axis=1, keepdims=True)
+    for row in rows:
+        cache.put(row, "answer")
+    query = cache.embed("How do I reset my password?")
+
+    start = time.perf_counter()
+    for _ in range(100):
+        cache.get(query)
+    assert (time.perf_counter() - start) / 100 < 0.005
+
+
+def test_client_serves_paraphrases_without_calling_the_model() -> None:
+    class _Model:
+        calls = 0
+
+        def predict(self, prompt: str) -> str:
+            _Model.calls += 1
+            return f"answer {_Model.calls}"
+
+    client = VertexAIClient(AppSettings(OFFLINE_MODE=True, SEMANTIC_CACHE_ENABLED=True, SEMANTIC_CACHE_THRESHOLD=0.85))
+    client._offline_mode = False
+    client._model = _Model()  # type: ignore[assignment]
+
+    async def scenario() -> list[str]:
+        return [
+            await client.generate_response("How do I reset my password?"),
+            await client.generate_response("how do I reset my password please"),
+            await client.generate_response("Which regions are supported?"),
+        ]
+
+    assert asyncio.run(scenario()) == ["answer 1", "answer 1", "answer 2"]
+    assert client.semantic_cache_stats is not None and client.semantic_cache_stats.hits == 1
+
+
+def test_shared_context_does_not_make_different_questions_collide() -> None:
+    class _Model:
+        calls = 0
+
+        def predict(self, prompt: str) -> str:
+            _Model.calls += 1
+            return f"answer {_Model.calls}"
+
+    client = VertexAIClient(AppSettings(OFFLINE_MODE=True, SEMANTIC_CACHE_ENABLED=True, SEMANTIC_CACHE_THRESHOLD=0.85))
+    client._offline_mode = False
+    client._model = _Model()  # type: ignore[assignment]
+    manual = " ".join(f"Section {index}: the console lists every project setting." for index in range(200))
+
+    async def scenario() -> list[str]:
+        return [
+            await client.generate_response("How do I reset my password?", manual),
+            await client.generate_response("Which regions are supported?", manual),
+            await client.generate_response("how do I reset my password please", manual),
+            await client.generate_response("How do I reset my password?", "A different manual."),
+            await client.generate_response("How do I reset my password?", manual, "bob:session"),
+        ]
+
+    assert asyncio.run(scenario()) == ["answer 1", "answer 2", "answer 1", "answer 3", "answer 4"]
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+HEAVY_MODULES = ("vertexai", "google.cloud.aiplatform", "google.cloud.logging", "google.auth.transport.requests")
+
+
+def test_importing_the_app_defers_sdk_imports() -> None:
+    probe = (
+        "import json, sys; import chatbot_service.main; "
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))"
+    )
+    env = {**os.environ, "PYTHONPATH": str(SRC_DIR), "OFFLINE_MODE": "false", "GCP_PROJECT": "demo"}
+    output = subprocess.run([sys.executable, "-c", probe], env=env, capture_output=True, text=True, check=True)
+    assert json.loads(output.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Iterator
+
+from chatbot_service.config import AppSettings
+from chatbot_service.vertex_client import VertexAIClient
+
+
+class _Chunk:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class _StreamingModel:
+    def __init__(self) -> None:
+        self.produced = 0
+        self.closed = threading.Event()
+
+    def predict_streaming(self, prompt: str) -> Iterator[_Chunk]:
+        try:
+            for index in range(1000):
+                self.produced += 1
+                time.sleep(0.001)
+                yield _Chunk(f"token-{index} ")
+        finally:
+            self.closed.set()
+
+
+def _online_client(model: object) -> VertexAIClient:
+    client = VertexAIClient(AppSettings(OFFLINE_MODE=True))
+    client._offline_mode = False
+    client._model = model  # type: ignore[assignment]
+    return client
+
+
+def test_offline_stream_matches_offline_response() -> None:
+    client = VertexAIClient(AppSettings(OFFLINE_MODE=True))
+
+    async def scenario() -> tuple[list[str], str]:
+        chunks = [chunk async for chunk in client.stream_response("Hello world", "ctx")]
+        return chunks, await client.generate_response("Hello world", "ctx")
+
+    chunks, full = asyncio.run(scenario())
+    assert len(chunks) > 1
+    assert "".join(chunks) == full
+
+
+def test_abandoned_stream_closes_upstream_iterator() -> None:
+    model = _StreamingModel()
+    client = _online_client(model)
+
+    async def scenario() -> None:
+        stream = client.stream_response("Hello")
+        assert await stream.__anext__() == "token-0 "
+        await stream.aclose()
+
+    asyncio.run(scenario())
+    assert model.closed.wait(timeout=2)
+    assert model.produced < 1000
@@ -3,23 +3,47 @@
 
 Features:
 - Structured configuration for each check (command, cwd, required files).
-- Optional terraform plan generation feeding OPA evaluation.
+- Dependency-aware scheduling that runs independent checks concurrently.
+- Incremental mode replaying cached results for checks whose inputs are unchanged.
+- Optional terraform plan generation feeding in-process policy evaluation
+  (``plan_policies``), with ``opa eval`` as an optional cross-check.
 - Streaming output with real-time logging and colorized status markers.
+- Per-check log files; reports excerpt their tails so memory stays flat.
 - JSON + Markdown report summarizing pass/fail state.
-- Graceful cleanup for temporary plan artifacts and helpful remediation hints.
+- Persistent per-environment plan cache keyed by the Terraform sources, with
+  dev and prod plans generated in parallel.
+- Environments under ``infra/envs`` and modules under ``infra/modules`` are
+  discovered; each gets its own fmt/validate/plan/policy or scan checks, and
+  the report summarizes results per target.
+- Optional benchmark gate comparing app micro-benchmarks and load results
+  against the last passing run.
+- Append-only SQLite run history (``run_history``) with a ``--trend`` report of
+  the slowest checks, duration regressions and the critical path.
+- Helpful remediation hints.
 """
 from __future__ import annotations
 
 import argparse
+import contextlib
+import functools
+import hashlib
+import importlib.util
 import json
+import os
+import re
 import shutil
+import sqlite3
 import subprocess
 import sys
 import tempfile
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import IO, Callable, Deque, Dict, List, Optional, Tuple
 
 try:
     from rich.console import Console
@@ -28,11 +52,34 @@ try:
 except ImportError:  # fallback when rich is unavailable
     Console = None  # type: ignore
 
+import plan_policies
+import run_history
+
 ROOT = Path(__file__).resolve().parents[1]
 POLICY_DIR = ROOT / "policies"
 INFRA_DIR = ROOT / "infra"
-DEV_ENV = INFRA_DIR / "envs" / "dev"
+ENVS_DIR = INFRA_DIR / "envs"
 REPORT_DIR = ROOT / "reports"
+CACHE_DIR = ROOT / ".pipeline-cache"
+APP_DIR = ROOT / "app"
+BENCHMARK_DIR = APP_DIR / "benchmarks"
+MODULES_DIR = INFRA_DIR / "modules"
+SCRIPTS_DIR = ROOT / "scripts"
+TAIL_LINES = 40
+TAIL_LINE_CHARS = 2000
+READ_CHUNK_BYTES = 64 * 1024
+_ECHO_LOCK = threading.Lock()
+MODULE_SOURCE = re.compile(r'^\s*source\s*=\s*"(\.{1,2}/[^"]+)"', re.MULTILINE)
+TERRAFORM_SOURCES = ("*.tf", "*.tfvars", "*.tfvars.json", ".terraform.lock.hcl")
+# Python modules that plan_policies imports, mapped to the pip packages that provide them.
+PYTHON_REQUIREMENTS = {"ijson": "ijson", "yaml": "PyYAML"}
+# policies/opa rules judge one resource change at a time, so the plan's changes are fed to them one by one;
+# with --fail-defined any denial fails the check.
+OPA_PLAN_QUERY = (
+    "rc := input.resource_changes[_]; "
+    "msg := data.security.storage.deny[_] with input as "
+    '{"resource": {"type": rc.type, "name": rc.name}, "change": rc.change}'
+)
 
 
 @dataclass
@@ -44,6 +91,14 @@ class CheckResult:
     stderr: str
     duration: float
     hint: Optional[str] = None
+    key: str = ""
+    target: str = ""
+    skipped: bool = False
+    cached: bool = False
+    stdout_log: Optional[Path] = None
+    stderr_log: Optional[Path] = None
+    stdout_truncated: bool = False
+    stderr_truncated: bool = False
 
     @property
     def name(self) -> str:
@@ -51,7 +106,7 @@ class CheckResult:
 
     @property
     def passed(self) -> bool:
-        return self.returncode == 0
+        return self.returncode == 0 and not self.skipped
 
 
 @dataclass
@@ -62,147 +117,801 @@ class Check:
     hint: Optional[str] = None
     ensure_file: Optional[Path] = None
     env: Dict[str, str] = field(default_factory=dict)
+    key: str = ""
+    depends_on: List[str] = field(default_factory=list)
+    stdout_path: Optional[Path] = None
+    inputs: List[Path] = field(default_factory=list)
+    outputs: List[Path] = field(default_factory=list)
+    version_command: Optional[List[str]] = None
+    action: Optional[Callable[[Callable[[str], None]], int]] = None
+    target: str = ""
+
+    @property
+    def name(self) -> str:
+        return self.key or " ".join(self.command)
+
+    @property
+    def artifacts(self) -> List[Path]:
+        """Files the check produces that a cache hit has to restore."""
+
+        return self.outputs + ([self.stdout_path] if self.stdout_path else [])
+
+    def run(self, log_dir: Optional[Path] = None, echo: Optional[Callable[[str, str], None]] = None) -> CheckResult:
+        """Run the command, streaming its output instead of buffering it.
+
+        Each line goes to ``echo`` (if given) and to ``<log_dir>/<check>.<stream>.log``
+        as it arrives; only a bounded tail is kept in memory for the report.
+        With ``stdout_path`` set, stdout is written straight to that file and
+        only kept when the command succeeds.
+        """
+
+        if self.ensure_file and not self.ensure_file.exists():
+            return self._result(1, "", f"Required file missing for {self.name}: {self.ensure_file}", 0.0)
+        if self.action is not None:
+            return self._run_action(log_dir, echo)
 
-    def run(self) -> CheckResult:
         start = datetime.now()
-        merged_env = dict(**self.env)
-        merged_env.update({k: v for k, v in (('PYTHONUTF8', '1'),)})
+        logs = {stream: self.log_path(log_dir, stream) for stream in ("stdout", "stderr")}
+        partial_path: Optional[Path] = None
+        sink: Optional[IO[bytes]] = None
+        if self.stdout_path is not None:
+            partial_path = self.stdout_path.with_name(self.stdout_path.name + ".partial")
+            sink = partial_path.open("wb")
+        try:
+            process = subprocess.Popen(
+                self.command,
+                cwd=self.cwd,
+                env={**os.environ, **self.env, "PYTHONUTF8": "1"},
+                stdout=sink or subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except OSError as exc:
+            if sink is not None and partial_path is not None:
+                sink.close()
+                partial_path.unlink(missing_ok=True)
+            return self._result(127, "", f"Failed to start {self.command[0]}: {exc}", 0.0)
 
-        process = subprocess.run(
-            self.command,
-            cwd=self.cwd,
-            env={**merged_env, **dict(**{k: v for k, v in dict(**merged_env).items()})},
-            capture_output=True,
-            text=True,
-        )
+        tails: Dict[str, OutputTail] = {}
+        pumps = []
+        for stream, pipe in (("stdout", process.stdout), ("stderr", process.stderr)):
+            if pipe is None:
+                continue
+            tails[stream] = OutputTail()
+            stream_echo = functools.partial(echo, stream) if echo else None
+            pump = threading.Thread(target=_pump, args=(pipe, logs[stream], tails[stream], stream_echo), daemon=True)
+            pump.start()
+            pumps.append(pump)
+        returncode = process.wait()
+        for pump in pumps:
+            pump.join()
         duration = (datetime.now() - start).total_seconds()
+
+        if sink is not None and partial_path is not None and self.stdout_path is not None:
+            sink.close()
+            if returncode == 0:
+                partial_path.replace(self.stdout_path)
+            else:
+                partial_path.unlink(missing_ok=True)
+
+        stdout_tail, stderr_tail = tails.get("stdout", OutputTail()), tails["stderr"]
+        result = self._result(returncode, stdout_tail.text(), stderr_tail.text(), duration)
+        result.stdout_log = logs["stdout"] if "stdout" in tails else None
+        result.stderr_log = logs["stderr"]
+        result.stdout_truncated = stdout_tail.truncated
+        result.stderr_truncated = stderr_tail.truncated
+        return result
+
+    def _run_action(self, log_dir: Optional[Path], echo: Optional[Callable[[str, str], None]]) -> CheckResult:
+        """Run ``action`` in-process; ``command`` is only the equivalent invocation."""
+
+        assert self.action is not None
+        start = datetime.now()
+        tails = {"stdout": OutputTail(), "stderr": OutputTail()}
+        logs = {stream: self.log_path(log_dir, stream) for stream in tails}
+        with contextlib.ExitStack() as stack:
+            handles: Dict[str, IO[str]] = {}
+            for stream, log_path in logs.items():
+                if log_path is not None:
+                    log_path.parent.mkdir(parents=True, exist_ok=True)
+                    handles[stream] = stack.enter_context(log_path.open("w", encoding="utf-8"))
+
+            def emit(stream: str, line: str) -> None:
+                if stream in handles:
+                    handles[stream].write(line + "\n")
+                tails[stream].append(line + "\n")
+                if echo is not None:
+                    echo(stream, line)
+
+            try:
+                returncode = self.action(functools.partial(emit, "stdout"))
+            except Exception:
+                for line in traceback.format_exc().splitlines():
+                    emit("stderr", line)
+                returncode = 1
+        duration = (datetime.now() - start).total_seconds()
+        result = self._result(returncode, tails["stdout"].text(), tails["stderr"].text(), duration)
+        result.stdout_log, result.stderr_log = logs["stdout"], logs["stderr"]
+        result.stdout_truncated = tails["stdout"].truncated
+        result.stderr_truncated = tails["stderr"].truncated
+        return result
+
+    def log_path(self, log_dir: Optional[Path], stream: str) -> Optional[Path]:
+        if log_dir is None:
+            return None
+        return log_dir / f"{_safe_name(self.name)}.{stream}.log"
+
+    def skip(self, reason: str) -> CheckResult:
+        result = self._result(0, "", reason, 0.0)
+        result.skipped = True
+        return result
+
+    def _result(self, returncode: int, stdout: str, stderr: str, duration: float) -> CheckResult:
         return CheckResult(
             command=self.command,
             cwd=self.cwd,
-            returncode=process.returncode,
-            stdout=process.stdout,
-            stderr=process.stderr,
+            returncode=returncode,
+            stdout=stdout,
+            stderr=stderr,
             duration=duration,
             hint=self.hint,
+            key=self.name,
+            target=self.target,
         )
 
 
+class OutputTail:
+    """The last ``max_lines`` lines of a stream, each capped at ``max_chars``."""
+
+    def __init__(self, max_lines: int = TAIL_LINES, max_chars: int = TAIL_LINE_CHARS) -> None:
+        self._lines: Deque[str] = deque(maxlen=max_lines)
+        self._max_chars = max_chars
+        self.truncated = False
+
+    def append(self, line: str) -> None:
+        if len(line) > self._max_chars:
+            line = line[: self._max_chars] + " ...[line truncated]\n"
+            self.truncated = True
+        if len(self._lines) == self._lines.maxlen:
+            self.truncated = True
+        self._lines.append(line)
+
+    def text(self) -> str:
+        return "".join(self._lines)
+
+
+def _pump(
+    pipe: IO[bytes], log_path: Optional[Path], tail: OutputTail, echo: Optional[Callable[[str], None]]
+) -> None:
+    """Copy ``pipe`` to the log file, the tail and ``echo`` one bounded line at a time."""
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(pipe)
+        log: Optional[IO[bytes]] = None
+        if log_path is not None:
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            log = stack.enter_context(log_path.open("wb"))
+        for chunk in iter(functools.partial(pipe.readline, READ_CHUNK_BYTES), b""):
+            if log is not None:
+                log.write(chunk)
+            line = chunk.decode("utf-8", errors="replace")
+            tail.append(line)
+            if echo is not None:
+                echo(line.rstrip("\r\n"))
+
+
+class CheckCache:
+    """Content-addressed store of passing check results.
+
+    The fingerprint of a check covers its command, environment, tool version
+    and the contents of every declared input path. When it matches a stored
+    entry, the recorded result and output artifacts are replayed instead of
+    running the tool. Only passing results are stored, so failures always
+    rerun.
+    """
+
+    IGNORED_DIRS = {
+        ".git", ".terraform", "__pycache__", ".pytest_cache", ".mypy_cache", ".ruff_cache", ".venv", "node_modules",
+    }
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+        self._versions: Dict[Tuple[str, ...], str] = {}
+        self._file_digests: Dict[Tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+
+    def fingerprint(self, check: Check) -> str:
+        labels = {str(path): f"<output:{index}>" for index, path in enumerate(check.artifacts)}
+        labels.update({str(path): f"<input:{_label(path)}>" for path in check.inputs})
+        digest = hashlib.sha256()
+        for part in [*(_substitute(arg, labels) for arg in check.command), _label(check.cwd)]:
+            digest.update(part.encode("utf-8") + b"\0")
+        digest.update(json.dumps(sorted(check.env.items())).encode("utf-8"))
+        digest.update(self.tool_version(check).encode("utf-8"))
+        for path in check.inputs:
+            self._hash_tree(digest, path)
+        return digest.hexdigest()
+
+    def tool_version(self, check: Check) -> str:
+        command = tuple(check.version_command or [check.command[0], "--version"])
+        with self._lock:
+            if command in self._versions:
+                return self._versions[command]
+        try:
+            proc = subprocess.run(command, capture_output=True, text=True, timeout=120)
+            version = proc.stdout + proc.stderr
+        except (OSError, subprocess.SubprocessError):
+            version = "unavailable"
+        with self._lock:
+            self._versions[command] = version
+        return version
+
+    def load(self, check: Check, fingerprint: str, log_dir: Optional[Path] = None) -> Optional[CheckResult]:
+        entry = self._entry_dir(check) / fingerprint
+        try:
+            data = json.loads((entry / "result.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        for index, path in enumerate(check.artifacts):
+            stored = entry / "artifacts" / str(index)
+            if not stored.exists():
+                return None
+            path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(stored, path)
+        result = check._result(data["returncode"], data["stdout"], data["stderr"], 0.0)
+        result.cached = True
+        result.stdout_truncated = data.get("stdout_truncated", False)
+        result.stderr_truncated = data.get("stderr_truncated", False)
+        for stream in ("stdout", "stderr"):
+            stored_log, log_path = entry / "logs" / f"{stream}.log", check.log_path(log_dir, stream)
+            if stored_log.exists() and log_path is not None:
+                log_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(stored_log, log_path)
+                setattr(result, f"{stream}_log", log_path)
+        return result
+
+    def store(self, check: Check, fingerprint: str, result: CheckResult) -> None:
+        if not result.passed or any(not path.exists() for path in check.artifacts):
+            return
+        key_dir = self._entry_dir(check)
+        key_dir.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=key_dir, prefix=".staging-"))
+        try:
+            (staging / "artifacts").mkdir()
+            (staging / "logs").mkdir()
+            for index, path in enumerate(check.artifacts):
+                shutil.copyfile(path, staging / "artifacts" / str(index))
+            for stream, log_path in (("stdout", result.stdout_log), ("stderr", result.stderr_log)):
+                if log_path is not None and log_path.exists():
+                    shutil.copyfile(log_path, staging / "logs" / f"{stream}.log")
+            (staging / "result.json").write_text(
+                json.dumps(
+                    {
+                        "returncode": result.returncode,
+                        "stdout": result.stdout,
+                        "stderr": result.stderr,
+                        "stdout_truncated": result.stdout_truncated,
+                        "stderr_truncated": result.stderr_truncated,
+                    }
+                ),
+                encoding="utf-8",
+            )
+            for stale in key_dir.iterdir():
+                if stale != staging:
+                    shutil.rmtree(stale, ignore_errors=True)
+            staging.rename(key_dir / fingerprint)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _entry_dir(self, check: Check) -> Path:
+        return self._directory / "checks" / _safe_name(check.name)
+
+    def _hash_tree(self, digest: "hashlib._Hash", path: Path) -> None:
+        if path.is_file():
+            digest.update(f"{_label(path)}\0{self._file_digest(path)}\0".encode("utf-8"))
+            return
+        if not path.is_dir():
+            digest.update(f"{_label(path)}\0<missing>\0".encode("utf-8"))
+            return
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(name for name in dirnames if name not in self.IGNORED_DIRS)
+            for filename in sorted(filenames):
+                file_path = Path(dirpath) / filename
+                digest.update(f"{_label(file_path)}\0{self._file_digest(file_path)}\0".encode("utf-8"))
+
+    def _file_digest(self, path: Path) -> str:
+        stat = path.stat()
+        memo_key = (str(path), stat.st_mtime_ns, stat.st_size)
+        cached = self._file_digests.get(memo_key)
+        if cached is None:
+            file_hash = hashlib.sha256()
+            with path.open("rb") as handle:
+                for block in iter(lambda: handle.read(1 << 20), b""):
+                    file_hash.update(block)
+            cached = self._file_digests[memo_key] = file_hash.hexdigest()
+        return cached
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+def _substitute(argument: str, labels: Dict[str, str]) -> str:
+    for path in sorted(labels, key=len, reverse=True):
+        argument = argument.replace(path, labels[path])
+    return argument
+
+
+def _label(path: Path) -> str:
+    """Location-independent name for ``path`` used in fingerprints."""
+
+    try:
+        return path.resolve().relative_to(ROOT).as_posix()
+    except ValueError:
+        return path.name
+
+
+def execute_check(
+    check: Check,
+    cache: Optional[CheckCache] = None,
+    log_dir: Optional[Path] = None,
+    echo: Optional[Callable[[str, str], None]] = None,
+) -> CheckResult:
+    """Run ``check``, or replay its cached result when its inputs are unchanged."""
+
+    if cache is None or not check.inputs:
+        return check.run(log_dir, echo)
+    fingerprint = cache.fingerprint(check)
+    cached = cache.load(check, fingerprint, log_dir)
+    if cached is not None:
+        return cached
+    result = check.run(log_dir, echo)
+    cache.store(check, fingerprint, result)
+    return result
+
+
+@dataclass
+class PlanTarget:
+    """One environment's plan JSON, plus where to write the plan when it must be generated."""
+
+    env: str
+    env_dir: Path
+    plan_json: Path
+    plan_path: Optional[Path] = None
+
+
+class PlanCache:
+    """Persistent Terraform plans keyed by the sources they were built from.
+
+    The key hashes the ``.tf``/``.tfvars`` files (and provider lock file) of an
+    environment and of every local module it references, transitively. A
+    ``plan.json`` stored under an unchanged key is reused without running
+    Terraform; otherwise the target points plan and show at a fresh entry and
+    older entries for that environment are dropped.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory / "plans"
+
+    def target(self, env: str, env_dir: Path, *, rebuild: bool = False) -> PlanTarget:
+        key = self.key(env_dir)
+        entry = self._directory / env / key
+        plan_json = entry / "plan.json"
+        if plan_json.exists() and not rebuild:
+            return PlanTarget(env, env_dir, plan_json)
+        if entry.parent.exists():
+            for stale in entry.parent.iterdir():
+                if stale.name != key:
+                    shutil.rmtree(stale, ignore_errors=True)
+        entry.mkdir(parents=True, exist_ok=True)
+        return PlanTarget(env, env_dir, plan_json, entry / "plan.out")
+
+    def key(self, env_dir: Path) -> str:
+        digest = hashlib.sha256()
+        for path in terraform_sources(env_dir):
+            digest.update(f"{_label(path)}\0".encode("utf-8"))
+            digest.update(path.read_bytes())
+        return digest.hexdigest()[:32]
+
+
+def terraform_sources(env_dir: Path) -> List[Path]:
+    """Source files of ``env_dir`` and of every local module it references."""
+
+    files: List[Path] = []
+    seen = set()
+    queue = [env_dir.resolve()]
+    while queue:
+        directory = queue.pop()
+        if directory in seen or not directory.is_dir():
+            continue
+        seen.add(directory)
+        for path in sorted({match for pattern in TERRAFORM_SOURCES for match in directory.glob(pattern)}):
+            files.append(path)
+            if path.suffix == ".tf":
+                text = path.read_text(encoding="utf-8", errors="replace")
+                queue.extend((directory / source).resolve() for source in MODULE_SOURCE.findall(text))
+    return sorted(files)
+
+
+def discover_targets(directory: Path) -> Dict[str, Path]:
+    """Subdirectories of ``directory`` holding Terraform code, by name."""
+
+    if not directory.is_dir():
+        return {}
+    return {
+        path.name: path for path in sorted(directory.iterdir()) if path.is_dir() and any(path.glob("*.tf"))
+    }
+
+
+def pregenerated_plan(env: str, *, single: bool = False) -> Path:
+    """The plan JSON ``--skip-plan`` evaluates for ``env``.
+
+    Each environment reads ``plan-<env>.json`` from the repository root; when
+    only one environment is selected a plain ``plan.json`` is used instead
+    if the per-environment file does not exist.
+    """
+
+    plan_json = ROOT / f"plan-{env}.json"
+    if single and not plan_json.exists():
+        return ROOT / "plan.json"
+    return plan_json
+
+
 def ensure_dependencies(commands: List[str]) -> None:
     missing = [cmd for cmd in commands if shutil.which(cmd) is None]
     if missing:
         sys.exit(f"Missing required tools: {', '.join(missing)}")
+    missing = [package for module, package in PYTHON_REQUIREMENTS.items() if importlib.util.find_spec(module) is None]
+    if missing:
+        sys.exit(f"Missing required Python packages: {', '.join(missing)} (pip install -r scripts/requirements.txt)")
 
 
-def generate_plan(plan_path: Path) -> CheckResult:
-    cmd = [
-        "terraform",
-        "plan",
-        "-out",
-        str(plan_path),
-    ]
-    start = datetime.now()
-    proc = subprocess.run(cmd, cwd=DEV_ENV, capture_output=True, text=True)
-    duration = (datetime.now() - start).total_seconds()
-    return CheckResult(cmd, DEV_ENV, proc.returncode, proc.stdout, proc.stderr, duration)
+def build_checks(
+    plans: List[PlanTarget],
+    *,
+    envs: Dict[str, Path],
+    modules: Dict[str, Path],
+    refresh: bool = True,
+    opa: bool = False,
+    benchmark_baselines: Optional[Path] = None,
+    accept_benchmarks: bool = False,
+) -> List[Check]:
+    """Return the pipeline checks, generating each target's plan ahead of policy evaluation when needed.
 
+    Every environment in ``envs`` is formatted, validated and scanned on its
+    own, and every module in ``modules`` is scanned on its own, so the
+    targets run side by side instead of as one scan of the whole tree. With
+    ``benchmark_baselines`` set, the app benchmarks run after the Python
+    checks and fail on a regression against the baselines stored there. The
+    first run seeds them; afterwards they only change with
+    ``accept_benchmarks``, which makes the current results the new baselines.
+    """
 
-def convert_plan_to_json(plan_path: Path, json_path: Path) -> CheckResult:
-    cmd = [
-        "terraform",
-        "show",
-        "-json",
-        str(plan_path),
-    ]
-    start = datetime.now()
-    proc = subprocess.run(cmd, cwd=DEV_ENV, capture_output=True, text=True)
-    duration = (datetime.now() - start).total_seconds()
-    if proc.returncode == 0:
-        json_path.write_text(proc.stdout, encoding="utf-8")
-    return CheckResult(cmd, DEV_ENV, proc.returncode, proc.stdout, proc.stderr, duration)
-
-
-def build_checks(plan_json: Path) -> List[Check]:
-    return [
+    pyproject = APP_DIR / "pyproject.toml"
+    checks = [
         Check(
-            [sys.executable, "-m", "pip", "install", "-e", f"{ROOT / 'app'}[dev]"],
+            [sys.executable, "-m", "pip", "install", "-e", f"{APP_DIR}[dev]"],
             ROOT,
             "Install dev dependencies for app",
+            key="install",
+            inputs=[pyproject],
         ),
-        Check(["ruff", "check", str(ROOT / "app" / "src")], ROOT, "Python lint"),
-        Check(["mypy", str(ROOT / "app" / "src")], ROOT, "Type checks"),
-        Check(["pytest", str(ROOT / "app" / "tests")], ROOT, "Unit tests"),
-        Check(["terraform", "fmt", "-check"], DEV_ENV, "Terraform formatting"),
-        Check(["terraform", "validate"], DEV_ENV, "Terraform validate"),
-        Check(["checkov", "-d", str(INFRA_DIR)], ROOT, "Checkov IaC scan"),
         Check(
-            [
-                "opa",
-                "eval",
-                "--data",
-                str(POLICY_DIR),
-                "--input",
-                str(plan_json),
-                "data.security.allow",
-            ],
+            ["ruff", "check", str(APP_DIR / "src")],
             ROOT,
-            "OPA policy evaluation",
-            hint="Review policies in policies/opa if this fails",
-            ensure_file=plan_json,
+            "Python lint",
+            key="ruff",
+            depends_on=["install"],
+            inputs=[APP_DIR / "src", pyproject],
         ),
         Check(
-            [
-                "trivy",
-                "fs",
-                "--exit-code",
-                "1",
-                "--severity",
-                "HIGH,CRITICAL",
-                str(ROOT / "infra"),
-            ],
+            ["mypy", str(APP_DIR / "src")],
+            ROOT,
+            "Type checks",
+            key="mypy",
+            depends_on=["install"],
+            inputs=[APP_DIR / "src", pyproject],
+        ),
+        Check(
+            ["pytest", str(APP_DIR / "tests")],
             ROOT,
-            "Trivy filesystem scan",
+            "Unit tests",
+            key="pytest",
+            depends_on=["install"],
+            inputs=[APP_DIR / "src", APP_DIR / "tests", pyproject],
+        ),
+        Check(
+            ["pytest", str(SCRIPTS_DIR / "tests")],
+            ROOT,
+            "Pipeline unit tests",
+            key="pytest-scripts",
+            depends_on=["install"],
+            inputs=[SCRIPTS_DIR, POLICY_DIR],
         ),
     ]
+    for target in plans:
+        plan_depends_on: List[str] = []
+        if target.plan_path is not None:
+            plan_command = ["terraform", "plan", "-out", str(target.plan_path)]
+            if not refresh:
+                plan_command.append("-refresh=false")
+            checks += [
+                Check(
+                    plan_command,
+                    target.env_dir,
+                    f"Terraform plan ({target.env})",
+                    key=f"terraform-plan-{target.env}",
+                    target=f"env:{target.env}",
+                ),
+                Check(
+                    ["terraform", "show", "-json", str(target.plan_path)],
+                    target.env_dir,
+                    f"Export {target.env} plan as JSON",
+                    key=f"terraform-show-{target.env}",
+                    depends_on=[f"terraform-plan-{target.env}"],
+                    stdout_path=target.plan_json,
+                    target=f"env:{target.env}",
+                ),
+            ]
+            plan_depends_on = [f"terraform-show-{target.env}"]
+        checks.append(
+            Check(
+                [sys.executable, str(Path(plan_policies.__file__)), str(target.plan_json)],
+                ROOT,
+                f"Policy evaluation ({target.env})",
+                hint="Review policies/opa and policies/terraform-validator if this fails",
+                ensure_file=target.plan_json,
+                key=f"policy-{target.env}",
+                depends_on=plan_depends_on,
+                inputs=[POLICY_DIR, target.plan_json, Path(plan_policies.__file__)],
+                version_command=[sys.executable, "--version"],
+                action=functools.partial(plan_policies.report, target.plan_json, POLICY_DIR),
+                target=f"env:{target.env}",
+            )
+        )
+        if opa:
+            checks.append(
+                Check(
+                    [
+                        "opa",
+                        "eval",
+                        "--fail-defined",
+                        "--format",
+                        "pretty",
+                        "--data",
+                        str(POLICY_DIR / "opa"),
+                        "--input",
+                        str(target.plan_json),
+                        OPA_PLAN_QUERY,
+                    ],
+                    ROOT,
+                    f"OPA policy cross-check ({target.env})",
+                    hint="Review policies in policies/opa if this fails; each result is a denied resource change",
+                    ensure_file=target.plan_json,
+                    key=f"opa-{target.env}",
+                    depends_on=plan_depends_on,
+                    inputs=[POLICY_DIR, target.plan_json],
+                    version_command=["opa", "version"],
+                    target=f"env:{target.env}",
+                )
+            )
+    # Declared after the plans so the longest-running targets start first.
+    for env, env_dir in envs.items():
+        checks += [
+            Check(
+                ["terraform", "fmt", "-check"],
+                env_dir,
+                f"Terraform formatting ({env})",
+                key=f"terraform-fmt-{env}",
+                inputs=[env_dir],
+                target=f"env:{env}",
+            ),
+            Check(
+                ["terraform", "validate"],
+                env_dir,
+                f"Terraform validate ({env})",
+                key=f"terraform-validate-{env}",
+                inputs=[env_dir, MODULES_DIR],
+                target=f"env:{env}",
+            ),
+        ]
+    scan_targets = [("env", name, path) for name, path in envs.items()]
+    scan_targets += [("module", name, path) for name, path in modules.items()]
+    for kind, name, path in scan_targets:
+        checks += [
+            Check(
+                ["checkov", "-d", str(path)],
+                ROOT,
+                f"Checkov IaC scan ({kind} {name})",
+                key=f"checkov-{kind}-{name}",
+                inputs=[path, MODULES_DIR] if kind == "env" else [path],
+                target=f"{kind}:{name}",
+            ),
+            Check(
+                ["trivy", "fs", "--exit-code", "1", "--severity", "HIGH,CRITICAL", str(path)],
+                ROOT,
+                f"Trivy filesystem scan ({kind} {name})",
+                key=f"trivy-{kind}-{name}",
+                inputs=[path],
+                target=f"{kind}:{name}",
+            ),
+        ]
+    if benchmark_baselines is not None:
+        after = ["ruff", "mypy", "pytest"]
+        for name in ("micro", "load"):
+            output = REPORT_DIR / "benchmarks" / f"{name}.json"
+            checks.append(
+                Check(
+                    [
+                        sys.executable,
+                        str(BENCHMARK_DIR / f"{name}.py"),
+                        "--output",
+                        str(output),
+                        "--baseline",
+                        str(benchmark_baselines / f"{name}.json"),
+                        "--update-baseline" if accept_benchmarks else "--seed-baseline",
+                    ],
+                    APP_DIR,
+                    f"Benchmarks ({name})",
+                    hint="Compare with the stored baseline; rerun with --accept-benchmarks for an intended slowdown",
+                    key=f"bench-{name}",
+                    depends_on=after,
+                    inputs=[APP_DIR / "src", BENCHMARK_DIR, pyproject],
+                    outputs=[output],
+                )
+            )
+            # Run one benchmark at a time so they do not compete for CPU.
+            after = [f"bench-{name}"]
+    return checks
 
 
-def run_checks(checks: List[Check]) -> List[CheckResult]:
-    results: List[CheckResult] = []
-    console = Console() if Console else None
+def validate_graph(checks: List[Check]) -> None:
+    """Exit if a dependency is unknown or the checks form a cycle."""
+
+    by_name = {check.name: check for check in checks}
+    for check in checks:
+        unknown = [dep for dep in check.depends_on if dep not in by_name]
+        if unknown:
+            raise SystemExit(f"Check {check.name} depends on unknown checks: {', '.join(unknown)}")
+
+    visiting: Dict[str, bool] = {}
+
+    def visit(name: str) -> None:
+        if visiting.get(name) is False:
+            return
+        if visiting.get(name) is True:
+            raise SystemExit(f"Dependency cycle detected at check {name}")
+        visiting[name] = True
+        for dep in by_name[name].depends_on:
+            visit(dep)
+        visiting[name] = False
 
     for check in checks:
-        if check.ensure_file and not check.ensure_file.exists():
-            raise SystemExit(f"Required file missing for {check.name}: {check.ensure_file}")
-        if console:
-            console.rule(check.description)
-            console.print(f"[bold cyan]$ {' '.join(check.command)}[/bold cyan]", highlight=False)
-        result = check.run()
-        results.append(result)
-        if console:
-            color = "green" if result.passed else "red"
-            console.print(f"[{color}]Return code: {result.returncode} (took {result.duration:.2f}s)[/{color}]\n")
-            if result.stdout.strip():
-                console.print(Text(result.stdout, style="dim"))
-            if result.stderr.strip():
-                console.print(Text(result.stderr, style="bright_red"))
-        if not result.passed:
-            break
-    return results
-
-
-def save_reports(results: List[CheckResult]) -> None:
+        visit(check.name)
+
+
+def run_checks(
+    checks: List[Check],
+    *,
+    jobs: int = 1,
+    fail_fast: bool = True,
+    cache: Optional[CheckCache] = None,
+    log_dir: Optional[Path] = None,
+) -> List[CheckResult]:
+    """Run ``checks`` respecting ``depends_on`` with at most ``jobs`` in parallel.
+
+    A check starts once all of its dependencies passed; dependants of a failed
+    check are skipped. With ``fail_fast`` no new checks start after the first
+    failure and everything not yet started is skipped. Results come back in
+    declaration order regardless of completion order. With a ``cache``,
+    checks whose inputs are unchanged replay their stored result. Output is
+    streamed to the console as it arrives and logged under ``log_dir``.
+    """
+
+    validate_graph(checks)
+    console = Console() if Console else None
+    results: Dict[str, CheckResult] = {}
+    pending = list(checks)
+    running: Dict[Future[CheckResult], Check] = {}
+    stopped = False
+
+    def schedule(pool: ThreadPoolExecutor) -> None:
+        progressed = True
+        while progressed and not stopped:
+            progressed = False
+            for check in list(pending):
+                if len(running) >= jobs:
+                    return
+                dependencies = [results.get(dep) for dep in check.depends_on]
+                if any(dep is None for dep in dependencies):
+                    continue
+                pending.remove(check)
+                progressed = True
+                failed = [dep.key for dep in dependencies if dep is not None and not dep.passed]
+                if failed:
+                    results[check.name] = check.skip(f"Skipped because {', '.join(failed)} did not pass")
+                    continue
+                if console:
+                    console.print(f"[bold cyan]▶ {check.description}: $ {' '.join(check.command)}[/bold cyan]", highlight=False)
+                echo = functools.partial(_echo, check.name)
+                running[pool.submit(execute_check, check, cache, log_dir, echo)] = check
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        schedule(pool)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                check = running.pop(future)
+                result = future.result()
+                results[check.name] = result
+                _print_result(console, check, result)
+                if not result.passed and fail_fast:
+                    stopped = True
+            schedule(pool)
+
+    for check in pending:
+        results[check.name] = check.skip("Skipped after an earlier failure (fail-fast)")
+    return [results[check.name] for check in checks]
+
+
+def _echo(name: str, stream: str, line: str) -> None:
+    # Plain writes: rendering every line through rich costs more than the tools producing them.
+    marker = "!" if stream == "stderr" else "|"
+    with _ECHO_LOCK:
+        sys.stdout.write(f"{name} {marker} {line}\n")
+        sys.stdout.flush()
+
+
+def _print_result(console: Optional["Console"], check: Check, result: CheckResult) -> None:
+    if not console:
+        return
+    console.rule(check.description)
+    console.print(f"[bold cyan]$ {' '.join(check.command)}[/bold cyan]", highlight=False)
+    color = "green" if result.passed else "red"
+    timing = "replayed from cache" if result.cached else f"took {result.duration:.2f}s"
+    console.print(f"[{color}]Return code: {result.returncode} ({timing})[/{color}]")
+    for log in (result.stdout_log, result.stderr_log):
+        if log is not None and log.stat().st_size:
+            console.print(f"[dim]Log: {log}[/dim]", highlight=False)
+    if result.cached or result.skipped or result.stderr_log is None:
+        # Nothing was streamed for these, so show what was recorded.
+        if result.stdout.strip():
+            console.print(Text(result.stdout, style="dim"))
+        if result.stderr.strip():
+            console.print(Text(result.stderr, style="bright_red"))
+    console.print()
+
+
+def save_reports(
+    results: List[CheckResult], timestamp: Optional[str] = None, wall_clock: Optional[float] = None
+) -> None:
+    """Write JSON and Markdown summaries that excerpt output tails and link the full logs.
+
+    The Markdown report opens with one row per target (environment, module,
+    or the app for checks without one) and, given the run's ``wall_clock``,
+    compares it with the summed check durations.
+    """
+
     REPORT_DIR.mkdir(exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    timestamp = timestamp or datetime.now().strftime("%Y%m%d-%H%M%S")
     json_report = REPORT_DIR / f"security-run-{timestamp}.json"
     json_report.write_text(
         json.dumps(
             [
                 {
+                    "check": r.key,
+                    "target": r.target or None,
                     "command": r.name,
                     "cwd": str(r.cwd),
                     "returncode": r.returncode,
+                    "skipped": r.skipped,
+                    "cached": r.cached,
                     "duration": r.duration,
                     "stdout": r.stdout,
                     "stderr": r.stderr,
+                    "stdout_truncated": r.stdout_truncated,
+                    "stderr_truncated": r.stderr_truncated,
+                    "stdout_log": _report_path(r.stdout_log),
+                    "stderr_log": _report_path(r.stderr_log),
                     "hint": r.hint,
                 }
                 for r in results
@@ -215,55 +924,191 @@ def save_reports(results: List[CheckResult]) -> None:
     md_report = REPORT_DIR / f"security-run-{timestamp}.md"
     with md_report.open("w", encoding="utf-8") as handle:
         handle.write(f"# Security Run Summary ({timestamp})\n\n")
+        _write_targets(handle, results, wall_clock)
         for res in results:
-            status = "✅" if res.passed else "❌"
-            handle.write(f"## {status} {res.name}\n")
+            status = "⏭️" if res.skipped else "✅" if res.passed else "❌"
+            handle.write(f"## {status} {res.name}{' (cached)' if res.cached else ''}\n")
+            if res.target:
+                handle.write(f"- target: {res.target}\n")
             handle.write(f"- cwd: `{res.cwd}`\n")
             handle.write(f"- returncode: {res.returncode}\n")
             handle.write(f"- duration: {res.duration:.2f}s\n")
             if res.hint:
                 handle.write(f"- hint: {res.hint}\n")
-            if res.stdout:
-                handle.write("\n<details><summary>stdout</summary>\n\n````\n" + res.stdout + "\n````\n</details>\n")
-            if res.stderr:
-                handle.write("\n<details><summary>stderr</summary>\n\n````\n" + res.stderr + "\n````\n</details>\n")
+            _write_excerpt(handle, "stdout", res.stdout, res.stdout_truncated, res.stdout_log)
+            _write_excerpt(handle, "stderr", res.stderr, res.stderr_truncated, res.stderr_log)
         handle.write("\nGenerated at: " + datetime.now().isoformat())
 
     print(f"JSON report: {json_report}")
     print(f"Markdown report: {md_report}")
 
 
+def _write_targets(handle: IO[str], results: List[CheckResult], wall_clock: Optional[float]) -> None:
+    targets: Dict[str, List[CheckResult]] = {}
+    for res in results:
+        targets.setdefault(res.target or "app", []).append(res)
+    handle.write("| Target | Passed | Failed | Skipped | Check time |\n|---|---|---|---|---|\n")
+    for name, group in targets.items():
+        passed = sum(res.passed for res in group)
+        skipped = sum(res.skipped for res in group)
+        duration = sum(res.duration for res in group)
+        handle.write(f"| {name} | {passed} | {len(group) - passed - skipped} | {skipped} | {duration:.2f}s |\n")
+    if wall_clock is not None:
+        total = sum(res.duration for res in results)
+        handle.write(f"\nWall clock {wall_clock:.2f}s for {total:.2f}s of check time.\n")
+    handle.write("\n")
+
+
+def _report_path(path: Optional[Path]) -> Optional[str]:
+    if path is None:
+        return None
+    try:
+        return path.relative_to(REPORT_DIR).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def _write_excerpt(handle: IO[str], stream: str, tail: str, truncated: bool, log: Optional[Path]) -> None:
+    if not tail:
+        return
+    summary = f"{stream} (last {TAIL_LINES} lines)" if truncated else stream
+    if log is not None:
+        summary += f", full log: <code>{_report_path(log)}</code>"
+    handle.write(f"\n<details><summary>{summary}</summary>\n\n````\n{tail}\n````\n</details>\n")
+
+
+def record_history(
+    history: run_history.RunHistory,
+    checks: List[Check],
+    results: List[CheckResult],
+    start: datetime,
+    wall_clock: float,
+) -> None:
+    """Append the run to ``history``; a history that cannot be written only warns."""
+
+    try:
+        history.record(
+            start.isoformat(timespec="seconds"),
+            wall_clock,
+            [
+                run_history.CheckRun(
+                    result.key,
+                    result.duration,
+                    result.returncode,
+                    target=result.target,
+                    depends_on=check.depends_on,
+                    skipped=result.skipped,
+                    cached=result.cached,
+                )
+                for check, result in zip(checks, results)
+            ],
+        )
+    except sqlite3.Error as exc:
+        print(f"Could not record the run history: {exc}", file=sys.stderr)
+
+
 def main() -> None:
+    envs = discover_targets(ENVS_DIR)
     parser = argparse.ArgumentParser(description="Run security validation pipeline")
-    parser.add_argument("--skip-plan", action="store_true", help="Skip terraform plan generation")
+    parser.add_argument(
+        "--skip-plan",
+        action="store_true",
+        help="Skip terraform plan generation and evaluate plan-<env>.json (or plan.json for a single --env)",
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=os.cpu_count() or 1, help="Maximum number of checks to run concurrently"
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Stop starting new checks after the first failure (default: on)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Replay cached results for checks whose inputs and tool versions are unchanged",
+    )
+    parser.add_argument(
+        "--cache-dir", type=Path, default=CACHE_DIR, help="Location of the check result and plan caches"
+    )
+    parser.add_argument(
+        "--env",
+        dest="envs",
+        action="append",
+        choices=sorted(envs),
+        help="Environment to plan and evaluate (repeatable; default: all)",
+    )
+    parser.add_argument(
+        "--rebuild-plans", action="store_true", help="Regenerate plans even when the cached plan is current"
+    )
+    parser.add_argument(
+        "--no-refresh",
+        action="store_true",
+        help="Run terraform plan with -refresh=false (e.g. when only policies changed)",
+    )
+    parser.add_argument("--opa", action="store_true", help="Also cross-check plans with `opa eval`")
+    parser.add_argument(
+        "--benchmarks",
+        action="store_true",
+        help="Also run the app benchmarks and fail on a regression against the stored baseline",
+    )
+    parser.add_argument(
+        "--accept-benchmarks",
+        action="store_true",
+        help="With --benchmarks, store this run's results as the new baseline instead of failing on regressions",
+    )
+    parser.add_argument(
+        "--history",
+        type=Path,
+        help="Run history database (default: history.sqlite in the cache directory)",
+    )
+    parser.add_argument(
+        "--trend",
+        action="store_true",
+        help="Print the trend report from the run history instead of running checks",
+    )
+    parser.add_argument(
+        "--trend-window", type=int, default=20, help="Previous runs the trend report's rolling median covers"
+    )
     args = parser.parse_args()
 
-    ensure_dependencies(["ruff", "mypy", "pytest", "terraform", "checkov", "opa", "trivy"])
-
-    with tempfile.TemporaryDirectory() as tmpdir:
-        plan_path = Path(tmpdir) / "plan.out"
-        plan_json = Path(tmpdir) / "plan.json"
-
-        if not args.skip_plan:
-            plan_result = generate_plan(plan_path)
-            if plan_result.returncode != 0:
-                print(plan_result.stdout)
-                print(plan_result.stderr, file=sys.stderr)
-                sys.exit(plan_result.returncode)
-            show_result = convert_plan_to_json(plan_path, plan_json)
-            if show_result.returncode != 0:
-                print(show_result.stdout)
-                print(show_result.stderr, file=sys.stderr)
-                sys.exit(show_result.returncode)
-        else:
-            plan_json = ROOT / "plan.json"
-
-        checks = build_checks(plan_json)
-        results = run_checks(checks)
-        save_reports(results)
-
-        if not results[-1].passed:
-            sys.exit(results[-1].returncode)
+    history = run_history.RunHistory(args.history or args.cache_dir / "history.sqlite")
+    if args.trend:
+        print(run_history.trend_report(history, window=args.trend_window), end="")
+        return
+
+    ensure_dependencies(["ruff", "mypy", "pytest", "terraform", "checkov", "trivy"] + (["opa"] if args.opa else []))
+
+    selected = {env: envs[env] for env in args.envs or sorted(envs)}
+    if args.skip_plan:
+        single = len(selected) == 1
+        plans = [PlanTarget(env, env_dir, pregenerated_plan(env, single=single)) for env, env_dir in selected.items()]
+    else:
+        plan_cache = PlanCache(args.cache_dir)
+        plans = [plan_cache.target(env, env_dir, rebuild=args.rebuild_plans) for env, env_dir in selected.items()]
+    checks = build_checks(
+        plans,
+        envs=selected,
+        modules=discover_targets(MODULES_DIR),
+        refresh=not args.no_refresh,
+        opa=args.opa,
+        benchmark_baselines=args.cache_dir / "benchmarks" if args.benchmarks else None,
+        accept_benchmarks=args.accept_benchmarks,
+    )
+
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    log_dir = REPORT_DIR / f"security-run-{timestamp}-logs"
+    cache = CheckCache(args.cache_dir) if args.incremental else None
+    start = datetime.now()
+    results = run_checks(checks, jobs=args.jobs, fail_fast=args.fail_fast, cache=cache, log_dir=log_dir)
+    wall_clock = (datetime.now() - start).total_seconds()
+    save_reports(results, timestamp, wall_clock=wall_clock)
+    record_history(history, checks, results, start, wall_clock)
+
+    failures = [result for result in results if not result.passed and not result.skipped]
+    if failures:
+        sys.exit(failures[0].returncode or 1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""In-process policy evaluation for Terraform plan JSON.
+
+Mirrors the repo's policies without shelling out to ``opa``:
+- ``policies/opa/storage.rego``: buckets must keep uniform bucket-level access.
+- ``policies/terraform-validator/*.yaml``: constraints such as denying public
+  IPs on Cloud SQL instances for the configured plan actions.
+
+The plan is stream-parsed with ``ijson`` (listed in ``requirements.txt`` and
+required by the pipeline; standalone runs without it fall back to
+``json.load``); ``resource_changes`` are indexed by type and every rule runs in
+the same pass. Terraform-validator constraints need ``PyYAML``: without it the
+evaluation fails instead of silently dropping them.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+try:
+    import ijson
+except ImportError:  # fall back to loading the whole plan
+    ijson = None  # type: ignore
+
+try:
+    import yaml
+except ImportError:  # terraform-validator constraints are skipped without PyYAML
+    yaml = None  # type: ignore
+
+ROOT = Path(__file__).resolve().parents[1]
+POLICY_DIR = ROOT / "policies"
+
+Change = Dict[str, Any]
+
+
+class PolicyError(RuntimeError):
+    """The policies cannot be evaluated as shipped."""
+
+
+class Violation(NamedTuple):
+    policy: str
+    address: str
+    message: str
+
+
+@dataclass
+class Rule:
+    """A check applied to every resource change of ``resource_type``."""
+
+    policy: str
+    resource_type: str
+    evaluate: Callable[[Change], Optional[str]]
+    actions: List[str] = field(default_factory=list)
+
+    def applies_to(self, change: Change) -> bool:
+        if change.get("change", {}).get("after") is None:
+            return False
+        return not self.actions or any(action in self.actions for action in change["change"].get("actions", []))
+
+
+def iter_resource_changes(plan_json: Path) -> Iterator[Change]:
+    """Yield ``resource_changes`` one at a time without materialising the whole plan."""
+
+    with plan_json.open("rb") as handle:
+        if ijson is not None:
+            yield from ijson.items(handle, "resource_changes.item", use_float=True)
+        else:
+            yield from json.load(handle).get("resource_changes", [])
+
+
+def _uniform_bucket_access(change: Change) -> Optional[str]:
+    if change["change"]["after"].get("uniform_bucket_level_access") is False:
+        return f"Bucket {change.get('name')} must enable uniform bucket-level access"
+    return None
+
+
+def _deny_public_sql_ip(change: Change) -> Optional[str]:
+    after, unknown = change["change"]["after"], change["change"].get("after_unknown") or {}
+    if unknown.get("settings") is True:
+        return None
+    for settings in after.get("settings") or [{}]:
+        ip_configurations = settings.get("ip_configuration") or [{}]
+        # Cloud SQL assigns a public IPv4 address unless it is explicitly disabled.
+        if any(config.get("ipv4_enabled") is not False for config in ip_configurations):
+            return f"Cloud SQL instance {change.get('name')} must not enable a public IPv4 address"
+    return None
+
+
+CONSTRAINT_PARAMETERS: Dict[str, Callable[[Change], Optional[str]]] = {
+    "denyPublicIp": _deny_public_sql_ip,
+}
+
+
+def load_rules(policy_dir: Path = POLICY_DIR) -> List[Rule]:
+    rules = [Rule("opa/storage.rego", "google_storage_bucket", _uniform_bucket_access)]
+    constraint_dir = policy_dir / "terraform-validator"
+    constraints = sorted(constraint_dir.glob("*.yaml")) if constraint_dir.is_dir() else []
+    if constraints and yaml is None:
+        raise PolicyError(
+            f"PyYAML is required to evaluate {len(constraints)} terraform-validator constraint(s); "
+            "install scripts/requirements.txt"
+        )
+    for path in constraints:
+        spec = (yaml.safe_load(path.read_text(encoding="utf-8-sig")) or {}).get("spec", {})
+        parameters = spec.get("parameters", {})
+        for parameter, evaluate in CONSTRAINT_PARAMETERS.items():
+            if parameters.get(parameter):
+                rules.append(
+                    Rule(
+                        f"terraform-validator/{path.name}",
+                        parameters["resource"],
+                        evaluate,
+                        actions=list(parameters.get("methods", [])),
+                    )
+                )
+    return rules
+
+
+def evaluate_plan(plan_json: Path, rules: List[Rule]) -> Dict[str, Any]:
+    """Evaluate ``rules`` in one pass over the plan's resource changes.
+
+    Returns the violations together with the per-type index of the changes
+    the rules looked at and a count of every resource type in the plan.
+    """
+
+    rules_by_type: Dict[str, List[Rule]] = {}
+    for rule in rules:
+        rules_by_type.setdefault(rule.resource_type, []).append(rule)
+
+    index: Dict[str, List[Change]] = {}
+    counts: Dict[str, int] = {}
+    violations: List[Violation] = []
+    for change in iter_resource_changes(plan_json):
+        resource_type = change.get("type", "")
+        counts[resource_type] = counts.get(resource_type, 0) + 1
+        type_rules = rules_by_type.get(resource_type)
+        if not type_rules:
+            continue
+        index.setdefault(resource_type, []).append(change)
+        for rule in type_rules:
+            message = rule.evaluate(change) if rule.applies_to(change) else None
+            if message:
+                violations.append(Violation(rule.policy, change.get("address", resource_type), message))
+    return {"violations": violations, "index": index, "counts": counts}
+
+
+def report(plan_json: Path, policy_dir: Path = POLICY_DIR, emit: Callable[[str], None] = print) -> int:
+    """Evaluate ``plan_json`` and emit one line per violation; return a process exit code."""
+
+    try:
+        rules = load_rules(policy_dir)
+    except PolicyError as exc:
+        emit(f"ERROR {exc}")
+        return 2
+    outcome = evaluate_plan(plan_json, rules)
+    checked = sum(len(changes) for changes in outcome["index"].values())
+    emit(f"Evaluated {len(rules)} rules against {checked} of {sum(outcome['counts'].values())} resource changes")
+    for violation in outcome["violations"]:
+        emit(f"DENY {violation.address} [{violation.policy}]: {violation.message}")
+    return 1 if outcome["violations"] else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Evaluate repo policies against a Terraform plan JSON")
+    parser.add_argument("plan_json", type=Path)
+    parser.add_argument("--policy-dir", type=Path, default=POLICY_DIR)
+    args = parser.parse_args()
+    sys.exit(report(args.plan_json, args.policy_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Append-only history of pipeline runs and the trend report built from it.
+
+Every run of ``advanced_security_pipeline.py`` appends one row per check
+(duration, return code, cache and skip state, dependencies) to a SQLite
+database. The trend report reads only the most recent runs, so it stays
+fast however long the history grows, and shows:
+- the slowest checks by median duration;
+- checks whose latest duration regressed against the median of the runs
+  before it;
+- the critical path through the latest check graph, weighted by median
+  durations, which bounds the wall clock however many jobs run in parallel.
+
+Cached and skipped results did not run the tool and are left out of the
+timings.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import sqlite3
+import statistics
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+HISTORY_PATH = ROOT / ".pipeline-cache" / "history.sqlite"
+MIN_SAMPLES = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started TEXT NOT NULL,
+    wall_clock REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checks (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    check_key TEXT NOT NULL,
+    target TEXT NOT NULL,
+    depends_on TEXT NOT NULL,
+    duration REAL NOT NULL,
+    returncode INTEGER NOT NULL,
+    skipped INTEGER NOT NULL,
+    cached INTEGER NOT NULL,
+    PRIMARY KEY (run_id, check_key)
+) WITHOUT ROWID;
+"""
+
+
+@dataclass
+class CheckRun:
+    key: str
+    duration: float
+    returncode: int
+    target: str = ""
+    depends_on: List[str] = field(default_factory=list)
+    skipped: bool = False
+    cached: bool = False
+
+    @property
+    def timed(self) -> bool:
+        """Whether ``duration`` measures the tool actually running."""
+
+        return not self.skipped and not self.cached
+
+
+@dataclass
+class Run:
+    id: int
+    started: str
+    wall_clock: float
+    checks: Dict[str, CheckRun]
+
+
+class RunHistory:
+    """SQLite store of pipeline runs; rows are only ever appended."""
+
+    def __init__(self, path: Path = HISTORY_PATH) -> None:
+        self._path = path
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with contextlib.closing(sqlite3.connect(self._path)) as connection:
+            connection.executescript(SCHEMA)
+            with connection:
+                yield connection
+
+    def record(self, started: str, wall_clock: float, checks: List[CheckRun]) -> int:
+        """Append one run in a single transaction and return its id."""
+
+        with self._connect() as connection:
+            cursor = connection.execute("INSERT INTO runs (started, wall_clock) VALUES (?, ?)", (started, wall_clock))
+            run_id = cursor.lastrowid
+            assert run_id is not None
+            connection.executemany(
+                "INSERT INTO checks VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        run_id,
+                        check.key,
+                        check.target,
+                        json.dumps(check.depends_on),
+                        check.duration,
+                        check.returncode,
+                        check.skipped,
+                        check.cached,
+                    )
+                    for check in checks
+                ],
+            )
+        return run_id
+
+    def recent(self, limit: int) -> List[Run]:
+        """The last ``limit`` runs, oldest first."""
+
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT id, started, wall_clock FROM runs ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+            if not rows:
+                return []
+            runs = {run_id: Run(run_id, started, wall_clock, {}) for run_id, started, wall_clock in rows}
+            for run_id, key, target, depends_on, duration, returncode, skipped, cached in connection.execute(
+                "SELECT * FROM checks WHERE run_id >= ?", (min(runs),)
+            ):
+                runs[run_id].checks[key] = CheckRun(
+                    key, duration, returncode, target, json.loads(depends_on), bool(skipped), bool(cached)
+                )
+        return [runs[run_id] for run_id in sorted(runs)]
+
+    def count(self) -> int:
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+
+def critical_path(graph: Dict[str, List[str]], durations: Dict[str, float]) -> Tuple[List[str], float]:
+    """The dependency chain with the largest summed duration, and that sum."""
+
+    finish: Dict[str, Tuple[float, Optional[str]]] = {}
+
+    def visit(key: str) -> float:
+        if key not in finish:
+            before = [(visit(dep), dep) for dep in graph.get(key, []) if dep in graph]
+            start, previous = max(before, default=(0.0, None))
+            finish[key] = (start + durations.get(key, 0.0), previous)
+        return finish[key][0]
+
+    if not graph:
+        return [], 0.0
+    end = max(graph, key=visit)
+    path: List[str] = []
+    node: Optional[str] = end
+    while node is not None:
+        path.append(node)
+        node = finish[node][1]
+    return path[::-1], finish[end][0]
+
+
+def trend_report(
+    history: RunHistory, *, window: int = 20, top: int = 10, threshold: float = 1.5, min_delta: float = 1.0
+) -> str:
+    """Markdown trend report over the last ``window`` runs plus the latest one.
+
+    A check has regressed when its latest duration exceeds ``threshold``
+    times its median over the preceding runs by at least ``min_delta``
+    seconds; it needs ``MIN_SAMPLES`` timed runs before it is judged.
+    """
+
+    runs = history.recent(window + 1)
+    if not runs:
+        return "# Pipeline Trend\n\nNo runs recorded yet.\n"
+    latest, previous = runs[-1], runs[:-1]
+    samples: Dict[str, List[float]] = {}
+    for run in previous:
+        for check in run.checks.values():
+            if check.timed:
+                samples.setdefault(check.key, []).append(check.duration)
+    medians = {key: statistics.median(values) for key, values in samples.items()}
+
+    summary = f"Latest of {history.count()} recorded runs ({latest.started}): wall clock {latest.wall_clock:.2f}s"
+    if previous:
+        median_wall_clock = statistics.median(run.wall_clock for run in previous)
+        summary += f", median {median_wall_clock:.2f}s over the {len(previous)} runs before it"
+    lines = [
+        "# Pipeline Trend",
+        "",
+        summary + ".",
+        "",
+        "## Slowest checks",
+        "",
+        "| Check | Target | Median | Latest | Earlier timed runs |",
+        "|---|---|---|---|---|",
+    ]
+    typical = dict(medians)
+    for check in latest.checks.values():
+        if check.timed:
+            typical.setdefault(check.key, check.duration)
+    for key in sorted(typical, key=typical.__getitem__, reverse=True)[:top]:
+        current = latest.checks.get(key)
+        last = f"{current.duration:.2f}s" if current is not None and current.timed else "-"
+        target = current.target if current is not None and current.target else "app"
+        lines.append(f"| {key} | {target} | {typical[key]:.2f}s | {last} | {len(samples.get(key, []))} |")
+
+    regressions = [
+        (check, medians[check.key])
+        for check in latest.checks.values()
+        if check.timed
+        and len(samples.get(check.key, [])) >= MIN_SAMPLES
+        and check.duration > threshold * medians[check.key]
+        and check.duration - medians[check.key] >= min_delta
+    ]
+    lines += ["", f"## Regressions (over {threshold:g}x the rolling median)", ""]
+    if regressions:
+        lines += ["| Check | Median | Latest | Change |", "|---|---|---|---|"]
+        for check, median in sorted(regressions, key=lambda item: item[0].duration - item[1], reverse=True):
+            lines.append(
+                f"| {check.key} | {median:.2f}s | {check.duration:.2f}s | +{check.duration - median:.2f}s |"
+            )
+    else:
+        lines.append("None.")
+
+    graph = {key: check.depends_on for key, check in latest.checks.items()}
+    path, total = critical_path(graph, typical)
+    lines += ["", f"## Critical path ({total:.2f}s at median durations)", ""]
+    lines += [f"1. {key} ({typical.get(key, 0.0):.2f}s)" for key in path]
+    return "\n".join(lines) + "\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Print the pipeline trend report from the run history")
+    parser.add_argument("--history", type=Path, default=HISTORY_PATH, help="Run history database")
+    parser.add_argument("--window", type=int, default=20, help="Previous runs the rolling median covers")
+    args = parser.parse_args()
+    print(trend_report(RunHistory(args.history), window=args.window), end="")
+
+
+if __name__ == "__main__":
+    main()
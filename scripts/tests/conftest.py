@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The pipeline scripts are run as plain files rather than installed; import them from the scripts directory.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, List, Sequence
+
+import pytest
+
+import advanced_security_pipeline as pipeline
+from advanced_security_pipeline import Check, CheckCache, PlanCache
+
+
+def _check(key: str, log: List[str], *, returncode: int = 0, depends_on: Sequence[str] = ()) -> Check:
+    """An in-process check that records when it starts in ``log``."""
+
+    def action(emit: Callable[[str], None]) -> int:
+        log.append(key)
+        return returncode
+
+    return Check([key], Path.cwd(), key, key=key, depends_on=list(depends_on), action=action)
+
+
+def test_checks_run_after_their_dependencies_and_report_in_declaration_order() -> None:
+    started: List[str] = []
+    checks = [
+        _check("report", started, depends_on=["lint", "test"]),
+        _check("test", started, depends_on=["install"]),
+        _check("lint", started, depends_on=["install"]),
+        _check("install", started),
+    ]
+
+    results = pipeline.run_checks(checks, jobs=2)
+
+    assert [result.key for result in results] == ["report", "test", "lint", "install"]
+    assert all(result.passed for result in results)
+    assert started[0] == "install" and started[-1] == "report"
+
+
+def test_independent_checks_overlap_up_to_jobs() -> None:
+    barrier = threading.Barrier(2, timeout=5)
+
+    def action(emit: Callable[[str], None]) -> int:
+        barrier.wait()
+        return 0
+
+    checks = [Check([name], Path.cwd(), name, key=name, action=action) for name in ("a", "b")]
+    assert all(result.passed for result in pipeline.run_checks(checks, jobs=2))
+
+
+def test_failure_skips_dependants_and_fail_fast_skips_everything_not_started() -> None:
+    started: List[str] = []
+    checks = [
+        _check("broken", started, returncode=3),
+        _check("after-broken", started, depends_on=["broken"]),
+        _check("independent", started),
+    ]
+
+    results = {result.key: result for result in pipeline.run_checks(checks, jobs=1, fail_fast=True)}
+    assert started == ["broken"]
+    assert results["broken"].returncode == 3 and not results["broken"].skipped
+    assert all("fail-fast" in results[key].stderr for key in ("after-broken", "independent"))
+
+    started.clear()
+    results = {result.key: result for result in pipeline.run_checks(checks, jobs=1, fail_fast=False)}
+    assert started == ["broken", "independent"]
+    assert results["independent"].passed
+    assert results["after-broken"].skipped and "broken did not pass" in results["after-broken"].stderr
+
+
+def _cached_check(source: Path, version: str, runs: List[str], returncode: int = 0) -> Check:
+    def action(emit: Callable[[str], None]) -> int:
+        runs.append(source.read_text(encoding="utf-8"))
+        return returncode
+
+    return Check(
+        ["lint", str(source)],
+        source.parent,
+        "Lint",
+        key="lint",
+        inputs=[source],
+        version_command=[sys.executable, "-c", f"print({version!r})"],
+        action=action,
+    )
+
+
+def test_cache_replays_until_inputs_or_tool_version_change(tmp_path: Path) -> None:
+    source = tmp_path / "src" / "module.py"
+    source.parent.mkdir()
+    source.write_text("x = 1\n", encoding="utf-8")
+    runs: List[str] = []
+    cache = CheckCache(tmp_path / "cache")
+
+    first = pipeline.execute_check(_cached_check(source, "1.0", runs), cache)
+    replayed = pipeline.execute_check(_cached_check(source, "1.0", runs), cache)
+    assert runs == ["x = 1\n"] and not first.cached and replayed.cached and replayed.passed
+
+    source.write_text("x = 22\n", encoding="utf-8")
+    assert not pipeline.execute_check(_cached_check(source, "1.0", runs), cache).cached
+    assert not pipeline.execute_check(_cached_check(source, "2.0", runs), cache).cached
+    assert pipeline.execute_check(_cached_check(source, "2.0", runs), cache).cached
+    assert runs == ["x = 1\n", "x = 22\n", "x = 22\n"]
+
+
+def test_cache_never_stores_failures(tmp_path: Path) -> None:
+    source = tmp_path / "module.py"
+    source.write_text("x = 1\n", encoding="utf-8")
+    runs: List[str] = []
+    cache = CheckCache(tmp_path / "cache")
+
+    for _ in range(2):
+        assert not pipeline.execute_check(_cached_check(source, "1.0", runs, returncode=1), cache).cached
+    assert len(runs) == 2
+
+
+def test_plan_cache_key_follows_env_and_module_sources(tmp_path: Path) -> None:
+    env_dir, module_dir = tmp_path / "envs" / "dev", tmp_path / "modules" / "bucket"
+    env_dir.mkdir(parents=True)
+    module_dir.mkdir(parents=True)
+    (env_dir / "main.tf").write_text('module "bucket" {\n  source = "../../modules/bucket"\n}\n', encoding="utf-8")
+    (env_dir / "notes.md").write_text("not a source\n", encoding="utf-8")
+    (module_dir / "main.tf").write_text('resource "google_storage_bucket" "b" {}\n', encoding="utf-8")
+    plans = PlanCache(tmp_path / "cache")
+
+    target = plans.target("dev", env_dir)
+    assert target.plan_path is not None
+    target.plan_json.write_text("{}", encoding="utf-8")
+    assert plans.target("dev", env_dir).plan_path is None
+    assert plans.target("dev", env_dir, rebuild=True).plan_path is not None
+
+    (env_dir / "notes.md").write_text("still not a source\n", encoding="utf-8")
+    assert plans.target("dev", env_dir).plan_path is None
+
+    (module_dir / "main.tf").write_text('resource "google_storage_bucket" "c" {}\n', encoding="utf-8")
+    changed = plans.target("dev", env_dir)
+    assert changed.plan_path is not None
+    assert [entry.name for entry in changed.plan_json.parents[1].iterdir()] == [changed.plan_json.parent.name]
+
+
+def test_targets_are_discovered_and_fanned_out_per_env_and_module(tmp_path: Path) -> None:
+    for directory, files in {
+        "envs/prod": ["main.tf"],
+        "envs/dev": ["main.tf", "terraform.tfvars.example"],
+        "envs/scratch": ["README.md"],
+        "modules/iam": ["main.tf"],
+    }.items():
+        (tmp_path / directory).mkdir(parents=True)
+        for name in files:
+            (tmp_path / directory / name).write_text("", encoding="utf-8")
+
+    envs = pipeline.discover_targets(tmp_path / "envs")
+    modules = pipeline.discover_targets(tmp_path / "modules")
+    assert list(envs) == ["dev", "prod"] and list(modules) == ["iam"]
+    assert pipeline.discover_targets(tmp_path / "missing") == {}
+
+    plans = [pipeline.PlanTarget(env, path, path / "plan.json", path / "plan.out") for env, path in envs.items()]
+    checks = pipeline.build_checks(plans, envs=envs, modules=modules)
+    pipeline.validate_graph(checks)
+    targets = {check.name: check.target for check in checks}
+    for env in envs:
+        for prefix in ("terraform-fmt", "terraform-validate", "terraform-plan", "policy", "checkov-env", "trivy-env"):
+            assert targets[f"{prefix}-{env}"] == f"env:{env}"
+    assert targets["checkov-module-iam"] == targets["trivy-module-iam"] == "module:iam"
+    names = [check.name for check in checks]
+    assert names.index("terraform-plan-prod") < names.index("checkov-env-dev")
+
+
+def test_output_tail_keeps_the_last_lines_and_marks_truncation() -> None:
+    tail = pipeline.OutputTail(max_lines=2, max_chars=10)
+    for line in ("one\n", "two\n"):
+        tail.append(line)
+    assert tail.text() == "one\ntwo\n" and not tail.truncated
+
+    tail.append("x" * 50 + "\n")
+    assert tail.text() == "two\n" + "x" * 10 + " ...[line truncated]\n"
+    assert tail.truncated
+
+
+def test_noisy_check_streams_everything_to_its_log_and_reports_only_the_tail(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(pipeline, "REPORT_DIR", tmp_path / "reports")
+    lines = pipeline.TAIL_LINES + 25
+    script = f"import sys\nfor i in range({lines}): print(f'line {{i}}')\nprint('boom', file=sys.stderr)\nsys.exit(4)"
+    check = Check([sys.executable, "-c", script], tmp_path, "Noisy", key="noisy")
+    echoed: List[str] = []
+
+    result = check.run(tmp_path / "reports" / "logs", lambda stream, line: echoed.append(f"{stream}:{line}"))
+
+    assert result.returncode == 4 and not result.passed
+    assert len(echoed) == lines + 1 and "stderr:boom" in echoed
+    assert result.stdout.splitlines() == [f"line {i}" for i in range(25, lines)]
+    assert result.stdout_truncated and not result.stderr_truncated
+    assert result.stdout_log is not None
+    assert result.stdout_log.read_text(encoding="utf-8").splitlines()[0] == "line 0"
+
+    pipeline.save_reports([result], "test")
+    report = (tmp_path / "reports" / "security-run-test.md").read_text(encoding="utf-8")
+    assert f"stdout (last {pipeline.TAIL_LINES} lines), full log: <code>logs/noisy.stdout.log</code>" in report
+    assert "<summary>stderr, full log: <code>logs/noisy.stderr.log</code>" in report
+    assert f"line {lines - 1}\n" in report and "line 24\n" not in report
+    entry = json.loads((tmp_path / "reports" / "security-run-test.json").read_text(encoding="utf-8"))[0]
+    assert entry["stdout_truncated"] and entry["stdout_log"] == "logs/noisy.stdout.log"
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import pytest
+
+import plan_policies
+
+STORAGE = "opa/storage.rego"
+PUBLIC_SQL = "terraform-validator/disallow_public_sql.yaml"
+
+
+def _change(
+    resource_type: str,
+    after: Optional[dict],
+    actions: Sequence[str] = ("create",),
+    after_unknown: Optional[dict] = None,
+) -> dict:
+    return {
+        "address": f"{resource_type}.main",
+        "type": resource_type,
+        "name": "main",
+        "change": {"actions": list(actions), "after": after, "after_unknown": after_unknown or {}},
+    }
+
+
+def _bucket(uniform: bool) -> dict:
+    return _change("google_storage_bucket", {"uniform_bucket_level_access": uniform})
+
+
+def _sql(
+    ip_configuration: Optional[dict], actions: Sequence[str] = ("create",), after_unknown: Optional[dict] = None
+) -> dict:
+    settings = {"ip_configuration": [ip_configuration]} if ip_configuration is not None else {}
+    return _change("google_sql_database_instance", {"settings": [settings]}, actions, after_unknown)
+
+
+@pytest.mark.parametrize(
+    ("changes", "denied"),
+    [
+        pytest.param([_bucket(uniform=False)], [STORAGE], id="bucket-without-uniform-access"),
+        pytest.param([_sql({"ipv4_enabled": True})], [PUBLIC_SQL], id="sql-with-public-ipv4"),
+        pytest.param([_sql(None)], [PUBLIC_SQL], id="sql-public-ipv4-by-default"),
+        pytest.param([_sql({"ipv4_enabled": True}, actions=["delete"])], [], id="sql-action-not-constrained"),
+        pytest.param(
+            [_sql({"ipv4_enabled": True}, after_unknown={"settings": True})], [], id="sql-settings-known-after-apply"
+        ),
+        pytest.param([_change("google_storage_bucket", None, actions=["delete"])], [], id="bucket-deleted"),
+        pytest.param([_bucket(uniform=True), _sql({"ipv4_enabled": False})], [], id="compliant-plan"),
+        pytest.param(
+            [_bucket(uniform=False), _sql({"ipv4_enabled": True}), _bucket(uniform=True)],
+            [STORAGE, PUBLIC_SQL],
+            id="violations-in-plan-order",
+        ),
+    ],
+)
+@pytest.mark.parametrize("streaming", [True, False], ids=["ijson", "json-load"])
+def test_plan_rules(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, changes: List[dict], denied: List[str], streaming: bool
+) -> None:
+    if not streaming:
+        monkeypatch.setattr(plan_policies, "ijson", None)
+    plan = tmp_path / "plan.json"
+    plan.write_text(json.dumps({"resource_changes": changes}), encoding="utf-8")
+
+    outcome = plan_policies.evaluate_plan(plan, plan_policies.load_rules())
+
+    assert [violation.policy for violation in outcome["violations"]] == denied
+    assert sum(outcome["counts"].values()) == len(changes)
+
+
+def test_missing_yaml_fails_instead_of_dropping_constraints(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(plan_policies, "yaml", None)
+    plan = tmp_path / "plan.json"
+    plan.write_text(json.dumps({"resource_changes": [_sql({"ipv4_enabled": True})]}), encoding="utf-8")
+    lines: List[str] = []
+
+    assert plan_policies.report(plan, emit=lines.append) == 2
+    assert lines[0].startswith("ERROR PyYAML is required")
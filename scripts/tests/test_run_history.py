@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict
+
+import run_history
+from run_history import CheckRun, RunHistory
+
+
+def test_critical_path_is_the_longest_dependency_chain() -> None:
+    graph = {"install": [], "lint": ["install"], "test": ["install"], "bench": ["test"], "scan": []}
+    durations = {"install": 2.0, "lint": 1.0, "test": 5.0, "bench": 3.0, "scan": 9.0}
+
+    assert run_history.critical_path(graph, durations) == (["install", "test", "bench"], 10.0)
+    assert run_history.critical_path({}, {}) == ([], 0.0)
+
+
+def _record(history: RunHistory, durations: Dict[str, float], **overrides: bool) -> None:
+    history.record(
+        "2026-01-01T00:00:00",
+        sum(durations.values()),
+        [CheckRun(key, duration, 0, depends_on=[], **overrides) for key, duration in durations.items()],
+    )
+
+
+def test_regressions_need_min_samples_of_timed_runs(tmp_path: Path) -> None:
+    history = RunHistory(tmp_path / "history.sqlite")
+    assert "No runs recorded yet" in run_history.trend_report(history)
+
+    for _ in range(run_history.MIN_SAMPLES - 1):
+        _record(history, {"pytest": 10.0, "ruff": 1.0})
+    _record(history, {"pytest": 0.0}, cached=True)
+    _record(history, {"pytest": 30.0, "ruff": 1.0})
+    report = run_history.trend_report(history)
+    assert "| pytest | 10.00s | 30.00s |" not in report
+    assert "## Regressions" in report and "None." in report
+
+    _record(history, {"pytest": 10.0, "ruff": 1.0})
+    _record(history, {"pytest": 30.0, "ruff": 1.2})
+    report = run_history.trend_report(history)
+    assert "| pytest | 10.00s | 30.00s | +20.00s |" in report
+    assert "| ruff |" not in report.split("## Regressions")[1]
+
+
+def test_trend_reads_only_the_window(tmp_path: Path) -> None:
+    history = RunHistory(tmp_path / "history.sqlite")
+    for _ in range(5):
+        _record(history, {"pytest": 100.0})
+    for _ in range(3):
+        _record(history, {"pytest": 10.0})
+
+    assert len(history.recent(3)) == 3
+    assert "| pytest | app | 10.00s | 10.00s | 2 |" in run_history.trend_report(history, window=2)